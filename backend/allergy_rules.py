@@ -0,0 +1,244 @@
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from records import Diner, Reservation
+
+# Local fast path for allergy and dietary extraction. A single Aho-Corasick
+# automaton over the lexicon below scans each email once; matches are then
+# grouped per sentence and an allergen is only reported when a cue ("allergic",
+# "intolerant", "avoid") appears in the same sentence, or directly after "no" or
+# "without" ("no shellfish", "without nuts or eggs"). Anything the rules cannot
+# settle is flagged as ambiguous so the caller can escalate it to the model.
+
+ALLERGENS: Dict[str, str] = {
+    "peanut": "peanut", "peanuts": "peanut",
+    "tree nut": "tree nut", "tree nuts": "tree nut",
+    "nut": "nut", "nuts": "nut",
+    "walnut": "walnut", "walnuts": "walnut",
+    "almond": "almond", "almonds": "almond",
+    "hazelnut": "hazelnut", "hazelnuts": "hazelnut",
+    "pecan": "pecan", "pecans": "pecan",
+    "cashew": "cashew", "cashews": "cashew",
+    "pistachio": "pistachio", "pistachios": "pistachio",
+    "shellfish": "shellfish", "crustacean": "shellfish", "crustaceans": "shellfish",
+    "shrimp": "shrimp", "prawn": "shrimp", "prawns": "shrimp",
+    "lobster": "lobster", "crab": "crab", "oyster": "oyster", "oysters": "oyster",
+    "mussel": "mussel", "mussels": "mussel", "scallop": "scallop", "scallops": "scallop",
+    "fish": "fish", "fish sauce": "fish sauce", "anchovy": "anchovy", "anchovies": "anchovy",
+    "gluten": "gluten", "wheat": "wheat", "celiac": "gluten", "coeliac": "gluten",
+    "dairy": "dairy", "lactose": "lactose", "milk": "milk", "cheese": "cheese", "cream": "cream",
+    "egg": "egg", "eggs": "egg",
+    "soy": "soy", "soya": "soy",
+    "sesame": "sesame", "mustard": "mustard", "celery": "celery",
+    "sulfite": "sulfite", "sulfites": "sulfite", "sulphites": "sulfite",
+    "alcohol": "alcohol", "pork": "pork", "red meat": "red meat", "garlic": "garlic",
+    "onion": "onion", "onions": "onion", "mushroom": "mushroom", "mushrooms": "mushroom",
+    "cilantro": "cilantro", "coriander": "cilantro",
+    "salt": "salt", "sodium": "sodium",
+}
+
+# Phrases that carry their own meaning and need no cue
+DIETS: Dict[str, str] = {
+    "low-sodium": "Low-sodium diet", "low sodium": "Low-sodium diet", "less salt": "Low-sodium diet",
+    "vegan": "Vegan", "vegetarian": "Vegetarian", "pescatarian": "Pescatarian",
+    "kosher": "Kosher", "halal": "Halal", "keto": "Keto", "diabetic": "Diabetic",
+    "gluten-free": "Gluten-free", "gluten free": "Gluten-free",
+    "dairy-free": "Dairy-free", "dairy free": "Dairy-free",
+    "nut-free": "Nut-free", "nut free": "Nut-free",
+    "lactose-free": "Lactose-free", "lactose free": "Lactose-free",
+    "shellfish-free": "Shellfish-free", "egg-free": "Egg-free", "soy-free": "Soy-free",
+    "less spicy": "Prefers mild spice", "mild spiciness": "Prefers mild spice",
+    "not spicy": "Prefers mild spice", "no spice": "Prefers mild spice",
+}
+
+CUES: Dict[str, str] = {
+    "allergic": "allergy", "allergy": "allergy", "allergies": "allergy", "anaphylaxis": "allergy",
+    "intolerant": "intolerance", "intolerance": "intolerance",
+    "sensitive": "intolerance", "sensitivity": "intolerance",
+    "avoid": "avoid", "avoids": "avoid", "aversion": "avoid", "no": "avoid", "without": "avoid",
+    "can't eat": "avoid", "cannot eat": "avoid", "don't eat": "avoid", "doesn't eat": "avoid",
+    "free of": "avoid", "diet": "diet", "dietary": "diet",
+}
+
+# Cues too common to bind across a sentence ("no rush", "no complaints"): they
+# only apply to the allergen right after them and the list it starts
+ADJACENT_CUES = {"no", "without"}
+
+NEGATORS = ("not", "no", "never", "n't", "without", "nothing")
+
+# Cue kinds whose meaning flips when negated ("not allergic", "no allergies")
+NEGATABLE = {"allergy", "intolerance", "diet"}
+
+SENTENCE_BREAK = re.compile(r"[.!?;\n]+")
+WORD = re.compile(r"[a-z']+")
+LIST_JOINER = re.compile(r"[\s,]*(?:(?:and|or|nor)\s+)?")
+
+NO_ALLERGIES = "No Allergies"
+
+@dataclass
+class Match:
+    start: int
+    end: int
+    phrase: str
+    kind: str  # "allergen", "diet" or "cue"
+
+@dataclass
+class ExtractionResult:
+    findings: List[str] = field(default_factory=list)
+    ambiguous: bool = False
+
+    def as_text(self) -> str:
+        return ", ".join(self.findings) if self.findings else NO_ALLERGIES
+
+class Automaton:
+    # Classic Aho-Corasick: trie goto table, BFS-built failure links and merged
+    # outputs, so every phrase is found in one left-to-right pass.
+
+    def __init__(self, phrases: Dict[str, str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[str, str]]] = [[]]
+        for phrase, kind in phrases.items():
+            node = 0
+            for char in phrase:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node].append((phrase, kind))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def scan(self, text: str) -> List[Match]:
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for phrase, kind in self.output[node]:
+                start = index - len(phrase) + 1
+                # Whole words only: "nut" must not fire inside "peanut" or "nutrition"
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if index + 1 < len(text) and text[index + 1].isalnum():
+                    continue
+                matches.append(Match(start, index + 1, phrase, kind))
+        return _drop_overlaps(matches)
+
+def _drop_overlaps(matches: List[Match]) -> List[Match]:
+    # Keep the longest match wherever phrases overlap ("fish sauce" over "fish")
+    kept = []
+    for match in sorted(matches, key=lambda m: (m.start, -(m.end - m.start))):
+        if kept and match.start < kept[-1].end:
+            continue
+        kept.append(match)
+    return kept
+
+def _build_automaton() -> Automaton:
+    phrases = {}
+    phrases.update({phrase: "allergen" for phrase in ALLERGENS})
+    phrases.update({phrase: "cue" for phrase in CUES})
+    phrases.update({phrase: "diet" for phrase in DIETS})
+    return Automaton(phrases)
+
+AUTOMATON = _build_automaton()
+
+def is_negator(word: str) -> bool:
+    # word is lowercase with straight apostrophes
+    return word in NEGATORS or word.endswith("n't")
+
+def _is_negated(sentence: str, position: int) -> bool:
+    # A negator within the three words before the cue
+    words = WORD.findall(sentence[:position])[-3:]
+    return any(is_negator(word) for word in words)
+
+def _adjacent(sentence: str, cue: Match, allergens: List[Match]) -> List[Match]:
+    # The allergen directly after the cue, plus any listed after it with
+    # commas, "and", "or" or "nor": "no nuts, shellfish or eggs"
+    bound = []
+    end = cue.end
+    for allergen in allergens:
+        if allergen.start < end:
+            continue
+        gap = sentence[end:allergen.start]
+        if not (gap.isspace() if not bound else LIST_JOINER.fullmatch(gap)):
+            break
+        bound.append(allergen)
+        end = allergen.end
+    return bound
+
+def _label(allergen: str, kind: str) -> str:
+    if kind == "allergy":
+        return f"{allergen.capitalize()} allergy"
+    if kind == "intolerance":
+        return f"{allergen.capitalize()} intolerance"
+    return f"Avoids {allergen}"
+
+def extract(texts: List[str], dietary_tags: Optional[List[str]] = None) -> ExtractionResult:
+    findings: List[str] = []
+    unresolved = False
+
+    def add(finding: str):
+        if finding not in findings:
+            findings.append(finding)
+
+    for text in texts:
+        for sentence in SENTENCE_BREAK.split(text.lower().replace("’", "'")):
+            if not sentence.strip():
+                continue
+            matches = AUTOMATON.scan(sentence)
+            allergens = [m for m in matches if m.kind == "allergen"]
+            cues = []
+            # allergen start -> kind, for allergens right after "no" or "without"
+            bound: Dict[int, str] = {}
+            for match in matches:
+                if match.kind == "diet":
+                    add(DIETS[match.phrase])
+                elif match.kind == "cue":
+                    cue_kind = CUES[match.phrase]
+                    if match.phrase in ADJACENT_CUES:
+                        bound.update((allergen.start, cue_kind) for allergen in _adjacent(sentence, match, allergens))
+                        continue
+                    if cue_kind in NEGATABLE and _is_negated(sentence, match.start):
+                        continue
+                    cues.append((match, cue_kind))
+
+            if allergens:
+                specific = [(m, k) for m, k in cues if k != "diet"]
+                for allergen in allergens:
+                    if allergen.start in bound:
+                        add(_label(ALLERGENS[allergen.phrase], bound[allergen.start]))
+                    elif specific:
+                        cue, cue_kind = min(specific, key=lambda c: abs(c[0].start - allergen.start))
+                        add(_label(ALLERGENS[allergen.phrase], cue_kind))
+                    else:
+                        # An allergen mentioned without any restriction cue, e.g. a
+                        # question about a dish or "no rush, we love the cheese"
+                        unresolved = True
+            elif any(k in ("allergy", "intolerance") for _, k in cues):
+                # "My allergy is severe" with the allergen named elsewhere
+                unresolved = True
+
+    for tag in dietary_tags or []:
+        add(tag.strip().capitalize())
+
+    return ExtractionResult(findings=findings, ambiguous=unresolved and not findings)
+
+def extract_for_diner(diner: Diner, reservation: Optional[Reservation]) -> ExtractionResult:
+    texts = [email.combined_thread for email in diner.emails]
+    tags = list(reservation.dietary_tags) if reservation is not None else []
+    return extract(texts, tags)
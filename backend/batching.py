@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from metrics import log_event
+from prompts import estimate_tokens
+
+# Packs many small per-diner extraction requests into a few model calls. Items
+# are numbered inside each batch and the model answers with one JSON object
+# keyed by those numbers. Every answer is validated on its own; only the items
+# that came back missing or malformed are sent again, in smaller batches.
+
+T = TypeVar("T")
+
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+def pack(items: List[Tuple[str, str]], budget: int, max_items: int) -> List[List[Tuple[str, str]]]:
+    # Greedy packing by estimated tokens; an item larger than the budget gets a batch of its own
+    batches: List[List[Tuple[str, str]]] = []
+    current: List[Tuple[str, str]] = []
+    tokens = 0
+    for key, text in items:
+        cost = estimate_tokens(text)
+        if current and (tokens + cost > budget or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            tokens = 0
+        current.append((key, text))
+        tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def render(instructions: str, batch: List[Tuple[str, str]]) -> str:
+    sections = "\n\n".join(f"### {number}\n{text}" for number, (_, text) in enumerate(batch, 1))
+    return f"""{instructions}
+
+Respond with a single JSON object with one entry per item, keyed by the item number ("1" to "{len(batch)}").
+
+{sections}"""
+
+def parse(content: str) -> dict:
+    # Tolerates prose or code fences around the object
+    match = JSON_OBJECT.search(content)
+    if match is None:
+        return {}
+    try:
+        value = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+async def run_batches(items: Dict[str, str], instructions: str,
+                      call: Callable[[str, int], Awaitable[str]],
+                      validate: Callable[[object], Optional[T]],
+                      budget: int, max_items: int, max_attempts: int = 3) -> Tuple[Dict[str, T], List[str], int]:
+    # call(prompt, item_count) performs one model call. Returns the validated
+    # results by key, the keys still missing after max_attempts and the
+    # estimated prompt tokens sent.
+    results: Dict[str, T] = {}
+    pending = list(items.items())
+    sent_tokens = 0
+
+    async def run(batch: List[Tuple[str, str]]) -> Dict[str, T]:
+        nonlocal sent_tokens
+        prompt = render(instructions, batch)
+        sent_tokens += estimate_tokens(prompt)
+        try:
+            answers = parse(await call(prompt, len(batch)))
+        except Exception as e:
+            log_event("batch call failed", logging.WARNING, items=len(batch), error=str(e))
+            return {}
+        valid = {}
+        for number, (key, _) in enumerate(batch, 1):
+            value = validate(answers.get(str(number)))
+            if value is not None:
+                valid[key] = value
+        return valid
+
+    for attempt in range(max_attempts):
+        if not pending:
+            break
+        # Retries use smaller batches, which are both more reliable and a different prompt
+        batches = pack(pending, budget, max(1, max_items >> attempt))
+        for valid in await asyncio.gather(*(run(batch) for batch in batches)):
+            results.update(valid)
+        pending = [(key, text) for key, text in pending if key not in results]
+        if pending:
+            log_event("batch items need retry", logging.WARNING, attempt=attempt + 1, items=len(pending))
+    return results, [key for key, _ in pending], sent_tokens
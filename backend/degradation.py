@@ -0,0 +1,40 @@
+import contextvars
+from typing import Any, Awaitable, Callable, FrozenSet, Optional, Set, Tuple
+
+import metrics
+
+# Tracks results served from a local fallback instead of a model answer. Every
+# request, and every call run through tracked(), gets its own set of degraded
+# kinds: the caller reports them (the X-Degraded response header, a
+# "degraded" field) and keeps such results out of the shared caches, so they
+# are recomputed once the upstream recovers.
+
+_degraded: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar("degraded", default=None)
+
+def mark_degraded(kind: str):
+    metrics.fallbacks.inc(kind=kind)
+    kinds = _degraded.get()
+    if kinds is not None:
+        kinds.add(kind)
+
+def report(kinds: FrozenSet[str]):
+    # Carry kinds from a tracked call into the enclosing scope without counting them again
+    current = _degraded.get()
+    if current is not None:
+        current.update(kinds)
+
+def open_scope() -> Tuple[contextvars.Token, Set[str]]:
+    kinds: Set[str] = set()
+    return _degraded.set(kinds), kinds
+
+def close_scope(token: contextvars.Token):
+    _degraded.reset(token)
+
+async def tracked(fn: Callable[..., Awaitable[Any]], *args) -> Tuple[Any, FrozenSet[str]]:
+    # (result, degraded kinds) of fn(*args); safe to share through SingleFlight
+    token, kinds = open_scope()
+    try:
+        result = await fn(*args)
+        return result, frozenset(kinds)
+    finally:
+        close_scope(token)
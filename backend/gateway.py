@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Optional
+
+import openai
+
+from metrics import log_event
+
+# Every model call goes through one gateway: at most max_concurrency calls in
+# flight, one deadline covering all attempts of a call, retries with full-jitter
+# exponential backoff (or the server's retry-after when it sends one) and a
+# circuit breaker that fails calls fast while the upstream error rate is high,
+# so callers drop to their local fallbacks instead of queueing behind it.
+
+RETRYABLE = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    asyncio.TimeoutError,
+)
+
+class CircuitOpenError(Exception):
+    pass
+
+class UpstreamTimeout(Exception):
+    pass
+
+class CircuitBreaker:
+    # closed -> open when at least min_calls of the last `window` attempts were
+    # seen and error_rate of them failed; open -> half_open after cooldown
+    # seconds, when a single probe call is let through; the probe's outcome
+    # closes or re-opens the circuit.
+
+    def __init__(self, window: int, error_rate: float, cooldown_seconds: float, min_calls: int = 5):
+        self.error_rate = error_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.min_calls = min_calls
+        self.outcomes = deque(maxlen=window)
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown_seconds:
+                return False
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record(self, ok: bool):
+        if self.state == "half_open":
+            self._probing = False
+            if ok:
+                self.state = "closed"
+                self.outcomes.clear()
+                log_event("circuit closed")
+            else:
+                self._trip()
+            return
+        self.outcomes.append(ok)
+        failures = len(self.outcomes) - sum(self.outcomes)
+        if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.error_rate:
+            self._trip()
+
+    def abandon(self):
+        # A probe that was cancelled says nothing about the upstream
+        if self.state == "half_open":
+            self._probing = False
+
+    def _trip(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self.outcomes.clear()
+        log_event("circuit opened", logging.WARNING, cooldown_seconds=self.cooldown_seconds)
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+class LLMGateway:
+    def __init__(self, client, max_concurrency: int, timeout_seconds: float, max_attempts: int,
+                 backoff_base_seconds: float, backoff_max_seconds: float, breaker: CircuitBreaker):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.breaker = breaker
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.retries = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (attempt - 1)))
+        server_delay = retry_after_seconds(error)
+        return max(delay, server_delay) if server_delay is not None else delay
+
+    async def _acquire(self, deadline: float):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise UpstreamTimeout("Deadline passed waiting for a free model call slot")
+        self.in_flight += 1
+
+    def _release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def _attempts(self, deadline: float, **kwargs) -> Any:
+        # Runs create() until it succeeds, fails permanently, or the deadline or
+        # attempt budget is spent. Returns holding a concurrency slot, which the
+        # caller releases.
+        attempt = 0
+        while True:
+            attempt += 1
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise CircuitOpenError("Model upstream circuit is open")
+            await self._acquire(deadline)
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                result = await asyncio.wait_for(self.client.chat.completions.create(**kwargs), remaining)
+            except RETRYABLE as e:
+                self._release()
+                self.breaker.record(False)
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                delay = self._backoff(attempt, e)
+                if attempt >= self.max_attempts or time.monotonic() + delay >= deadline:
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise UpstreamTimeout(f"Model call exceeded its {self.timeout_seconds}s deadline") from e
+                    raise
+                self.retries += 1
+                log_event("llm retry", logging.WARNING, attempt=attempt, delay_ms=round(delay * 1000), error=str(e))
+                await asyncio.sleep(delay)
+                continue
+            except asyncio.CancelledError:
+                self._release()
+                self.breaker.abandon()
+                raise
+            except Exception:
+                # Client errors (bad request, auth) are not upstream health problems
+                self._release()
+                self.breaker.abandon()
+                raise
+            self.breaker.record(True)
+            return result
+
+    async def complete(self, **kwargs) -> Any:
+        deadline = time.monotonic() + self.timeout_seconds
+        response = await self._attempts(deadline, **kwargs)
+        self._release()
+        return response
+
+    async def stream(self, **kwargs) -> AsyncIterator[Any]:
+        # Retries only happen before the first chunk; the deadline covers the
+        # whole stream and the slot is held until it ends. The upstream response
+        # is closed however the stream ends (finished, timed out or cancelled),
+        # so an abandoned stream does not keep its connection open.
+        deadline = time.monotonic() + self.timeout_seconds
+        stream = await self._attempts(deadline, stream=True, **kwargs)
+        try:
+            iterator = stream.__aiter__()
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), max(remaining, 0))
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    raise UpstreamTimeout(f"Model stream exceeded its {self.timeout_seconds}s deadline")
+                yield chunk
+        finally:
+            try:
+                await stream.close()
+            finally:
+                self._release()
+
+    def stats(self) -> dict:
+        return {
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout_seconds,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts
+        }
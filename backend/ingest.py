@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import log_event
+
+# Hot reload of the JSON dataset. The file is polled for a new mtime or size;
+# a changed file is parsed and diffed in a worker thread, one digest per diner,
+# so only the diners that are new or edited reach the event loop, where they
+# are applied to the store as incremental updates.
+
+def read_dataset(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+def diner_digest(diner: dict) -> str:
+    return hashlib.sha1(json.dumps(diner, sort_keys=True).encode("utf-8")).hexdigest()
+
+def dataset_digests(dining_data: dict) -> Dict[str, str]:
+    return {diner["name"]: diner_digest(diner) for diner in dining_data.get("diners", []) if "name" in diner}
+
+def read_changes(path: str, digests: Dict[str, str]) -> Tuple[List[dict], Dict[str, str]]:
+    # (diners that are new or differ from `digests`, digests of the whole file)
+    dining_data = read_dataset(path)
+    current = dataset_digests(dining_data)
+    changed = [
+        diner for diner in dining_data.get("diners", [])
+        if "name" in diner and digests.get(diner["name"]) != current[diner["name"]]
+    ]
+    return changed, current
+
+class DatasetWatcher:
+    def __init__(self, path: str, apply: Callable[[List[dict]], Awaitable[dict]]):
+        self.path = path
+        self.apply = apply
+        self.digests: Dict[str, str] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+        self.last_result: Optional[dict] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return info.st_mtime_ns, info.st_size
+
+    async def prime(self, dining_data: dict):
+        # Digests of the dataset as loaded at startup, computed off the event loop
+        self._signature = self._stat()
+        self.digests = await asyncio.to_thread(dataset_digests, dining_data)
+
+    async def reload(self, force: bool = False) -> Optional[dict]:
+        # Applies the diners changed since the last reload; None when the file
+        # is unchanged (and not forced) or cannot be read
+        async with self._lock:
+            signature = self._stat()
+            if signature is None or (signature == self._signature and not force):
+                return None
+            try:
+                changed, digests = await asyncio.to_thread(read_changes, self.path, self.digests)
+            except (OSError, ValueError) as e:
+                # Most often a file caught mid-write; the next poll retries
+                log_event("dataset reload failed", logging.WARNING, path=self.path, error=str(e))
+                return None
+            result = await self.apply(changed)
+            self.digests = digests
+            self._signature = signature
+            self.reloads += 1
+            self.last_result = result
+            log_event("dataset reloaded", path=self.path, **result)
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "reloads": self.reloads,
+            "diners_tracked": len(self.digests),
+            "last_reload": self.last_result
+        }
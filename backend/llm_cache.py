@@ -0,0 +1,136 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+# Access times are buffered in memory and written in one batch every
+# ACCESS_FLUSH_SECONDS or once ACCESS_FLUSH_SIZE keys are waiting, so a hit is
+# a single indexed read
+ACCESS_FLUSH_SECONDS = 5.0
+ACCESS_FLUSH_SIZE = 256
+
+class LLMCache:
+    # Content-addressed store for model responses, persisted in SQLite so it
+    # survives restarts. Entries expire after ttl_seconds and the least recently
+    # used ones are evicted once max_entries is exceeded. Calls block on SQLite,
+    # so async code runs them in a worker thread.
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+        # Running entry count, re-read from the table on every flush since
+        # other workers may share the file
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        # key -> last access time not yet written
+        self._touched: Dict[str, float] = {}
+        self._flushed_at = time.monotonic()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+        payload = json.dumps([model, system_prompt, user_prompt, temperature], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            content, created_at = row
+            if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                cursor = self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._entries -= cursor.rowcount
+                self._touched.pop(key, None)
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            self.hits += 1
+            if len(self._touched) >= ACCESS_FLUSH_SIZE or time.monotonic() - self._flushed_at >= ACCESS_FLUSH_SECONDS:
+                self._flush()
+            return content
+
+    def set(self, key: str, content: str):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE responses SET content = ?, created_at = ?, accessed_at = ? WHERE key = ?",
+                (content, now, now, key)
+            )
+            if cursor.rowcount == 0:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, content, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, content, now, now)
+                )
+                self._entries += 1
+            self._touched.pop(key, None)
+            if self._entries > self.max_entries:
+                # Pending access times go in first so eviction sees the real LRU order
+                self._flush()
+                overflow = self._entries - self.max_entries
+                if overflow > 0:
+                    cursor = self._conn.execute(
+                        "DELETE FROM responses WHERE key IN ("
+                        " SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                        (overflow,)
+                    )
+                    self._entries -= cursor.rowcount
+                    self.evictions += cursor.rowcount
+            self._conn.commit()
+
+    def _flush(self):
+        # Caller holds the lock
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        self._flushed_at = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._entries = 0
+            self._touched.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
@@ -1,29 +1,294 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Match
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import AsyncIterator, List, Dict, Optional, Set, Tuple
+import asyncio
+import datetime
+import gc
+import hashlib
 import json
+import logging
 import os
+import time
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 from openai import AsyncOpenAI
+import allergy_rules
+import metrics
+from batching import run_batches
+from degradation import mark_degraded, report, tracked
+import degradation
+from gateway import CircuitBreaker, CircuitOpenError, LLMGateway
+from functools import partial
+from ingest import DatasetWatcher, read_dataset
+from llm_cache import LLMCache
+from metrics import log_event
+from precompute import PrecomputeScheduler
+from preferences import PreferenceEngine
+from projection import VIEWS, Encoded, ProjectionCache, Row, encode, needs_details, parse_fields
+from prompts import PromptReport, chunk_rows, estimate_tokens, naive_encoding, tabular
+from scheduler import (InfeasibleAssignment, check_feasibility, format_minutes, least_loaded, partition_intervals,
+                       rebalance, to_minutes)
+from singleflight import SingleFlight
+from records import DEFAULT_LOCATION, Diner, Reservation, ServiceKey
+from snapshot import DiningSnapshot
+from solver import SolverResult, solve
+from state import open_state
+from store import DiningStore
+from waiters import WaitersFile
 
 # Load environment variables
 load_dotenv()
 
-# Create OpenAI client
-openai_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Deadline for one model call including its retries, and the gateway's limits
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', '3'))
+
+# Create OpenAI client; retries and timeouts are owned by the gateway below
+openai_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), max_retries=0, timeout=LLM_TIMEOUT_SECONDS)
+
+llm_gateway = LLMGateway(
+    openai_client,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    timeout_seconds=LLM_TIMEOUT_SECONDS,
+    max_attempts=LLM_MAX_ATTEMPTS,
+    backoff_base_seconds=0.5,
+    backoff_max_seconds=8.0,
+    breaker=CircuitBreaker(
+        window=int(os.getenv('LLM_BREAKER_WINDOW', '20')),
+        error_rate=float(os.getenv('LLM_BREAKER_ERROR_RATE', '0.5')),
+        cooldown_seconds=float(os.getenv('LLM_BREAKER_COOLDOWN_SECONDS', '30'))
+    )
+)
+
+# Table assignment is computed locally; the model is only asked to explain it when enabled
+ASSIGNMENT_LLM_EXPLAIN = os.getenv('ASSIGNMENT_LLM_EXPLAIN', '0') == '1'
+
+# Default assignment solver: "greedy" (interval sweep) or "optimal" (local
+# search minimizing the peak concurrent covers per waiter, within a time budget)
+ASSIGNMENT_SOLVER = os.getenv('ASSIGNMENT_SOLVER', 'greedy')
+ASSIGNMENT_SOLVER_BUDGET_MS = float(os.getenv('ASSIGNMENT_SOLVER_BUDGET_MS', '250'))
+ASSIGNMENT_SOLVERS = ("greedy", "optimal")
+
+# Estimated token budget for variable prompt sections before they are chunked
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '6000'))
+
+# Preferences come from the local taxonomy matcher; with this set the model
+# rewords the matches into guest-specific phrasing
+PREFERENCE_LLM_PHRASING = os.getenv('PREFERENCE_LLM_PHRASING', '0') == '1'
+
+# Escalate allergy extraction to the model when the local rules are unsure
+ALLERGY_LLM_ESCALATION = os.getenv('ALLERGY_LLM_ESCALATION', '1') == '1'
+
+# Maximum concurrent model calls made by the background enrichment stage
+ENRICHMENT_CONCURRENCY = int(os.getenv('ENRICHMENT_CONCURRENCY', '8'))
+
+# Background enrichment packs up to LLM_BATCH_MAX_ITEMS diners into one allergy
+# or special event call instead of one call per diner
+LLM_BATCHING = os.getenv('LLM_BATCHING', '1') == '1'
+LLM_BATCH_MAX_ITEMS = int(os.getenv('LLM_BATCH_MAX_ITEMS', '20'))
+
+# Persistent cache of model responses, shared across restarts
+llm_cache = LLMCache(
+    path=os.getenv('LLM_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'llm_cache.sqlite3')),
+    ttl_seconds=float(os.getenv('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600))),
+    max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '10000'))
+)
+
+# Shared state (roster, assignments, enrichment results, briefings). Use sqlite
+# or redis when running more than one worker so every worker sees the same data.
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')
+state = open_state(
+    STATE_BACKEND,
+    sqlite_path=os.getenv('STATE_PATH', os.path.join(os.path.dirname(__file__), 'state.sqlite3')),
+    redis_url=os.getenv('STATE_REDIS_URL', 'redis://localhost:6379/0')
+)
+
+# Worker processes started by `python main.py`
+WORKERS = int(os.getenv('WORKERS', '1'))
+
+# How often the JSON dataset is checked for edits and reservations ingested by
+# other workers are picked up; 0 disables both
+DATASET_WATCH_SECONDS = float(os.getenv('DATASET_WATCH_SECONDS', '2'))
+
+# Background warm-up of enrichment and briefings ahead of service: concurrent
+# jobs, and whether the next service is warmed as soon as the dataset loads
+PRECOMPUTE_WORKERS = max(1, int(os.getenv('PRECOMPUTE_WORKERS', '4')))
+PRECOMPUTE_ON_LOAD = os.getenv('PRECOMPUTE_ON_LOAD', '1') == '1'
+precompute = PrecomputeScheduler(PRECOMPUTE_WORKERS)
+
+# Waiter roster (names, shifts, sections, cover limits), reloaded with the
+# dataset when the file changes
+waiters_file = WaitersFile(os.getenv(
+    'WAITERS_PATH', os.path.join(os.path.dirname(__file__), '..', 'waiters.json')
+))
+
+async def chat_completion(system_prompt: str, user_prompt: str, max_tokens: int,
+                          model: str = "gpt-4", temperature: float = 0.7, task: str = "chat") -> str:
+    # Every model call goes through here so identical prompts are only paid for once
+    key = LLMCache.make_key(model, system_prompt, user_prompt, temperature)
+    cached = await asyncio.to_thread(llm_cache.get, key)
+    if cached is not None:
+        metrics.llm_cache_lookups.inc(task=task, result="hit")
+        return cached
+    metrics.llm_cache_lookups.inc(task=task, result="miss")
+
+    start = time.perf_counter()
+    try:
+        response = await llm_gateway.complete(
+            model=model,
+            messages=[{
+                "role": "system",
+                "content": system_prompt
+            }, {
+                "role": "user",
+                "content": user_prompt
+            }],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+    except Exception as e:
+        record_llm_call(model, task, llm_error_outcome(e), time.perf_counter() - start)
+        log_event("llm call failed", logging.WARNING, model=model, task=task, error=str(e))
+        raise
+    elapsed = time.perf_counter() - start
+    usage = response.usage
+    record_llm_call(model, task, "ok", elapsed,
+                    usage.prompt_tokens if usage else estimate_tokens(system_prompt + user_prompt),
+                    usage.completion_tokens if usage else None)
+    content = response.choices[0].message.content or ""
+    if content.strip():
+        await asyncio.to_thread(llm_cache.set, key, content)
+    return content
+
+async def chat_completion_stream(system_prompt: str, user_prompt: str, max_tokens: int,
+                                 model: str = "gpt-4", temperature: float = 0.7,
+                                 task: str = "chat") -> AsyncIterator[str]:
+    # Streaming variant of chat_completion; a cache hit is yielded as a single chunk
+    key = LLMCache.make_key(model, system_prompt, user_prompt, temperature)
+    cached = await asyncio.to_thread(llm_cache.get, key)
+    if cached is not None:
+        metrics.llm_cache_lookups.inc(task=task, result="hit")
+        yield cached
+        return
+    metrics.llm_cache_lookups.inc(task=task, result="miss")
+
+    start = time.perf_counter()
+    parts = []
+    try:
+        async for chunk in llm_gateway.stream(
+            model=model,
+            messages=[{
+                "role": "system",
+                "content": system_prompt
+            }, {
+                "role": "user",
+                "content": user_prompt
+            }],
+            temperature=temperature,
+            max_tokens=max_tokens
+        ):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+    except Exception as e:
+        record_llm_call(model, task, llm_error_outcome(e), time.perf_counter() - start)
+        log_event("llm stream failed", logging.WARNING, model=model, task=task, error=str(e))
+        raise
+    content = "".join(parts)
+    # Streamed responses carry no usage block, so token counts are estimated
+    record_llm_call(model, task, "ok", time.perf_counter() - start,
+                    estimate_tokens(system_prompt + user_prompt), estimate_tokens(content))
+    if content.strip():
+        await asyncio.to_thread(llm_cache.set, key, content)
+
+def llm_error_outcome(error: Exception) -> str:
+    # Calls refused by the open circuit are labelled separately from upstream errors
+    return "circuit_open" if isinstance(error, CircuitOpenError) else "error"
+
+def record_llm_call(model: str, task: str, outcome: str, elapsed: float,
+                    prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None):
+    metrics.llm_calls.inc(model=model, task=task, outcome=outcome)
+    metrics.llm_latency.observe(elapsed, model=model, task=task)
+    if prompt_tokens is not None:
+        metrics.llm_tokens.inc(prompt_tokens, model=model, task=task, kind="prompt")
+    if completion_tokens is not None:
+        metrics.llm_tokens.inc(completion_tokens, model=model, task=task, kind="completion")
+    log_event("llm call", sample_rate=metrics.LOG_SAMPLE_RATE, model=model, task=task, outcome=outcome,
+              latency_ms=round(elapsed * 1000, 1), prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+# Token accounting for the compact prompts
+prompt_report = PromptReport()
+
+# Coalesces concurrent enrichment and briefing calls for the same diner or waiter
+singleflight = SingleFlight()
+
+def runtime_gauges():
+    # Point-in-time values from the caches and background work, read on each scrape
+    cache = llm_cache.stats()
+    flights = singleflight.stats()
+    prompt_stats = prompt_report.stats()
+    enrichment = state.get("enrichment", "status") or {}
+    gateway = llm_gateway.stats()
+    return [
+        ("laudure_llm_in_flight", "Model calls currently holding a gateway slot", [({}, gateway["in_flight"])]),
+        ("laudure_llm_circuit_open", "1 while the model circuit breaker is open or half-open",
+         [({}, 0 if gateway["circuit"] == "closed" else 1)]),
+        ("laudure_llm_cache_entries", "Entries in the persistent response cache", [({}, cache["entries"])]),
+        ("laudure_singleflight_in_flight", "Coalesced calls currently in flight", [({}, flights["in_flight"])]),
+        ("laudure_singleflight_deduplicated", "Calls served by an identical in-flight call, by operation",
+         [({"operation": op}, values["deduplicated"]) for op, values in flights["operations"].items()]),
+        ("laudure_prompt_tokens_saved", "Estimated prompt tokens saved by compact encoding, by task",
+         [({"task": task}, values["saved_tokens"]) for task, values in prompt_stats.items()]),
+        ("laudure_precompute_jobs", "Background warm-up jobs on this worker, by state",
+         [({"state": field}, sum(precompute.progress(group)[field] for group in precompute.groups()))
+          for field in ("queued", "running", "failed", "cancelled")]),
+        ("laudure_enrichment_jobs", "Background enrichment jobs for the current assignment",
+         [({"state": "completed"}, enrichment.get("completed", 0)), ({"state": "total"}, enrichment.get("total", 0)),
+          ({"state": "degraded"}, enrichment.get("degraded", 0))]),
+    ]
+
+metrics.registry.gauge_source(runtime_gauges)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: nothing to do
     yield
-    # Shutdown: close OpenAI client
+    # Shutdown: close OpenAI client, the response cache and the state backend
     await openai_client.close()
+    llm_cache.close()
+    state.close()
 
 app = FastAPI(title="French Laudure API", lifespan=lifespan)
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    token, degraded = degradation.open_scope()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        # Any part of the response served from a local fallback is named here
+        if degraded:
+            response.headers["X-Degraded"] = ",".join(sorted(degraded))
+        return response
+    finally:
+        degradation.close_scope(token)
+        elapsed = time.perf_counter() - start
+        # Label by route template so /allergies/{diner_name} is one series
+        route = next((r.path for r in app.router.routes if r.matches(request.scope)[0] == Match.FULL), "unmatched")
+        metrics.http_requests.inc(route=route, method=request.method, status=status)
+        metrics.http_latency.observe(elapsed, route=route, method=request.method)
+        log_event("request", sample_rate=metrics.LOG_SAMPLE_RATE, route=route, method=request.method,
+                  status=status, latency_ms=round(elapsed * 1000, 1))
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -31,163 +296,220 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Degraded"],
 )
 
-# Store table assignments
-app.state.table_assignments = {}
+# Reservations are partitioned by service: (location, date). Endpoints take
+# optional ?location=&date= parameters; without them they cover every
+# reservation, as before. Each service has its own assignment, briefings and
+# enrichment, stored under a scope name ("" for the unscoped view).
+
+def resolve_service(location: Optional[str], date: Optional[str]) -> Optional[ServiceKey]:
+    if location is None and date is None:
+        return None
+    if date is None:
+        raise HTTPException(status_code=400, detail="date is required with location (use 'undated' for undated reservations)")
+    if date != "undated":
+        try:
+            datetime.date.fromisoformat(date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid date: {date}")
+    return location or DEFAULT_LOCATION, None if date == "undated" else date
+
+def service_scope(service: Optional[ServiceKey]) -> str:
+    if service is None:
+        return ""
+    location, date = service
+    return f"{location}/{date or 'undated'}"
+
+def service_info(service: Optional[ServiceKey]) -> dict:
+    if service is None:
+        return {}
+    return {"location": service[0], "date": service[1] or "undated"}
+
+def scoped(name: str, scope: str) -> str:
+    # State key of a per-service snapshot or namespace
+    return f"{name}:{scope}" if scope else name
+
+def current_assignment(scope: str = "") -> Tuple[int, List[int], Dict[int, List[dict]]]:
+    # (version, present waiter ids, waiter id -> tables) of the shared assignment snapshot
+    version, snapshot = state.get_snapshot(scoped("assignments", scope))
+    if snapshot is None:
+        return version, [], {}
+    return version, snapshot["waiter_ids"], {waiter_id: tables for waiter_id, tables in snapshot["assignments"]}
+
+def assignment_epoch(scope: str = "") -> int:
+    # Bumped by every full reassignment; delta moves and ingested tables keep it,
+    # so background enrichment of the same roster carries on through them
+    _, snapshot = state.get_snapshot(scoped("assignments", scope))
+    return snapshot.get("epoch", 0) if snapshot else 0
+
+def assigned_diner_names(scope: str = "") -> List[str]:
+    names = []
+    for tables in current_assignment(scope)[2].values():
+        names.extend(table["diner_name"] for table in tables)
+    return list(dict.fromkeys(names))
 
 def get_waiter_name(waiter_id: int) -> str:
-    waiters = {
-        1: "Sauman Das",
-        2: "Danny Bessonov",
-        3: "Justin Zhou",
-        4: "Amélie Rousseau",
-        5: "Philippe Lefebvre",
-        6: "Sophie Beaumont",
-        7: "Lucas Girard",
-        8: "Isabelle Dupont",
-        9: "Antoine Mercier",
-        10: "Claire Fontaine"
-    }
-    return waiters.get(waiter_id, "Unknown Waiter")
+    return waiters_file.roster.name(waiter_id)
 
-def parse_time(time_str: str) -> datetime:
-    try:
-        # Try 24-hour format first since that's what our dataset uses
-        return datetime.strptime(time_str, "%H:%M")
-    except ValueError:
-        try:
-            # Fall back to 12-hour format if needed
-            return datetime.strptime(time_str, "%I:%M %p")
-        except ValueError as e:
-            print(f"Error parsing time {time_str}: {e}")
-            raise
+async def extract_allergies(diner: Diner, reservation: Optional[Reservation]) -> str:
+    # Local rules answer most diners; only cases they cannot settle go to the model
+    result = allergy_rules.extract_for_diner(diner, reservation)
+    if result.ambiguous and ALLERGY_LLM_ESCALATION:
+        metrics.allergy_extractions.inc(path="llm")
+        return await extract_allergies_llm(diner, reservation)
+    metrics.allergy_extractions.inc(path="rules")
+    return result.as_text()
 
-async def extract_allergies(diner: dict, reservation: dict) -> str:
+def allergy_context(diner: Diner, reservation: Optional[Reservation]) -> str:
     # Combine relevant information for allergy detection
-    email_content = '\n'.join(email.get('combined_thread', '') for email in diner.get('emails', []))
-    dietary_tags = [item.get('dietary_tags', []) for item in reservation.get('orders', [])]
-    dietary_tags = [tag for sublist in dietary_tags for tag in sublist]  # flatten
-    reviews = diner.get('reviews', [])
-    review_texts = [review.get('text', '') for review in reviews]
-    
-    prompt = f"""Given the following information about a restaurant reservation, identify any allergies or dietary restrictions mentioned. 
+    email_content = '\n'.join(email.combined_thread for email in diner.emails)
+    dietary_tags = reservation.dietary_tags if reservation is not None else ()
+    review_texts = [review.content for review in diner.reviews]
+    return f"""Email Content: {email_content}
+    Dietary Tags from Orders: {', '.join(dietary_tags)}
+    Previous Reviews: {'. '.join(review_texts)}"""
+
+ALLERGY_SYSTEM_PROMPT = "You are a helpful assistant that identifies allergies and dietary restrictions from restaurant reservation data. Only output the allergies/restrictions or 'No Allergies' if none are found."
+
+def allergy_prompt(context: str) -> str:
+    return f"""Given the following information about a restaurant reservation, identify any allergies or dietary restrictions mentioned. 
     If no allergies are mentioned, respond with 'No Allergies'. Be concise and only list the allergies.
 
-    Email Content: {email_content}
-    Dietary Tags from Orders: {', '.join(dietary_tags)}
-    Previous Reviews: {'. '.join(review_texts)}
+    {context}
     """
 
+async def extract_allergies_llm(diner: Diner, reservation: Optional[Reservation]) -> str:
+    prompt = allergy_prompt(allergy_context(diner, reservation))
+
     try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{
-                "role": "system",
-                "content": "You are a helpful assistant that identifies allergies and dietary restrictions from restaurant reservation data. Only output the allergies/restrictions or 'No Allergies' if none are found."
-            }, {
-                "role": "user",
-                "content": prompt
-            }],
+        content = await chat_completion(
+            system_prompt=ALLERGY_SYSTEM_PROMPT,
+            user_prompt=prompt,
             max_tokens=100,
-            temperature=0.7
+            task="extract_allergies"
         )
-        return response.choices[0].message.content.strip()
+        return content.strip()
     except Exception as e:
-        print(f"Error extracting allergies: {e}\n --------")
-        return "No Allergies"
+        # Whatever the local rules found beats claiming there are no allergies
+        mark_degraded("allergies")
+        log_event("allergy extraction failed", logging.WARNING, error=str(e))
+        return allergy_rules.extract_for_diner(diner, reservation).as_text()
 
-def extract_reservations(dining_data: dict) -> List[dict]:
-    reservations = []
-    for diner in dining_data.get("diners", []):
-        for reservation in diner.get("reservations", []):
-            try:
-                # Parse the time for sorting
-                time = parse_time(reservation["start_time"])
-                reservations.append({
-                    "diner_name": diner["name"],
-                    "start_time": time.strftime("%I:%M %p").lstrip('0'),  # Convert to 12-hour format, remove leading 0
-                    "number_of_people": reservation["number_of_people"],
-                    "orders": reservation["orders"],
-                    "allergies": "Loading...",  # Will be populated later
-                    "_diner_data": diner,  # Temporary field for allergy extraction
-                    "_reservation_data": reservation  # Temporary field for allergy extraction
-                })
-            except Exception as e:
-                print(f"Error processing reservation for {diner['name']}: {e}")
-    return reservations
-
-async def assign_tables(waiter_ids: List[int], dining_data: dict) -> Dict[int, List[dict]]:
-    reservations = extract_reservations(dining_data)
-    
-    # Prepare the prompt for OpenAI
-    prompt = f"""Given the following waiters and reservations at French Laudure, assign tables to waiters optimally.
-    
-Waiters in attendance today:
-{[get_waiter_name(wid) for wid in waiter_ids]}
+def extract_reservations(store: DiningStore, service: Optional[ServiceKey] = None) -> List[dict]:
+    # The store's time index already yields reservations in start-time order,
+    # with their start minutes parsed
+    return [reservation.table() for reservation in store.iter_reservations(service)]
 
-Reservations:
-{json.dumps(reservations, indent=2)}
+def finalize_assignments(assignments: Dict[int, List[dict]]) -> Dict[int, List[dict]]:
+    # Tables are stored sorted by start time so readers never sort them again
+    return {
+        waiter_id: sorted(tables, key=lambda table: to_minutes(table["start_time"]))
+        for waiter_id, tables in assignments.items()
+    }
 
-Rules for assignment:
-1. Each waiter should have an approximately even number of tables
-2. Minimize time overlaps in each waiter's assignments
-3. Consider the number of people
-4. Return the assignments in JSON format with waiter_id as key and list of assigned reservations
+async def assign_tables(waiter_ids: List[int], store: DiningStore, solver: str = "greedy",
+                        service: Optional[ServiceKey] = None) -> Tuple[Dict[int, List[dict]], Optional[SolverResult]]:
+    # Deterministic, in-process interval scheduling; no model call on this path.
+    # The optimal solver runs in a thread so its time budget does not stall the loop.
+    # Shifts, sections and cover limits from the waiter roster are checked
+    # first; a shift the present waiters cannot staff raises InfeasibleAssignment.
+    reservations = extract_reservations(store, service)
+    limits = waiters_file.roster.limits()
+    problems = check_feasibility(waiter_ids, reservations, limits)
+    if problems:
+        raise InfeasibleAssignment(problems)
+    if solver == "optimal":
+        result = await asyncio.to_thread(
+            solve, waiter_ids, reservations, ASSIGNMENT_SOLVER_BUDGET_MS / 1000, 0, limits
+        )
+        return result.assignments, result
+    return partition_intervals(waiter_ids, reservations, limits), None
 
-Provide only the JSON response, no additional text."""
+# Unstaffable tables listed in a 422 response
+INFEASIBLE_REPORT_LIMIT = 50
 
-    try:
-        print("\nPrompt sent to OpenAI:")
-        print(prompt)
+def infeasible_response(error: InfeasibleAssignment) -> HTTPException:
+    return HTTPException(status_code=422, detail={
+        "message": f"The waiters present cannot staff {len(error.problems)} tables",
+        "tables": [{
+            "diner_name": table["diner_name"],
+            "start_time": table["start_time"],
+            "number_of_people": table["number_of_people"],
+            "reason": reason
+        } for table, reason in error.problems[:INFEASIBLE_REPORT_LIMIT]]
+    })
 
-        response = await client.chat.completions.create(
-            model="gpt-4",
-            messages=[{
-                "role": "system",
-                "content": "You are a restaurant management AI that optimizes table assignments for waiters."
-            }, {
-                "role": "user",
-                "content": prompt
-            }],
-            temperature=0.7,
-            max_tokens=2000
+def solver_report(result: SolverResult) -> dict:
+    return {
+        "mode": "optimal",
+        "objective": result.objective,
+        "lower_bound": result.lower_bound,
+        "optimal": result.optimal,
+        "iterations": result.iterations,
+        "elapsed_ms": result.elapsed_ms,
+        "load_curves": [{
+            "waiter_id": waiter_id,
+            "points": [{"time": format_minutes(minute), "covers": covers} for minute, covers in curve]
+        } for waiter_id, curve in result.load_curves.items()]
+    }
+
+async def explain_assignments(waiter_ids: List[int], assignments: Dict[int, List[dict]]) -> Optional[str]:
+    # Optional LLM explanation of a finished assignment, enabled with ASSIGNMENT_LLM_EXPLAIN=1
+    if not ASSIGNMENT_LLM_EXPLAIN or not waiter_ids:
+        return None
+
+    # One row per waiter: tables as start time (party size)
+    rows = [{
+        "waiter": get_waiter_name(waiter_id),
+        "covers": sum(table["number_of_people"] for table in assignments.get(waiter_id, [])),
+        "tables": " ".join(
+            f"{table['start_time']}({table['number_of_people']})"
+            for table in assignments.get(waiter_id, [])
         )
-        
-        print("\nResponse from OpenAI:")
-        response_text = response.choices[0].message.content.strip()
-        print(response_text)
-        
-        # Parse the response and validate
-        assignments = json.loads(response_text)
-        print("\nParsed assignments:")
-        print(json.dumps(assignments, indent=2))
-        
-        # Ensure all waiter IDs are present and have a list of assignments
-        formatted_assignments = {}
-        for waiter_id in waiter_ids:
-            waiter_str_id = str(waiter_id)
-            formatted_assignments[waiter_id] = assignments.get(waiter_str_id, [])
-        
-        print("\nFormatted assignments:")
-        print(json.dumps(formatted_assignments, indent=2))
-        
-        return formatted_assignments
-        
+    } for waiter_id in waiter_ids]
+    columns = ["waiter", "covers", "tables"]
+
+    def build_prompt(chunk: List[dict]) -> str:
+        return f"""The following table assignment was produced for today's service at French Laudure.
+Each row lists a waiter, their total covers and their tables as start time(party size).
+
+{tabular(chunk, columns)}
+
+In 2-3 sentences, explain to the floor manager how the load is balanced across the shift."""
+
+    async def explain(chunk: List[dict]) -> str:
+        prompt = build_prompt(chunk)
+        naive_tokens = estimate_tokens(prompt) - estimate_tokens(tabular(chunk, columns)) + estimate_tokens(naive_encoding(chunk))
+        prompt_report.record("explain_assignments", naive_tokens, estimate_tokens(prompt))
+        content = await chat_completion(
+            system_prompt="You are a restaurant management AI that explains table assignments for waiters.",
+            user_prompt=prompt,
+            max_tokens=200,
+            task="explain_assignments"
+        )
+        return content.strip()
+
+    # Large rosters are explained in parallel groups of waiters and joined
+    chunks = chunk_rows(rows, columns, PROMPT_TOKEN_BUDGET)
+    try:
+        parts = await asyncio.gather(*(explain(chunk) for chunk in chunks))
+        return "\n\n".join(parts)
     except Exception as e:
-        print(f"Error in OpenAI call: {e}")
-        print("Falling back to round-robin assignment")
-        # Fallback: Simple round-robin assignment
-        assignments = {}
-        for i, waiter_id in enumerate(waiter_ids):
-            assignments[waiter_id] = reservations[i::len(waiter_ids)]
-        print("\nRound-robin assignments:")
-        print(json.dumps(assignments, indent=2))
-        return assignments
+        mark_degraded("assignment_explanation")
+        log_event("assignment explanation failed", logging.WARNING, error=str(e))
+        return None
 
 # Define models
 class WaiterAttendance(BaseModel):
     waiter_ids: List[int]
+    full_reassign: bool = False
+    # Service to staff; both unset assigns every reservation
+    location: Optional[str] = None
+    date: Optional[str] = None
+    # "greedy" or "optimal"; defaults to ASSIGNMENT_SOLVER
+    solver: Optional[str] = None
 
 class Order(BaseModel):
     item: str
@@ -217,25 +539,96 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/llm-cache")
+async def get_llm_cache_stats():
+    return llm_cache.stats()
+
+@app.get("/llm-gateway")
+async def get_llm_gateway_stats():
+    return llm_gateway.stats()
+
+@app.get("/singleflight")
+async def get_singleflight_stats():
+    return singleflight.stats()
+
+@app.get("/prompt-stats")
+async def get_prompt_stats():
+    return prompt_report.stats()
+
 # Load fine dining dataset
 @app.on_event("startup")
 async def load_data():
-    dataset_path = os.path.join(os.path.dirname(__file__), "..", "fine-dining-dataset-augmented.json")
-    try:
-        with open(dataset_path, "r") as f:
-            app.state.dining_data = json.load(f)
-            print(f"Loaded dataset from {dataset_path}")
-    except FileNotFoundError as e:
-        print(f"Error loading dataset: {e}")
-        # Initialize with empty data to prevent crashes
-        app.state.dining_data = {"diners": []}
-    app.state.table_assignments = {}
+    if not await waiters_file.reload(force=True):
+        log_event("waiter roster not loaded, every waiter id is unknown", logging.ERROR, path=waiters_file.path)
+    app.state.dataset_watcher = None
+    app.state.preference_engine = None
+    app.state.applied_ingests = set()
+    # A compiled snapshot (see snapshot.py) is memory-mapped instead of parsing the JSON
+    snapshot_path = os.getenv("DINING_SNAPSHOT_PATH")
+    app.state.store = None
+    if snapshot_path:
+        try:
+            app.state.store = DiningStore.from_snapshot(DiningSnapshot(snapshot_path))
+            log_event("snapshot loaded", path=snapshot_path, **app.state.store.stats())
+        except (OSError, ValueError) as e:
+            log_event("snapshot load failed, falling back to JSON", logging.ERROR, path=snapshot_path, error=str(e))
 
-async def detect_special_event(email_content: str) -> dict:
-    if not email_content:
-        return {"is_special_event": False, "event_type": None}
+    if app.state.store is None:
+        dataset_path = os.getenv(
+            "DINING_DATASET_PATH",
+            os.path.join(os.path.dirname(__file__), "..", "fine-dining-dataset-augmented.json")
+        )
+        try:
+            dining_data = await asyncio.to_thread(read_dataset, dataset_path)
+            log_event("dataset loaded", path=dataset_path)
+        except FileNotFoundError as e:
+            log_event("dataset load failed", logging.ERROR, path=dataset_path, error=str(e))
+            # Initialize with empty data to prevent crashes
+            dining_data = {"diners": []}
+        # Later edits to the file are diffed against the file as loaded, so
+        # digest it before the store converts it to records
+        app.state.dataset_watcher = DatasetWatcher(dataset_path, apply_dataset_changes)
+        await app.state.dataset_watcher.prime(dining_data)
+        # Build the indexes once; every endpoint reads through the store. The
+        # parsed JSON is frozen out of the garbage collector meanwhile, so the
+        # collections triggered by allocating the records do not traverse it.
+        gc.freeze()
+        try:
+            app.state.store = DiningStore(dining_data)
+        finally:
+            gc.unfreeze()
+
+    # Walk-ins ingested before this worker started
+    await apply_shared_ingests()
+
+    # Preferences for every diner in one batch, off the event loop
+    start = time.perf_counter()
+    engine = PreferenceEngine()
+    await asyncio.to_thread(engine.build, app.state.store.diners())
+    app.state.preference_engine = engine
+    log_event("preferences indexed", elapsed_ms=round((time.perf_counter() - start) * 1000), **engine.stats())
+
+    precompute.start()
+    warm_projections(PROJECTION_WARM_VIEWS)
+    if PRECOMPUTE_ON_LOAD:
+        warm_on_load()
+
+    if DATASET_WATCH_SECONDS > 0:
+        app.state.dataset_sync_task = asyncio.create_task(sync_dataset(DATASET_WATCH_SECONDS))
+
+@app.on_event("shutdown")
+async def stop_dataset_sync():
+    task = getattr(app.state, "dataset_sync_task", None)
+    if task is not None:
+        task.cancel()
+    await precompute.stop()
 
-    prompt = f"""Analyze the following email content and determine if it indicates a special event/request (e.g., birthday, anniversary, business meeting). 
+def special_event_prompt(email_content: str) -> str:
+    return f"""Analyze the following email content and determine if it indicates a special event/request (e.g., birthday, anniversary, business meeting). 
     If they have a special request (i.e. being in a rush) for the waiter to consider, return that as well.
     If it is a special event, respond with a JSON object containing 'is_special_event': true and 'event_type': <type>.
     If it is not a special event, respond with a JSON object containing 'is_special_event': false and 'event_type': null.
@@ -244,174 +637,637 @@ async def detect_special_event(email_content: str) -> dict:
     {email_content}
     """
 
+SPECIAL_EVENT_SYSTEM_PROMPT = "You are a helpful assistant that detects special events from email content. Only respond with a JSON object."
+
+async def detect_special_event(email_content: str) -> dict:
+    if not email_content:
+        return {"is_special_event": False, "event_type": None}
+
+    prompt = special_event_prompt(email_content)
+
     try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{
-                "role": "system",
-                "content": "You are a helpful assistant that detects special events from email content. Only respond with a JSON object."
-            }, {
-                "role": "user",
-                "content": prompt
-            }],
-            temperature=0.7,
-            max_tokens=100
+        content = await chat_completion(
+            system_prompt=SPECIAL_EVENT_SYSTEM_PROMPT,
+            user_prompt=prompt,
+            max_tokens=100,
+            task="detect_special_event"
         )
 
-        result = json.loads(response.choices[0].message.content)
+        result = json.loads(content)
         return {
             "is_special_event": result.get("is_special_event", False),
             "event_type": result.get("event_type")
         }
     except Exception as e:
-        print(f"Error detecting special event: {e}")
+        mark_degraded("special_event")
+        log_event("special event detection failed", logging.WARNING, error=str(e))
         return {"is_special_event": False, "event_type": None}
 
+# Multi-diner variants used by background enrichment. The model answers with a
+# JSON object keyed by item number (gpt-4 has no JSON response mode, so the
+# object is located in the reply and each entry validated separately).
+
+ALLERGY_BATCH_INSTRUCTIONS = """For each numbered restaurant reservation below, identify any allergies or dietary restrictions mentioned.
+The value for each item is a short string listing only the allergies/restrictions, or "No Allergies" if none are mentioned."""
+
+SPECIAL_EVENT_BATCH_INSTRUCTIONS = """For each numbered email below, determine if it indicates a special event/request (e.g., birthday, anniversary, business meeting), including special requests (i.e. being in a rush) for the waiter to consider.
+The value for each item is an object {"is_special_event": true or false, "event_type": <type> or null}."""
+
+def valid_allergies(value) -> Optional[str]:
+    if isinstance(value, list):
+        value = ", ".join(str(item) for item in value if item)
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+def valid_special_event(value) -> Optional[dict]:
+    if not isinstance(value, dict) or not isinstance(value.get("is_special_event"), bool):
+        return None
+    event_type = value.get("event_type")
+    if event_type is not None and not isinstance(event_type, str):
+        return None
+    return {"is_special_event": value["is_special_event"], "event_type": event_type}
+
+async def run_extraction_batches(task: str, system_prompt: str, instructions: str, items: Dict[str, str],
+                                 single_prompt, validate, tokens_per_item: int,
+                                 semaphore: asyncio.Semaphore) -> Tuple[Dict[str, object], List[str]]:
+    # items maps diner name -> the per-diner section of the prompt
+    async def call(prompt: str, count: int) -> str:
+        async with semaphore:
+            return await chat_completion(
+                system_prompt=system_prompt,
+                user_prompt=prompt,
+                max_tokens=tokens_per_item * count,
+                task=task
+            )
+
+    results, failed, sent_tokens = await run_batches(
+        items, instructions, call, validate, PROMPT_TOKEN_BUDGET, LLM_BATCH_MAX_ITEMS
+    )
+    # Savings against sending one prompt (and one copy of the instructions) per diner
+    naive_tokens = sum(estimate_tokens(single_prompt(text)) for text in items.values())
+    prompt_report.record(task, naive_tokens, sent_tokens)
+    return results, failed
+
 @app.get("/daily-stats")
-def get_daily_stats():
-    if not hasattr(app.state, "dining_data"):
+def get_daily_stats(location: Optional[str] = None, date: Optional[str] = None):
+    service = resolve_service(location, date)
+    if not hasattr(app.state, "store"):
         return {
+            **service_info(service),
             "total_reservations": 0,
             "total_guests": 0,
             "special_events": 0
         }
 
-    total_reservations = 0
-    total_guests = 0
-    special_events = 0
+    # Totals are maintained per service by the store and the special event
+    # cache as they change, so this costs the same for any history size
+    return {
+        **service_info(service),
+        **app.state.store.stats(service),
+        "special_events": state.counter(scoped("special_events", service_scope(service)))
+    }
+
+@app.get("/services")
+async def get_services():
+    # Every (location, date) with reservations, with its totals
+    return {
+        "services": [{
+            **service_info(service),
+            **app.state.store.stats(service),
+            "special_events": state.counter(scoped("special_events", service_scope(service)))
+        } for service in sorted(app.state.store.partitions, key=lambda key: (key[0], key[1] or ""))]
+    }
+
+# Encoded GET /dining-data projections (see projection.py), one per view for
+# the current store version
+projections = ProjectionCache()
+
+# Named views serialized as soon as the dataset loads; the full view (which
+# decodes every diner of a snapshot) is built on first request
+PROJECTION_WARM_VIEWS = ("summary", "host")
+
+def projection_rows(view) -> List[Row]:
+    # Copied on the event loop so the encoding thread never reads a list the
+    # store is appending to
+    store = app.state.store
+    details = needs_details(view)
+    return [
+        (name, store.get_diner(name) if details else None, list(store.reservations_by_diner.get(name, ())))
+        for name in store.diner_names
+    ]
+
+async def build_projection(view, version: int) -> Encoded:
+    encoded = await asyncio.to_thread(encode, version, projection_rows(view), view)
+    projections.put(view, encoded)
+    return encoded
+
+async def projection(view) -> Encoded:
+    # The view for the current store version; concurrent requests and the
+    # background rebuild share one encoding
+    version = app.state.store.version
+    encoded = projections.get(view, version)
+    if encoded is None:
+        encoded = await singleflight.do(("encode_projection", view, version), build_projection, view, version)
+    return encoded
 
-    # Process each diner's data
-    for diner in app.state.dining_data.get("diners", []):
-        # Count reservations and guests
-        reservations = diner.get("reservations", [])
-        total_reservations += len(reservations)
-        total_guests += sum(r.get("number_of_people", 0) for r in reservations)
+def warm_projections(views=None):
+    # Re-encodes the views served so far (or the given ones) after the store
+    # changed, ahead of the next request for them
+    views = projections.views() if views is None else views
+    precompute.schedule("dining-data", [
+        ((False, 0, -1, 0), "projection", view if isinstance(view, str) else "fields", partial(projection, view))
+        for view in views
+    ], replace=("projection",))
 
-    # Get special events count from cache
-    if hasattr(app.state, "special_events_cache"):
-        special_events = sum(1 for value in app.state.special_events_cache.values() if value is not None)
+@app.get("/dining-data")
+async def get_dining_data(request: Request, view: str = "full", fields: Optional[str] = None):
+    # The dataset or a projection of it: ?view=summary|host|full, or a field
+    # selection such as ?fields=name,reservations.start_time. Served from
+    # pre-encoded buffers, compressed per Accept-Encoding.
+    if fields is not None:
+        try:
+            key = parse_fields(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {e}")
+    elif view in VIEWS:
+        key = view
+    else:
+        raise HTTPException(status_code=400, detail=f"Unknown view: {view}. Use one of {', '.join(VIEWS)}")
+    encoded = await projection(key)
+    body, content_encoding = encoded.body(request.headers.get("accept-encoding", ""))
+    # Each encoding is a different representation, so it gets its own ETag
+    etag = encoded.etag if content_encoding is None else f'{encoded.etag[:-1]}-{content_encoding}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    return Response(body, media_type="application/json", headers=headers)
 
+@app.get("/dining-data/views")
+async def get_dining_data_views():
+    # Encoder, available encodings and the size of every encoded view
+    return {"store_version": app.state.store.version, **projections.stats()}
+
+# Largest page /reservations will return
+RESERVATIONS_PAGE_LIMIT = 500
+
+def parse_minutes_param(name: str, value: Optional[str], default: int) -> int:
+    if value is None:
+        return default
+    try:
+        return to_minutes(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} time: {value}")
+
+@app.get("/reservations")
+async def get_reservations(start: Optional[str] = None, end: Optional[str] = None,
+                           min_party: Optional[int] = None, max_party: Optional[int] = None,
+                           offset: int = 0, limit: int = 50,
+                           location: Optional[str] = None, date: Optional[str] = None):
+    # Reservations starting in [start, end), e.g. ?start=18:00&end=19:00, read
+    # straight off the store's sorted time index
+    service = resolve_service(location, date)
+    start_minute = parse_minutes_param("start", start, 0)
+    end_minute = parse_minutes_param("end", end, 24 * 60)
+    if offset < 0 or not 1 <= limit <= RESERVATIONS_PAGE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"offset must be >= 0 and limit between 1 and {RESERVATIONS_PAGE_LIMIT}")
+
+    matches = [
+        reservation for reservation in app.state.store.reservations_between(start_minute, end_minute, service)
+        if (min_party is None or reservation.number_of_people >= min_party)
+        and (max_party is None or reservation.number_of_people <= max_party)
+    ]
+    page = matches[offset:offset + limit]
     return {
-        "total_reservations": total_reservations,
-        "total_guests": total_guests,
-        "special_events": special_events
+        "total": len(matches),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if offset + limit < len(matches) else None,
+        "reservations": [
+            {
+                "diner_name": reservation.diner_name,
+                "start_time": reservation.start_time,
+                "number_of_people": reservation.number_of_people,
+                "dietary_tags": sorted(set(reservation.dietary_tags))
+            } for reservation in page
+        ]
     }
 
-@app.get("/dining-data")
-async def get_dining_data():
-    return app.state.dining_data
+@app.get("/load-curve")
+async def get_load_curve(start: Optional[str] = None, end: Optional[str] = None, bucket_minutes: int = 15,
+                         location: Optional[str] = None, date: Optional[str] = None):
+    # Covers in house per bucket, using the scheduler's seating duration model
+    if not 5 <= bucket_minutes <= 240:
+        raise HTTPException(status_code=400, detail="bucket_minutes must be between 5 and 240")
+    service = resolve_service(location, date)
+    start_minute = parse_minutes_param("start", start, 0)
+    end_minute = parse_minutes_param("end", end, 48 * 60)
+    curve = app.state.store.load_curve(bucket_minutes, service)
+    buckets = [
+        {"start_time": format_minutes(minute % (24 * 60)), "start_minute": minute, "covers": covers}
+        for minute, covers in curve
+        if start_minute <= minute < end_minute
+    ]
+    return {
+        "bucket_minutes": bucket_minutes,
+        "peak_covers": max((bucket["covers"] for bucket in buckets), default=0),
+        "buckets": buckets
+    }
 
-# Initialize waiter attendance state
-@app.on_event("startup")
-async def init_attendance():
-    app.state.attendance = []
+# Attempts at a conditional assignment write before POST /attendance gives up
+ASSIGNMENT_WRITE_ATTEMPTS = 3
 
 @app.post("/attendance")
 async def update_attendance(attendance: WaiterAttendance):
-    app.state.attendance = attendance.waiter_ids
-    
-    # Clear any existing assignments, summary cache, and diner reservations
-    if hasattr(app.state, "table_assignments"):
-        app.state.table_assignments = {}
-    if hasattr(app.state, "waiter_summaries"):
-        app.state.waiter_summaries = {}
-    if hasattr(app.state, "diner_reservations"):
-        app.state.diner_reservations = {}
-    if hasattr(app.state, "summary_cache"):
-        app.state.summary_cache = {}
-    
     # When attendance is updated, reassign tables
-    if hasattr(app.state, "dining_data"):
-        assignments = await assign_tables(attendance.waiter_ids, app.state.dining_data)
-        app.state.table_assignments = assignments
+    solver = attendance.solver or ASSIGNMENT_SOLVER
+    if solver not in ASSIGNMENT_SOLVERS:
+        raise HTTPException(status_code=400, detail=f"solver must be one of: {', '.join(ASSIGNMENT_SOLVERS)}")
+    unknown = waiters_file.roster.unknown(attendance.waiter_ids)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown waiter ids: {', '.join(map(str, unknown))}")
+    service = resolve_service(attendance.location, attendance.date)
+    scope = service_scope(service)
+    summaries = scoped("waiter_summaries", scope)
+    if hasattr(app.state, "store"):
+        # The new assignment is written only if no other worker replaced the
+        # one it was derived from; otherwise it is recomputed from theirs
+        for _ in range(ASSIGNMENT_WRITE_ATTEMPTS):
+            version, _, previous_assignments = current_assignment(scope)
+            epoch = assignment_epoch(scope)
+            # Asking for the optimal solver always re-solves the whole shift
+            delta = bool(previous_assignments) and not attendance.full_reassign and solver == "greedy"
+            solver_result = None
+            if delta:
+                # Delta mode: only move the tables the roster change affects
+                try:
+                    assignments, changed = rebalance(previous_assignments, attendance.waiter_ids,
+                                                     waiters_file.roster.limits())
+                except InfeasibleAssignment:
+                    # Moving the displaced tables alone cannot staff them; re-solve the shift
+                    delta = False
+            if not delta:
+                try:
+                    assignments, solver_result = await assign_tables(attendance.waiter_ids, app.state.store, solver, service)
+                except InfeasibleAssignment as e:
+                    raise infeasible_response(e)
+            assignments = finalize_assignments(assignments)
+            if not delta:
+                epoch += 1
+            new_version = state.put_snapshot(scoped("assignments", scope), {
+                "waiter_ids": attendance.waiter_ids,
+                "epoch": epoch,
+                "assignments": [[waiter_id, tables] for waiter_id, tables in assignments.items()]
+            }, expected_version=version)
+            if new_version is not None:
+                break
+        else:
+            raise HTTPException(status_code=409, detail="Attendance was changed concurrently, please retry")
+
+        if delta:
+            # Drop the briefings of waiters whose tables actually changed and
+            # requeue the briefings; the enrichment pass carries on
+            for waiter_id in state.items(summaries):
+                if int(waiter_id) in changed or int(waiter_id) not in assignments:
+                    state.delete(summaries, waiter_id)
+            warm_service(service, epoch, enrich=False)
+        else:
+            state.clear(summaries)
+            # Enrich the assigned diners and write the briefings in the background
+            warm_service(service, epoch)
+
+        explanation = await explain_assignments(attendance.waiter_ids, assignments)
         
         formatted_assignments = []
         for waiter_id in attendance.waiter_ids:
-            # Sort tables by time
-            tables = sorted(
-                assignments.get(waiter_id, []),
-                key=lambda x: parse_time(x["start_time"]).strftime("%H:%M")
-            )
             formatted_assignments.append({
                 "waiter_id": waiter_id,
                 "waiter_name": get_waiter_name(waiter_id),
-                "tables": tables
+                "tables": assignments.get(waiter_id, [])
             })
         
-        return {
+        response = {
             "message": "Attendance updated and tables reassigned",
+            **service_info(service),
             "present_count": len(attendance.waiter_ids),
             "assignments": formatted_assignments
         }
+        if explanation:
+            response["explanation"] = explanation
+        if solver_result is not None:
+            response["solver"] = solver_report(solver_result)
+        return response
     
+    state.put_snapshot(scoped("assignments", scope), {
+        "waiter_ids": attendance.waiter_ids,
+        "epoch": assignment_epoch(scope) + 1,
+        "assignments": []
+    })
     return {
         "message": "Attendance updated successfully",
         "present_count": len(attendance.waiter_ids)
     }
 
-async def generate_waiter_summary(waiter_name: str, tables: List[dict]) -> str:
-    if not tables:
-        return "No tables assigned for today."
-    # Gather detailed information from diner_reservations
-    table_info = []
+def place_table(scope: str, table: dict) -> Optional[int]:
+    # Adds one new table to a current assignment on the least-loaded waiter,
+    # leaving every other table where it is. Returns the waiter id, or None when
+    # nobody is on shift yet (the next POST /attendance seats it), the table
+    # fits no waiter on shift, or it is already assigned, e.g. by another
+    # worker reloading the same file.
+    for _ in range(ASSIGNMENT_WRITE_ATTEMPTS):
+        version, snapshot = state.get_snapshot(scoped("assignments", scope))
+        if not snapshot or not snapshot["waiter_ids"] or not snapshot["assignments"]:
+            return None
+        assignments = {waiter_id: tables for waiter_id, tables in snapshot["assignments"]}
+        if any(
+            existing["diner_name"] == table["diner_name"] and existing["start_time"] == table["start_time"]
+            for tables in assignments.values() for existing in tables
+        ):
+            return None
+        waiter_id = least_loaded(assignments, snapshot["waiter_ids"], table, waiters_file.roster.limits())
+        if waiter_id is None:
+            log_event("table fits no waiter on shift", logging.WARNING, diner=table["diner_name"],
+                      start_time=table["start_time"], scope=scope)
+            return None
+        assignments.update(finalize_assignments({waiter_id: assignments.get(waiter_id, []) + [table]}))
+        new_version = state.put_snapshot(scoped("assignments", scope), {
+            **snapshot,
+            "assignments": [[waiter_id, tables] for waiter_id, tables in assignments.items()]
+        }, expected_version=version)
+        if new_version is not None:
+            state.delete(scoped("waiter_summaries", scope), str(waiter_id))
+            return waiter_id
+    raise HTTPException(status_code=409, detail="Attendance was changed concurrently, please retry")
+
+def place_reservation(reservation: Reservation) -> Dict[str, int]:
+    # Seats a new reservation in the unscoped assignment and in its own
+    # service's assignment, where those exist. Returns scope -> waiter id.
+    if reservation.start_minute is None:
+        log_event("reservation not assignable", logging.WARNING, diner=reservation.diner_name)
+        return {}
+    table = reservation.table()
+    placed = {}
+    for scope in ("", service_scope(reservation.service)):
+        waiter_id = place_table(scope, table)
+        if waiter_id is not None:
+            placed[scope] = waiter_id
+    return placed
+
+def reindex_preferences(diner_name: str):
+    engine = app.state.preference_engine
+    diner = app.state.store.get_diner(diner_name)
+    if engine is not None and diner is not None:
+        engine.upsert(diner)
+
+def refresh_diner(diner_name: str):
+    # Reviews or emails changed: drop what was derived from them, so
+    # enrich_added_diners detects it again
+    state.delete("allergies", diner_name)
+    state.delete("preferences", diner_name)
+    forget_special_event(diner_name)
+    scopes = [""] + [service_scope(service) for service in app.state.store.services_of(diner_name)]
+    for scope in scopes:
+        for waiter_id, tables in current_assignment(scope)[2].items():
+            if any(table["diner_name"] == diner_name for table in tables):
+                state.delete(scoped("waiter_summaries", scope), str(waiter_id))
+
+async def apply_dataset_changes(diners: List[dict]) -> dict:
+    # Diners that are new or edited in the dataset file, applied in place
+    result = {"diners_changed": len(diners), "reservations_added": 0, "tables_assigned": 0}
+    # scope -> diners to enrich there
+    to_enrich: Dict[str, List[str]] = {}
+    for diner in diners:
+        added, details_changed = app.state.store.merge_diner(diner)
+        result["reservations_added"] += len(added)
+        reindex_preferences(diner["name"])
+        if details_changed:
+            refresh_diner(diner["name"])
+            for scope in [""] + [service_scope(service) for service in app.state.store.services_of(diner["name"])]:
+                if diner["name"] in assigned_diner_names(scope):
+                    to_enrich.setdefault(scope, []).append(diner["name"])
+        for reservation in added:
+            placed = place_reservation(reservation)
+            result["tables_assigned"] += len(placed)
+            for scope in placed:
+                to_enrich.setdefault(scope, []).append(diner["name"])
+    for scope, names in to_enrich.items():
+        enrich_added_diners(list(dict.fromkeys(names)), scope)
+    if diners:
+        warm_projections()
+    return result
+
+async def apply_shared_ingests():
+    # Reservations POSTed to other workers (or before a restart) reach this
+    # worker's store through the shared state; they are already assigned
+    applied = False
+    for key, entry in state.items("ingested").items():
+        if key not in app.state.applied_ingests:
+            app.state.store.merge_diner(entry)
+            reindex_preferences(entry["name"])
+            app.state.applied_ingests.add(key)
+            applied = True
+    if applied:
+        warm_projections()
+
+async def sync_dataset(interval_seconds: float):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await apply_shared_ingests()
+            if app.state.dataset_watcher is not None:
+                await app.state.dataset_watcher.reload()
+            await waiters_file.reload()
+        except Exception as e:
+            log_event("dataset sync failed", logging.ERROR, error=str(e))
+
+class ReservationIngest(BaseModel):
+    diner_name: str
+    start_time: str
+    number_of_people: int
+    orders: List[Order] = []
+    location: Optional[str] = None
+    date: Optional[str] = None
+    # Optional note from the guest, kept as an email so enrichment reads it
+    note: Optional[str] = None
+
+@app.post("/reservations", status_code=201)
+async def ingest_reservation(ingest: ReservationIngest):
+    # Walk-ins and late bookings: indexed, seated with the least-loaded waiter
+    # and enriched on their own, without a restart or a full reassignment
+    try:
+        to_minutes(ingest.start_time)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid start_time: {ingest.start_time}")
+    if ingest.number_of_people < 1:
+        raise HTTPException(status_code=400, detail="number_of_people must be at least 1")
+    # Same service rules as the query endpoints: a location needs a date
+    resolve_service(ingest.location, ingest.date)
+
+    reservation = {
+        "number_of_people": ingest.number_of_people,
+        "orders": [order.dict() for order in ingest.orders],
+        "start_time": ingest.start_time
+    }
+    # Reservations at the default location without a date keep the dataset's shape
+    if ingest.location and ingest.location != DEFAULT_LOCATION:
+        reservation["location"] = ingest.location
+    if ingest.date and ingest.date != "undated":
+        reservation["date"] = ingest.date
+    # Rejected before it is stored when the staff on shift cannot take it
+    record = Reservation.from_dict(ingest.diner_name, reservation)
+    for scope in ("", service_scope(record.service)):
+        _, waiter_ids, table_assignments = current_assignment(scope)
+        if table_assignments and least_loaded(table_assignments, waiter_ids, record.table(),
+                                              waiters_file.roster.limits()) is None:
+            raise HTTPException(status_code=422, detail="No waiter on shift can take this reservation")
+    diner = {"name": ingest.diner_name, "reservations": [reservation]}
+    if ingest.note:
+        known = app.state.store.get_diner(ingest.diner_name)
+        emails = [email.as_dict() for email in known.emails] if known else []
+        diner["emails"] = emails + [{"subject": "Reservation note", "combined_thread": ingest.note}]
+
+    added, details_changed = app.state.store.merge_diner(diner)
+    if not added:
+        raise HTTPException(status_code=409, detail="Reservation already exists")
+    key = f"{ingest.diner_name}\x00{json.dumps(reservation, sort_keys=True)}"
+    state.set("ingested", key, diner)
+    app.state.applied_ingests.add(key)
+    reindex_preferences(ingest.diner_name)
+    if details_changed:
+        refresh_diner(ingest.diner_name)
+
+    warm_projections()
+
+    placed = place_reservation(added[0])
+    for scope in placed:
+        enrich_added_diners([ingest.diner_name], scope)
+    log_event("reservation ingested", diner=ingest.diner_name, start_time=ingest.start_time, assignments=len(placed))
+    return {
+        "message": "Reservation added" + (" and assigned" if placed else ""),
+        "diner_name": ingest.diner_name,
+        "start_time": added[0].start_time,
+        **service_info(added[0].service),
+        # One entry per assignment the table joined: the unscoped one and/or its service's
+        "assigned_to": [{
+            **service_info(added[0].service if scope else None),
+            "waiter_id": waiter_id,
+            "waiter_name": get_waiter_name(waiter_id)
+        } for scope, waiter_id in placed.items()]
+    }
+
+@app.get("/waiters")
+async def get_waiters(at: Optional[str] = None):
+    # The roster, or the waiters on shift at a time of day (?at=19:30)
+    roster = waiters_file.roster
+    waiters = roster.waiters if at is None else roster.on_shift(parse_minutes_param("at", at, 0))
+    return {
+        "waiters": [waiter.as_dict() for waiter in waiters],
+        "sections": roster.sections
+    }
+
+@app.post("/waiters/reload")
+async def reload_waiters():
+    # Re-reads the roster file now instead of at the next poll
+    loaded = await waiters_file.reload(force=True)
+    return {
+        "message": "Waiter roster reloaded" if loaded else "Waiter roster could not be read",
+        **waiters_file.stats()
+    }
+
+@app.post("/dataset/reload")
+async def reload_dataset():
+    # Applies edits to the dataset file now instead of at the next poll
+    watcher = app.state.dataset_watcher
+    if watcher is None:
+        raise HTTPException(status_code=400, detail="Hot reload needs the JSON dataset; snapshots are rebuilt offline")
+    result = await watcher.reload(force=True)
+    return {
+        "message": "Dataset reloaded" if result is not None else "Dataset could not be read",
+        "changes": result,
+        **watcher.stats()
+    }
+
+WAITER_SUMMARY_SYSTEM_PROMPT = "You are a helpful restaurant manager providing concise briefings to waiters. Extract and summarize key information about allergies and special events from the raw data."
+
+SUMMARY_COLUMNS = ["diner", "time", "guests", "notes"]
+
+def waiter_table_rows(tables: List[dict]) -> Tuple[List[dict], List[dict], int]:
+    # Compact rows for the prompt, the rows the old prompt embedded (for the
+    # savings report) and the guest total
+    rows = []
+    naive_rows = []
     total_guests = 0
-    time_range = f"{tables[0]['start_time']} to {tables[-1]['start_time']}"
     for table in tables:
         diner_name = table['diner_name']
-        if hasattr(app.state, 'diner_reservations') and diner_name in app.state.diner_reservations:
-            diner_data = app.state.diner_reservations[diner_name]
-            diner = diner_data['diner']
-            reservation = diner_data['reservation']
-
-            # Extract only relevant dietary information and special requests
-            dietary_info = []
-            special_requests = []
-            
-            # Process emails for dietary info and special requests
-            for email in diner.get('emails', []):
-                content = email.get('combined_thread', '')
-                if 'allerg' in content.lower() or 'diet' in content.lower():
-                    dietary_info.append(content)
-                if 'special' in content.lower() or 'request' in content.lower():
-                    special_requests.append(content)
-
-            # Get dietary tags from orders
-            dietary_tags = []
-            for order in reservation.get('orders', []):
-                dietary_tags.extend(order.get('dietary_tags', []))
-
-            # Check for special events
-            special_event = None
-            if diner.get('emails'):
-                # result = await detect_special_event(diner['emails'][0].get('combined_thread', ''))
-                # if result['is_special_event']:
-                special_event = diner['emails'][0].get('combined_thread', '') # result['event_type']
-
-            table_info.append({
-                'diner': diner_name,
-                'time': reservation.get('start_time'),
-                'guests': reservation.get('number_of_people', 0),
-                'dietary_info': dietary_info,
-                'dietary_tags': dietary_tags,
-                'special_requests': special_requests,
-                'special_event': special_event
-            })
-            total_guests += reservation.get('number_of_people', 0)
+        diner_data = app.state.store.lookup(diner_name)
+        if diner_data is None:
+            continue
+        diner = diner_data['diner']
+        reservation = diner_data['reservation']
 
-    # Create the prompt with the filtered data
-    prompt = f"""As a restaurant manager, write a 2-3 sentence briefing for {waiter_name} about their tables for today. Here's the information:
+        # Extract only relevant dietary information and special requests
+        dietary_info = []
+        special_requests = []
+        for email in diner.emails:
+            content = email.combined_thread
+            if 'allerg' in content.lower() or 'diet' in content.lower():
+                dietary_info.append(content)
+            if 'special' in content.lower() or 'request' in content.lower():
+                special_requests.append(content)
+        special_event = diner.emails[0].combined_thread if diner.emails else None
+
+        # Get dietary tags from orders
+        dietary_tags = reservation.dietary_tags if reservation is not None else ()
+
+        # The three email-derived fields overlap heavily; each thread is sent once
+        notes = list(dict.fromkeys(dietary_info + special_requests + ([special_event] if special_event else [])))
+        guests = reservation.number_of_people if reservation is not None else 0
+        rows.append({
+            'diner': diner_name,
+            'time': table['start_time'],
+            'guests': guests,
+            'notes': (notes + [f"orders: {', '.join(dietary_tags)}"]) if dietary_tags else notes
+        })
+        naive_rows.append({
+            'diner': diner_name,
+            'guests': guests,
+            'dietary_notes': dietary_info,
+            'special_requests': special_requests,
+            'special_event': special_event
+        })
+        total_guests += guests
+    return rows, naive_rows, total_guests
+
+async def condense_table_notes(rows: List[dict]) -> str:
+    # Used when a waiter's tables do not fit one prompt: each chunk is reduced
+    # to one line per table in parallel before the briefing is written
+    prompt = f"""Reduce the notes for each of these restaurant tables to one short line: diner name, party size, and only allergies, dietary restrictions, special events or requests.
+
+{tabular(rows, SUMMARY_COLUMNS)}"""
+    try:
+        content = await chat_completion(
+            system_prompt="You condense reservation notes for a restaurant briefing. Output one line per table.",
+            user_prompt=prompt,
+            max_tokens=40 * len(rows),
+            task="condense_table_notes"
+        )
+        return content.strip()
+    except Exception as e:
+        mark_degraded("table_notes")
+        log_event("table notes condensing failed", logging.WARNING, error=str(e))
+        return tabular(rows, ["diner", "guests"])
+
+def build_waiter_summary_prompt(waiter_name: str, table_count: int, total_guests: int,
+                                time_range: str, table_section: str) -> str:
+    return f"""As a restaurant manager, write a 2-3 sentence briefing for {waiter_name} about their tables for today. Here's the information:
 
     Overview:
-    - {total_guests} total guests across {len(tables)} tables from {time_range}
+    - {total_guests} total guests across {table_count} tables from {time_range}
 
     Table Details:
-    {json.dumps([{
-        'diner': info['diner'],
-        'guests': info['guests'],
-        'dietary_notes': info['dietary_info'],
-        'special_requests': info['special_requests'],
-        'special_event': info['special_event']
-    } for info in table_info], indent=2)}
+    {table_section}
 
     Write a concise summary focusing on:
     1. Total guest count and timing
@@ -433,182 +1289,632 @@ async def generate_waiter_summary(waiter_name: str, tables: List[dict]) -> str:
     bring her 10-year old daughter for her first French cuisine experience. 
     Other guests have requested specific wines, permission to take photos, 
     or specific table placements due to mobility issues. No large parties today, mostly tables of two. Good luck!"""
-    print(f'Generating summary for {waiter_name}...')
+
+async def prepare_waiter_summary(waiter_name: str, tables: List[dict]) -> Tuple[str, str]:
+    # Returns the briefing prompt and the plain fallback used when the model fails
+    rows, naive_rows, total_guests = waiter_table_rows(tables)
+    time_range = f"{tables[0]['start_time']} to {tables[-1]['start_time']}"
+    fallback = f"You have {total_guests} guests across {len(tables)} tables from {time_range}."
+
+    table_section = tabular(rows, SUMMARY_COLUMNS)
+    if estimate_tokens(table_section) > PROMPT_TOKEN_BUDGET:
+        chunks = chunk_rows(rows, SUMMARY_COLUMNS, PROMPT_TOKEN_BUDGET)
+        condensed = await asyncio.gather(*(condense_table_notes(chunk) for chunk in chunks))
+        table_section = "\n".join(condensed)
+
+    prompt = build_waiter_summary_prompt(waiter_name, len(tables), total_guests, time_range, table_section)
+    naive_tokens = estimate_tokens(prompt) - estimate_tokens(table_section) + estimate_tokens(naive_encoding(naive_rows))
+    prompt_report.record("generate_waiter_summary", naive_tokens, estimate_tokens(prompt))
+    return prompt, fallback
+
+async def generate_waiter_summary(waiter_name: str, tables: List[dict]) -> str:
+    if not tables:
+        return "No tables assigned for today."
+    prompt, fallback = await prepare_waiter_summary(waiter_name, tables)
     try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{
-                "role": "system",
-                "content": "You are a helpful restaurant manager providing concise briefings to waiters. Extract and summarize key information about allergies and special events from the raw data."
-            }, {
-                "role": "user",
-                "content": prompt
-            }],
-            temperature=0.7,
-            max_tokens=200
+        content = await chat_completion(
+            system_prompt=WAITER_SUMMARY_SYSTEM_PROMPT,
+            user_prompt=prompt,
+            max_tokens=200,
+            task="generate_waiter_summary"
         )
-        return response.choices[0].message.content.strip()
+        return content.strip()
     except Exception as e:
-        print(f"Error generating waiter summary for {waiter_name}: {e}")
-        return f"You have {total_guests} guests across {len(tables)} tables from {time_range}."
+        mark_degraded("waiter_summary")
+        log_event("waiter summary failed", logging.WARNING, waiter=waiter_name, error=str(e))
+        return fallback
 
-@app.get("/attendance")
-async def get_attendance():
+async def stream_waiter_summary(waiter_name: str, tables: List[dict]) -> AsyncIterator[str]:
+    # Same briefing as generate_waiter_summary, yielded as text deltas
+    if not tables:
+        yield "No tables assigned for today."
+        return
+    prompt, fallback = await prepare_waiter_summary(waiter_name, tables)
+    streamed = False
     try:
-        if not hasattr(app.state, "attendance"):
-            app.state.attendance = []
-        
-        # Include table assignments if they exist
-        assignments = []
-        if hasattr(app.state, "table_assignments") and app.state.table_assignments:
-            # Initialize summary cache if it doesn't exist
-            if not hasattr(app.state, "waiter_summaries"):
-                app.state.waiter_summaries = {}
-                
-            for waiter_id in app.state.attendance:
-                try:
-                    # Sort tables by time
-                    tables = sorted(
-                        app.state.table_assignments.get(waiter_id, []),
-                        key=lambda x: parse_time(x["start_time"]).strftime("%H:%M")
-                    )
-                    
-                    # Initialize allergies as loading state
-                    for table in tables:
-                        if "_diner_data" in table and "_reservation_data" in table:
-                            table["allergies"] = "Loading..."
-                            # Keep the diner and reservation data for later use
-                            if not hasattr(app.state, "diner_reservations"):
-                                app.state.diner_reservations = {}
-                            app.state.diner_reservations[table["diner_name"]] = {
-                                "diner": table["_diner_data"],
-                                "reservation": table["_reservation_data"]
-                            }
-                            # Remove temporary fields
-                            del table["_diner_data"]
-                            del table["_reservation_data"]
-                    
-                    waiter_name = get_waiter_name(waiter_id)
-                    # Use cached summary if available
-                    if waiter_id in app.state.waiter_summaries:
-                        summary = app.state.waiter_summaries[waiter_id]
-                    else:
-                        # Generate new summary only if not cached
-                        print(f"Debug: Generating summary for waiter {waiter_name}")
-                        summary = await generate_waiter_summary(waiter_name, tables)
-                        app.state.waiter_summaries[waiter_id] = summary
-                    
-                    assignment = {
-                        "waiter_id": waiter_id,
-                        "waiter_name": waiter_name,
-                        "summary": summary,
-                        "tables": tables
-                    }
-                    assignments.append(assignment)
-                except Exception as e:
-                    print(f"Debug: Error processing waiter {waiter_id}: {str(e)}")
-                    raise HTTPException(status_code=500, detail=f"Error processing waiter {waiter_id}: {str(e)}")
+        async for delta in chat_completion_stream(
+            system_prompt=WAITER_SUMMARY_SYSTEM_PROMPT,
+            user_prompt=prompt,
+            max_tokens=200,
+            task="generate_waiter_summary"
+        ):
+            streamed = True
+            yield delta
+    except Exception as e:
+        mark_degraded("waiter_summary")
+        log_event("waiter summary stream failed", logging.WARNING, waiter=waiter_name, error=str(e))
+        if not streamed:
+            yield fallback
+
+def cached_waiter_summary(waiter_id: int, tables: List[dict], scope: str = "") -> Optional[str]:
+    # Briefings are stored with the tables they describe and only served for that
+    # exact table list, so a briefing written for an older assignment by any
+    # worker is never shown against a newer one
+    entry = state.get(scoped("waiter_summaries", scope), str(waiter_id))
+    if entry is None or entry["diners"] != [table["diner_name"] for table in tables]:
+        return None
+    return entry["summary"]
+
+def store_waiter_summary(waiter_id: int, tables: List[dict], summary: str, scope: str = ""):
+    state.set(scoped("waiter_summaries", scope), str(waiter_id), {
+        "diners": [table["diner_name"] for table in tables],
+        "summary": summary
+    })
+    # Invalidates every worker's cached GET /attendance body
+    state.incr("summaries_generation")
+
+async def ensure_waiter_summary(waiter_id: int, tables: List[dict], scope: str = "") -> str:
+    # Use cached summary if available, generate it otherwise. Concurrent requests
+    # for the same waiter and table list share one generation.
+    summary = cached_waiter_summary(waiter_id, tables, scope)
+    if summary is None:
+        key = ("generate_waiter_summary", waiter_id, tuple(table["diner_name"] for table in tables))
+        summary, degraded = await singleflight.do(
+            key, tracked, generate_waiter_summary, get_waiter_name(waiter_id), tables
+        )
+        if degraded:
+            report(degraded)
         else:
-            print("Debug: No table assignments found")
-        
-        response = {
-            "waiter_ids": app.state.attendance,
-            "assignments": assignments
-        }
-        return response
+            store_waiter_summary(waiter_id, tables, summary, scope)
+    return summary
+
+# Serialized GET /attendance bodies: scope -> (key, body, ETag)
+attendance_bodies: Dict[str, Tuple[Tuple[int, int, int], bytes, str]] = {}
+
+async def attendance_body(service: Optional[ServiceKey]) -> Tuple[bytes, Optional[str]]:
+    # (body, ETag) of GET /attendance for a service. The body only changes with
+    # the assignment, a stored briefing or the roster (waiter names), so it is
+    # serialized once per (assignment version, briefing generation, roster
+    # reload). Bodies with fallback briefings are never cached and have no ETag.
+    scope = service_scope(service)
+    version, waiter_ids, table_assignments = current_assignment(scope)
+    key = (version, state.counter("summaries_generation"), waiters_file.reloads)
+    cached = attendance_bodies.get(scope)
+    if cached is None or cached[0] != key:
+        attendance, degraded = await tracked(build_attendance, waiter_ids, table_assignments, scope)
+        attendance = {**service_info(service), **attendance}
+        body = json.dumps(attendance, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if degraded:
+            report(degraded)
+            return body, None
+        cached = (key, body, f'"{hashlib.sha1(body).hexdigest()}"')
+        attendance_bodies[scope] = cached
+    return cached[1], cached[2]
+
+@app.get("/attendance")
+async def get_attendance(request: Request, location: Optional[str] = None, date: Optional[str] = None):
+    service = resolve_service(location, date)
+    try:
+        body, etag = await attendance_body(service)
+        if etag is None:
+            # Fallback briefings are served but never cached or revalidated
+            return Response(body, media_type="application/json", headers={"Cache-Control": "no-store"})
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Debug: Error in get_attendance: {str(e)}")
+        log_event("get_attendance failed", logging.ERROR, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/preferences/{diner_name}")
-async def get_preferences(diner_name: str):
-    # Initialize preferences cache if it doesn't exist
-    if not hasattr(app.state, "preferences_cache"):
-        app.state.preferences_cache = {}
+async def build_attendance(waiter_ids: List[int], table_assignments: Dict[int, List[dict]], scope: str = "") -> dict:
+    # Include table assignments if they exist
+    assignments = []
+    if table_assignments:
+        waiter_tables = {waiter_id: table_assignments.get(waiter_id, []) for waiter_id in waiter_ids}
+        try:
+            # Missing summaries are generated concurrently rather than one after another
+            summaries = await asyncio.gather(*(
+                ensure_waiter_summary(waiter_id, tables, scope)
+                for waiter_id, tables in waiter_tables.items()
+            ))
+        except Exception as e:
+            log_event("summary generation failed", logging.ERROR, error=str(e))
+            raise HTTPException(status_code=500, detail=f"Error generating summaries: {str(e)}")
 
-    # Check cache first
-    if diner_name in app.state.preferences_cache:
-        return app.state.preferences_cache[diner_name]
+        for (waiter_id, tables), summary in zip(waiter_tables.items(), summaries):
+            assignments.append({
+                "waiter_id": waiter_id,
+                "waiter_name": get_waiter_name(waiter_id),
+                "summary": summary,
+                "tables": tables
+            })
 
-    try:
-        if not hasattr(app.state, "diner_reservations") or diner_name not in app.state.diner_reservations:
-            raise HTTPException(status_code=404, detail="Diner not found")
+    return {
+        "waiter_ids": waiter_ids,
+        "assignments": assignments
+    }
 
-        diner_data = app.state.diner_reservations[diner_name]
-        reviews = diner_data["diner"].get("reviews", [])
-        review_texts = [review.get("content", "") for review in reviews]
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        if not review_texts:
-            app.state.preferences_cache[diner_name] = {"preferences": []}
-            return app.state.preferences_cache[diner_name]
+@app.get("/attendance/stream")
+async def stream_attendance(location: Optional[str] = None, date: Optional[str] = None):
+    # Server-sent events: the assignment skeleton first, then each waiter's
+    # briefing as it is generated. Briefings are produced concurrently and
+    # forwarded token by token as "summary_delta" events.
+    service = resolve_service(location, date)
+    scope = service_scope(service)
+    _, waiter_ids, table_assignments = current_assignment(scope)
+    waiter_tables = {waiter_id: table_assignments.get(waiter_id, []) for waiter_id in waiter_ids}
+    summaries = {waiter_id: cached_waiter_summary(waiter_id, tables, scope) for waiter_id, tables in waiter_tables.items()}
 
-        prompt = f"Based on these reviews from other restaurants: {' '.join(review_texts)}\n\nExtract dining preferences that would be relevant to a French fine dining restaurant. Only include preferences that are generalizable to French cuisine and fine dining. Format the response as a JSON array of strings, each string being a specific preference. If no relevant preferences are found, return an empty array."
+    async def events():
+        yield sse_event("assignments", {
+            **service_info(service),
+            "waiter_ids": waiter_ids,
+            "assignments": [{
+                "waiter_id": waiter_id,
+                "waiter_name": get_waiter_name(waiter_id),
+                "summary": summaries[waiter_id],
+                "tables": tables
+            } for waiter_id, tables in waiter_tables.items()]
+        })
 
-        response = await openai_client.chat.completions.create(
-            model="gpt-4",
-            messages=[{
-                "role": "system",
-                "content": "You are a helpful restaurant assistant that extracts generalized dining preferences from reviews. Only respond with a valid JSON array of strings."
-            }, {
-                "role": "user",
-                "content": prompt
-            }],
-            temperature=0.7,
-            max_tokens=200
-        )
-        # print(f'Prompt: {prompt}')
-        # print("\nResponse from OpenAI:")
-        # print(response.choices[0].message.content)
-        
+        queue = asyncio.Queue()
+
+        async def produce(waiter_id: int, tables: List[dict]):
+            parts = []
+            token, degraded = degradation.open_scope()
+            try:
+                async for delta in stream_waiter_summary(get_waiter_name(waiter_id), tables):
+                    parts.append(delta)
+                    await queue.put(("summary_delta", {"waiter_id": waiter_id, "text": delta}))
+                summary = "".join(parts).strip()
+                event = {"waiter_id": waiter_id, "summary": summary}
+                if degraded:
+                    event["degraded"] = sorted(degraded)
+                else:
+                    store_waiter_summary(waiter_id, tables, summary, scope)
+                await queue.put(("summary", event))
+            finally:
+                degradation.close_scope(token)
+                await queue.put(None)
+
+        pending = [waiter_id for waiter_id in waiter_ids if summaries[waiter_id] is None]
+        tasks = [asyncio.create_task(produce(waiter_id, waiter_tables[waiter_id])) for waiter_id in pending]
         try:
-            content = response.choices[0].message.content.strip()
-            if not content.startswith('[') and not content.endswith(']'):
-                content = f"[{content}]"
-            preferences = json.loads(content)
-            if not isinstance(preferences, list):
-                preferences = []
-            # Clean up preferences
-            preferences = [p.strip('"') for p in preferences if isinstance(p, str)]
-        except (json.JSONDecodeError, AttributeError, IndexError) as e:
-            print(f"Error parsing preferences: {e}")
-            print(f"Raw response: {response.choices[0].message.content if response.choices else 'No content'}")
-            preferences = []
-        app.state.preferences_cache[diner_name] = {"preferences": preferences}
-        return app.state.preferences_cache[diner_name]
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is None:
+                    remaining -= 1
+                    continue
+                yield sse_event(*item)
+            yield sse_event("done", {"waiter_ids": waiter_ids})
+        finally:
+            # Client went away: stop generating briefings nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def local_preferences(diner: Diner) -> List[str]:
+    engine = app.state.preference_engine
+    preferences = engine.preferences(diner.name)
+    if preferences is None:
+        engine.upsert(diner)
+        preferences = engine.preferences(diner.name)
+    return preferences
+
+async def extract_preferences(diner: Diner) -> List[str]:
+    # The taxonomy matches are the answer; the model only rewords them, given
+    # the review sentence behind each, and they are the fallback when it fails
+    preferences = local_preferences(diner)
+    if not preferences:
+        return []
+    evidence = app.state.preference_engine.evidence(diner)
+    matches = "\n".join(f"- {preference}: \"{evidence.get(preference, '')}\"" for preference in preferences)
+
+    prompt = f"Preferences matched for a guest of a French fine dining restaurant, each with the review sentence it came from:\n{matches}\n\nRewrite each preference as a short, specific note for the waiter, keeping the same order. Format the response as a JSON array of strings with one string per preference."
+
+    try:
+        content = await chat_completion(
+            system_prompt="You are a helpful restaurant assistant that phrases guest dining preferences for waiters. Only respond with a valid JSON array of strings.",
+            user_prompt=prompt,
+            max_tokens=200,
+            task="phrase_preferences"
+        )
     except Exception as e:
-        print(f"Error getting preferences: {str(e)}")
-        app.state.preferences_cache[diner_name] = {"preferences": []}
-        return app.state.preferences_cache[diner_name]
+        mark_degraded("preferences")
+        log_event("preference phrasing failed", logging.WARNING, error=str(e))
+        return preferences
 
-@app.get("/allergies/{diner_name}")
-async def get_allergies(diner_name: str):
     try:
-        if not hasattr(app.state, "diner_reservations") or diner_name not in app.state.diner_reservations:
-            raise HTTPException(status_code=404, detail="Diner not found")
+        content = content.strip()
+        if not content.startswith('[') and not content.endswith(']'):
+            content = f"[{content}]"
+        phrased = json.loads(content)
+        if not isinstance(phrased, list):
+            phrased = []
+        # Clean up preferences
+        phrased = [p.strip('"') for p in phrased if isinstance(p, str) and p.strip()]
+        if not phrased:
+            raise ValueError("empty phrasing")
+        return phrased
+    except (json.JSONDecodeError, AttributeError, IndexError, ValueError) as e:
+        mark_degraded("preferences")
+        log_event("preference parse failed", logging.WARNING, error=str(e), raw_response=content)
+        return preferences
+
+# The getters below cache model answers in shared state. Fallback answers are
+# returned (and reported as degraded) but not cached, so they are retried later.
+
+async def get_diner_preferences(diner_name: str, diner: Diner) -> dict:
+    if not PREFERENCE_LLM_PHRASING:
+        # Local matches are cheap and identical on every worker; nothing to cache
+        return {"preferences": local_preferences(diner)}
+    cached = state.get("preferences", diner_name)
+    if cached is None:
+        preferences, degraded = await singleflight.do(
+            ("get_preferences", diner_name), tracked, extract_preferences, diner
+        )
+        cached = {"preferences": preferences}
+        if degraded:
+            report(degraded)
+        else:
+            state.set("preferences", diner_name, cached)
+    return cached
+
+async def get_diner_allergies(diner_name: str, diner: Diner, reservation: Optional[Reservation]) -> str:
+    allergies = state.get("allergies", diner_name)
+    if allergies is None:
+        allergies, degraded = await singleflight.do(
+            ("get_allergies", diner_name), tracked, extract_allergies, diner, reservation
+        )
+        if degraded:
+            report(degraded)
+        else:
+            state.set("allergies", diner_name, allergies)
+    return allergies
+
+def first_email_content(diner: Diner) -> str:
+    # Get first email's content for special event detection
+    return diner.emails[0].combined_thread if diner.emails else ""
+
+def store_special_event(diner_name: str, result: dict) -> dict:
+    # Stored as {"event_type": ...} so "no special event" is distinguishable
+    # from "not computed", with the service scopes whose counters it raised
+    event_type = result["event_type"] if result["is_special_event"] else None
+    scopes = [service_scope(service) for service in app.state.store.services_of(diner_name)] if event_type else []
+    cached = {"event_type": event_type, "scopes": scopes}
+    # Only the first writer across all workers counts the event
+    if state.add("special_events", diner_name, cached) and event_type is not None:
+        state.incr("special_events")
+        for scope in scopes:
+            state.incr(scoped("special_events", scope))
+    return cached
+
+def forget_special_event(diner_name: str):
+    # Drops a diner's detected event and takes it back out of the counters;
+    # only the worker whose delete removed the entry adjusts them
+    cached = state.get("special_events", diner_name)
+    if cached is None or not state.delete("special_events", diner_name):
+        return
+    if cached["event_type"] is not None:
+        state.incr("special_events", -1)
+        for scope in cached.get("scopes", []):
+            state.incr(scoped("special_events", scope), -1)
+
+async def get_diner_special_event(diner_name: str, diner: Diner) -> Optional[str]:
+    cached = state.get("special_events", diner_name)
+    if cached is None:
+        result, degraded = await singleflight.do(
+            ("detect_special_event", diner_name), tracked, detect_special_event, first_email_content(diner)
+        )
+        if degraded:
+            report(degraded)
+            return None
+        cached = store_special_event(diner_name, result)
+    return cached["event_type"]
+
+async def enrich_diners(epoch: int, diner_names: List[str], publish_status: bool = True, scope: str = ""):
+    # Fan out allergy, special event and preference extraction for every assigned
+    # diner, with at most ENRICHMENT_CONCURRENCY model calls in flight at once.
+    # Jobs stop once a full reassignment of the same service (here or on another
+    # worker) replaced assignment `epoch`. With LLM_BATCHING, allergies and
+    # special events go out as multi-diner calls. Passes for ingested diners do
+    # not publish a status.
+    semaphore = asyncio.Semaphore(ENRICHMENT_CONCURRENCY)
+    status = {"state": "running", "completed": 0, "total": 0, "degraded": 0, "epoch": epoch}
+
+    def superseded() -> bool:
+        return assignment_epoch(scope) != epoch
+
+    def publish():
+        if publish_status and not superseded():
+            state.set("enrichment", scoped("status", scope), status)
+
+    async def bounded(fn, *args):
+        async with semaphore:
+            if superseded():
+                return
+            _, degraded = await tracked(fn, *args)
+        status["completed"] += 1
+        if degraded:
+            status["degraded"] += 1
+        publish()
+
+    jobs = []
+    # Batched mode: diner name -> prompt section
+    allergy_items: Dict[str, str] = {}
+    event_items: Dict[str, str] = {}
+    for diner_name in diner_names:
+        diner_data = app.state.store.lookup(diner_name)
+        if diner_data is None:
+            continue
+        diner = diner_data["diner"]
+        reservation = diner_data["reservation"]
+        if PREFERENCE_LLM_PHRASING:
+            jobs.append(bounded(get_diner_preferences, diner_name, diner))
+        if not LLM_BATCHING:
+            jobs.append(bounded(get_diner_allergies, diner_name, diner, reservation))
+            jobs.append(bounded(get_diner_special_event, diner_name, diner))
+            continue
+
+        status["total"] += 2
+        if state.get("allergies", diner_name) is not None:
+            status["completed"] += 1
+        else:
+            result = allergy_rules.extract_for_diner(diner, reservation)
+            if result.ambiguous and ALLERGY_LLM_ESCALATION:
+                allergy_items[diner_name] = allergy_context(diner, reservation)
+            else:
+                metrics.allergy_extractions.inc(path="rules")
+                state.set("allergies", diner_name, result.as_text())
+                status["completed"] += 1
+        email_content = first_email_content(diner)
+        if state.get("special_events", diner_name) is not None:
+            status["completed"] += 1
+        elif email_content:
+            event_items[diner_name] = email_content
+        else:
+            store_special_event(diner_name, {"is_special_event": False, "event_type": None})
+            status["completed"] += 1
+
+    async def allergy_batches():
+        if superseded():
+            return
+        results, failed = await run_extraction_batches(
+            "extract_allergies_batch", ALLERGY_SYSTEM_PROMPT, ALLERGY_BATCH_INSTRUCTIONS, allergy_items,
+            allergy_prompt, valid_allergies, 40, semaphore
+        )
+        metrics.allergy_extractions.inc(len(results), path="llm")
+        # Diners without a valid answer are left uncached; on-demand lookups
+        # retry them and fall back to the local rules
+        for diner_name in failed:
+            mark_degraded("allergies")
+        for diner_name, allergies in results.items():
+            state.set("allergies", diner_name, allergies)
+        status["completed"] += len(allergy_items)
+        status["degraded"] += len(failed)
+        publish()
+
+    async def special_event_batches():
+        if superseded():
+            return
+        results, failed = await run_extraction_batches(
+            "detect_special_event_batch", SPECIAL_EVENT_SYSTEM_PROMPT, SPECIAL_EVENT_BATCH_INSTRUCTIONS, event_items,
+            special_event_prompt, valid_special_event, 30, semaphore
+        )
+        for diner_name in failed:
+            mark_degraded("special_event")
+        for diner_name, result in results.items():
+            store_special_event(diner_name, result)
+        status["completed"] += len(event_items)
+        status["degraded"] += len(failed)
+        publish()
+
+    # Per-diner jobs count once each; batched items were counted above
+    status["total"] += len(jobs)
+    if allergy_items:
+        jobs.append(allergy_batches())
+    if event_items:
+        jobs.append(special_event_batches())
+    publish()
+    try:
+        await asyncio.gather(*jobs)
+        status["state"] = "superseded" if superseded() else "complete"
+    except asyncio.CancelledError:
+        status["state"] = "cancelled"
+        raise
+    except Exception as e:
+        log_event("enrichment failed", logging.ERROR, error=str(e))
+        status["state"] = "failed"
+    finally:
+        publish()
+
+# Enrichment of diners added after the roster pass started; runs beside it
+incremental_enrichment: Set[asyncio.Task] = set()
+
+def enrich_added_diners(diner_names: List[str], scope: str = ""):
+    epoch = assignment_epoch(scope)
+    task = asyncio.create_task(enrich_diners(epoch, diner_names, publish_status=False, scope=scope))
+    incremental_enrichment.add(task)
+    task.add_done_callback(incremental_enrichment.discard)
+    # Their waiters' briefings were dropped; write them again ahead of service
+    warm_service(scope_service(scope), epoch, enrich=False)
+
+def scope_service(scope: str) -> Optional[ServiceKey]:
+    # Inverse of service_scope
+    if not scope:
+        return None
+    location, date = scope.rsplit("/", 1)
+    return location, None if date == "undated" else date
+
+def service_rank(service: Optional[ServiceKey]) -> Tuple[bool, int]:
+    # Today's (and undated) services first, then later ones by date, past ones last
+    if service is None or service[1] is None:
+        return False, 0
+    days = (datetime.date.fromisoformat(service[1]) - datetime.date.today()).days
+    return days < 0, abs(days)
+
+def seating_order(service: Optional[ServiceKey], table_assignments: Dict[int, List[dict]]) -> List[Tuple[int, str]]:
+    # (start minute, diner name) of the service's diners, earliest seated first;
+    # before any roster is posted, every reservation of the service
+    if table_assignments:
+        seats = sorted(
+            (to_minutes(table["start_time"]), table["diner_name"])
+            for tables in table_assignments.values() for table in tables
+        )
+    else:
+        seats = [(reservation.start_minute, reservation.diner_name) for reservation in app.state.store.iter_reservations(service)]
+    seen = set()
+    return [(minute, name) for minute, name in seats if not (name in seen or seen.add(name))]
 
-        diner_data = app.state.diner_reservations[diner_name]
-        allergies = await extract_allergies(diner_data["diner"], diner_data["reservation"])
+def warm_service(service: Optional[ServiceKey], epoch: int, enrich: bool = True, briefings: bool = True):
+    # Queues the warm-up of one service on the precompute scheduler: the
+    # enrichment pass over its diners and each waiter's briefing, earliest
+    # seated first, then the GET /attendance body. Work queued earlier for the
+    # same service and kinds is cancelled.
+    scope = service_scope(service)
+    rank = service_rank(service)
+    _, waiter_ids, table_assignments = current_assignment(scope)
+    jobs = []
+    replace = []
+    if enrich:
+        seats = seating_order(service, table_assignments)
+        if seats:
+            names = [name for _, name in seats]
+            jobs.append(((*rank, seats[0][0], 0), "enrichment", f"{len(names)} diners",
+                         partial(enrich_diners, epoch, names, scope=scope)))
+        replace.append("enrichment")
+    if briefings and table_assignments:
+        for waiter_id in waiter_ids:
+            tables = table_assignments.get(waiter_id, [])
+            first = to_minutes(tables[0]["start_time"]) if tables else 24 * 60
+            jobs.append(((*rank, first, 1), "briefing", f"waiter {waiter_id}",
+                         partial(ensure_waiter_summary, waiter_id, tables, scope)))
+        jobs.append(((*rank, 24 * 60, 2), "attendance", "GET /attendance body", partial(attendance_body, service)))
+        replace.extend(("briefing", "attendance"))
+    precompute.schedule(scope, jobs, replace)
+
+def warm_on_load():
+    # Services that already have an assignment in the shared state (a restart
+    # with a persistent backend) are warmed in full; otherwise the diners of
+    # the next service are enriched ahead of the roster. Each (service, epoch)
+    # is warmed by the first worker to claim it.
+    services = [None] + sorted(app.state.store.partitions, key=lambda service: (service_rank(service), service[0]))
+    warm = [service for service in services if current_assignment(service_scope(service))[2]]
+    if not warm:
+        # A dataset with a single service is warmed as a whole
+        warm = [services[1] if len(services) > 2 else None]
+    for service in warm:
+        scope = service_scope(service)
+        epoch = assignment_epoch(scope)
+        if state.add("precompute_claims", f"{scope}#{epoch}", True):
+            warm_service(service, epoch)
+
+@app.get("/precompute")
+async def get_precompute(location: Optional[str] = None, date: Optional[str] = None):
+    # Progress of this worker's background warm-up for a service
+    service = resolve_service(location, date)
+    return {
+        **service_info(service),
+        **precompute.progress(service_scope(service))
+    }
 
-        # Initialize special events cache if it doesn't exist
-        if not hasattr(app.state, "special_events_cache"):
-            app.state.special_events_cache = {}
+@app.get("/enrichment")
+async def get_enrichment(location: Optional[str] = None, date: Optional[str] = None):
+    # Everything computed so far for the diners in the current assignment
+    service = resolve_service(location, date)
+    scope = service_scope(service)
+    allergies = state.items("allergies")
+    special_events = state.items("special_events")
+    preferences = state.items("preferences") if PREFERENCE_LLM_PHRASING else {}
+    diners = {}
+    for diner_name in assigned_diner_names(scope):
+        entry = {}
+        if diner_name in allergies:
+            entry["allergies"] = allergies[diner_name]
+        if diner_name in special_events:
+            entry["special_event"] = special_events[diner_name]["event_type"]
+        if diner_name in preferences:
+            entry["preferences"] = preferences[diner_name]["preferences"]
+        elif not PREFERENCE_LLM_PHRASING and app.state.preference_engine.preferences(diner_name):
+            entry["preferences"] = app.state.preference_engine.preferences(diner_name)
+        if entry:
+            diners[diner_name] = entry
 
-        # Check cache first
-        if diner_name not in app.state.special_events_cache:
-            # Get first email's content for special event detection
-            emails = diner_data["diner"].get("emails", [])
-            email_content = emails[0].get("combined_thread", "") if emails else ""
-            result = await detect_special_event(email_content)
-            app.state.special_events_cache[diner_name] = result["event_type"] if result["is_special_event"] else None
+    status = state.get("enrichment", scoped("status", scope)) or {"state": "idle", "completed": 0, "total": 0}
+    return {
+        **service_info(service),
+        **status,
+        "diners": diners
+    }
+
+@app.get("/preferences/{diner_name}")
+async def get_preferences(diner_name: str):
+    # Check cache first
+    cached = state.get("preferences", diner_name) if PREFERENCE_LLM_PHRASING else None
+    if cached is not None:
+        return cached
 
+    diner_data = app.state.store.lookup(diner_name)
+    if diner_data is None:
+        log_event("preferences for unknown diner", logging.WARNING, diner=diner_name)
+        return {"preferences": []}
+
+    return await get_diner_preferences(diner_name, diner_data["diner"])
+
+@app.get("/preferences/{diner_name}/similar")
+async def get_similar_guests(diner_name: str, limit: int = 5):
+    # Guests whose matched preferences are closest to this diner's
+    if not 1 <= limit <= 50:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 50")
+    diner = app.state.store.get_diner(diner_name)
+    if diner is None:
+        raise HTTPException(status_code=404, detail=f"Unknown diner: {diner_name}")
+    return {
+        "diner_name": diner_name,
+        "preferences": local_preferences(diner),
+        "similar": app.state.preference_engine.similar(diner_name, limit)
+    }
+
+@app.get("/allergies/{diner_name}")
+async def get_allergies(diner_name: str):
+    diner_data = app.state.store.lookup(diner_name)
+    if diner_data is None:
+        raise HTTPException(status_code=404, detail="Diner not found")
+
+    try:
+        allergies, special_event = await asyncio.gather(
+            get_diner_allergies(diner_name, diner_data["diner"], diner_data["reservation"]),
+            get_diner_special_event(diner_name, diner_data["diner"])
+        )
         return {
             "allergies": allergies,
-            "special_event": app.state.special_events_cache[diner_name]
+            "special_event": special_event
         }
     except Exception as e:
-        print(f"Error getting allergies: {e}")
+        log_event("get_allergies failed", logging.ERROR, diner=diner_name, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if WORKERS > 1 and STATE_BACKEND == "memory":
+        log_event("multiple workers with the memory state backend will not share assignments", logging.WARNING)
+    # Several workers need the app as an import string so each process loads its own copy
+    uvicorn.run("main:app" if WORKERS > 1 else app, host="0.0.0.0", port=8000, workers=WORKERS)
@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import random
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+# Minimal in-process metrics with Prometheus text exposition, plus structured
+# (JSON line) logging with per-call sampling. Labels are passed as keyword
+# arguments and must have low cardinality (route templates, not raw paths).
+
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # label key -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelKey, Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            index = bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', str(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._gauge_sources = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        metric = Counter(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_source(self, fn):
+        # fn() returns [(name, help, [(labels_dict, value), ...]), ...], read at scrape time
+        self._gauge_sources.append(fn)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for source in self._gauge_sources:
+            for name, help_text, samples in source():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(_label_key(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_requests = registry.counter("laudure_http_requests_total", "HTTP requests by route, method and status")
+http_latency = registry.histogram("laudure_http_request_duration_seconds", "HTTP request latency by route and method")
+llm_calls = registry.counter("laudure_llm_calls_total", "Model calls by model, task and outcome")
+llm_latency = registry.histogram("laudure_llm_call_duration_seconds", "Model call latency by model and task")
+llm_tokens = registry.counter("laudure_llm_tokens_total", "Model tokens by model, task and kind (prompt/completion)")
+llm_cache_lookups = registry.counter("laudure_llm_cache_lookups_total", "Response cache lookups by task and result")
+allergy_extractions = registry.counter("laudure_allergy_extractions_total", "Allergy extractions by path (local rules or model)")
+fallbacks = registry.counter("laudure_fallbacks_total", "Degraded results served in place of a model answer, by kind")
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {"level": record.levelname.lower(), "event": record.getMessage()}
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, default=str)
+
+logger = logging.getLogger("laudure")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+def log_event(event: str, level: int = logging.INFO, sample_rate: float = 1.0, **fields):
+    # Routine events pass a sample_rate below 1 so hot paths do not pay for a log line every time
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    logger.log(level, event, extra={"fields": fields})
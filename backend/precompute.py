@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Set, Tuple
+
+from metrics import log_event
+
+# Background warm-up ahead of service. Work is submitted as jobs to a priority
+# queue drained by a fixed pool of worker tasks; lower priority tuples run
+# first, so callers key them on the service date and the minute the affected
+# tables are seated. Jobs belong to a group (one per service) and have a
+# kind; rescheduling a kind in a group drops its queued jobs and cancels the
+# running ones, so a roster change never leaves stale work ahead of new work.
+
+@dataclass
+class Job:
+    group: str
+    kind: str
+    label: str
+    run: Callable[[], Awaitable[Any]]
+
+class PrecomputeScheduler:
+    def __init__(self, workers: int = 4):
+        self.workers = workers
+        # (priority, sequence, job); the sequence keeps equal priorities FIFO
+        self._heap: List[Tuple[tuple, int, Job]] = []
+        self._sequence = itertools.count()
+        # Set whenever jobs are queued; idle workers wait on it
+        self._wake = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[asyncio.Task, Job] = {}
+        # group -> kind -> Counter(queued, running, done, failed, cancelled)
+        self._counts: Dict[str, Dict[str, Counter]] = {}
+        self._updated: Dict[str, float] = {}
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks + list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _count(self, job: Job, field: str, amount: int = 1):
+        self._counts.setdefault(job.group, {}).setdefault(job.kind, Counter())[field] += amount
+        self._updated[job.group] = time.time()
+
+    def cancel(self, group: str, kinds: Iterable[str]):
+        # Drops the group's queued jobs of these kinds and cancels the running ones
+        kinds = set(kinds)
+        if not kinds:
+            return
+        kept = []
+        for entry in self._heap:
+            job = entry[2]
+            if job.group == group and job.kind in kinds:
+                self._count(job, "queued", -1)
+                self._count(job, "cancelled")
+            else:
+                kept.append(entry)
+        if len(kept) != len(self._heap):
+            heapq.heapify(kept)
+            self._heap = kept
+        for task, job in list(self._running.items()):
+            if job.group == group and job.kind in kinds:
+                task.cancel()
+
+    def schedule(self, group: str, jobs: List[Tuple[tuple, str, str, Callable[[], Awaitable[Any]]]],
+                 replace: Iterable[str] = ()):
+        # jobs are (priority, kind, label, coroutine factory). Kinds in
+        # `replace` are cancelled in the group first.
+        self.cancel(group, replace)
+        for priority, kind, label, run in jobs:
+            job = Job(group, kind, label, run)
+            heapq.heappush(self._heap, (priority, next(self._sequence), job))
+            self._count(job, "queued")
+        if jobs:
+            self._wake.set()
+
+    async def _worker(self):
+        while True:
+            while not self._heap:
+                self._wake.clear()
+                await self._wake.wait()
+            _, _, job = heapq.heappop(self._heap)
+            self._count(job, "queued", -1)
+            self._count(job, "running")
+            task = asyncio.create_task(job.run())
+            self._running[task] = job
+            try:
+                await asyncio.shield(task)
+                outcome = "done"
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    # The worker itself is being stopped
+                    task.cancel()
+                    raise
+                outcome = "cancelled"
+            except Exception as e:
+                log_event("precompute job failed", logging.ERROR, group=job.group, kind=job.kind, label=job.label,
+                          error=str(e))
+                outcome = "failed"
+            finally:
+                self._running.pop(task, None)
+                self._count(job, "running", -1)
+            self._count(job, outcome)
+
+    def progress(self, group: str) -> dict:
+        kinds = self._counts.get(group, {})
+        totals = Counter()
+        for counts in kinds.values():
+            totals.update(counts)
+        pending = totals["queued"] + totals["running"]
+        upcoming = sorted(
+            (priority, job.kind, job.label) for priority, _, job in self._heap if job.group == group
+        )[:5]
+        return {
+            "state": "running" if pending else ("idle" if not kinds else "complete"),
+            **{field: totals[field] for field in ("queued", "running", "done", "failed", "cancelled")},
+            "kinds": {
+                kind: {field: counts[field] for field in ("queued", "running", "done", "failed", "cancelled")}
+                for kind, counts in sorted(kinds.items())
+            },
+            "next": [{"kind": kind, "label": label} for _, kind, label in upcoming],
+            "updated_at": self._updated.get(group)
+        }
+
+    def groups(self) -> Set[str]:
+        return set(self._counts)
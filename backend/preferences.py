@@ -0,0 +1,238 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from allergy_rules import is_negator
+from records import Diner
+
+# Local preference engine. Review sentences are embedded as bags of words and
+# word pairs and matched against exemplar phrases of a curated French fine
+# dining taxonomy: a sentence supports a preference when it covers most of the
+# features of one of that preference's exemplars. All sentences of all diners
+# are scored in one matrix product at startup. Each diner's per-preference
+# scores form a profile vector kept in a NumPy index, which answers "guests
+# similar to X" by cosine similarity. Complaints ("the service felt
+# disorganized", "the wine was not memorable") only count towards the
+# preferences that complaints reveal, such as disliking noisy rooms.
+
+# (preference, exemplar phrases)
+TAXONOMY: List[Tuple[str, List[str]]] = [
+    ("Enjoys tasting menus", ["tasting menu", "degustation", "chef's menu", "omakase", "multi-course", "courses"]),
+    ("Appreciates wine pairings", ["wine pairing", "sommelier", "wine list", "wine", "bordeaux", "burgundy", "vintage"]),
+    ("Enjoys Champagne and aperitifs", ["champagne", "cocktail", "aperitif", "sparkling"]),
+    ("Loves desserts and pastry", ["dessert", "pastry", "souffle", "soufflé", "dessert trolley", "chocolate", "macaron", "tart"]),
+    ("Enjoys the cheese course", ["cheese", "fromage", "cheese cart", "cheese course"]),
+    ("Favors seafood", ["seafood", "fish", "oyster", "lobster", "scallop", "sushi", "salmon", "sashimi"]),
+    ("Enjoys classic French dishes", ["duck", "foie gras", "escargot", "coq au vin", "bouillabaisse", "bourguignon", "confit", "french onion"]),
+    ("Prefers red meat and game", ["steak", "beef", "lamb", "venison", "wagyu", "game meat"]),
+    ("Values seasonal, local ingredients", ["seasonal", "local ingredients", "farm", "fresh ingredients", "market"]),
+    ("Likes vegetarian dishes", ["vegetarian", "vegan", "plant-based", "vegetable"]),
+    ("Needs dietary accommodations", ["gluten-free", "dairy-free", "nut-free", "dietary restrictions", "accommodate", "allergy"]),
+    ("Prefers a quiet, intimate setting", ["quiet", "intimate", "romantic", "cozy", "calm", "private"]),
+    ("Dislikes crowded or noisy rooms", ["crowded", "noisy", "loud", "cramped"]),
+    ("Values attentive, personal service", ["attentive", "personal", "knowledgeable staff", "friendly staff", "service"]),
+    ("Prefers unhurried pacing", ["unhurried", "leisurely", "rushed", "pacing", "slow service"]),
+    ("Celebrates special occasions", ["birthday", "anniversary", "celebration", "celebrate", "proposal", "special occasion"]),
+    ("Enjoys elegant presentation", ["presentation", "plating", "beautifully", "artful", "elegant"]),
+    ("Enjoys conversation with the staff", ["chatted", "conversation", "chat", "stories"]),
+    ("Prefers mild flavors", ["mild", "not spicy", "less spicy", "too spicy"]),
+    ("Enjoys bread and butter service", ["bread", "butter", "baguette", "brioche"]),
+    ("Mindful of value", ["pricey", "expensive", "overpriced", "value for money"]),
+    ("Likes a view or terrace seating", ["view", "terrace", "window seat", "outdoor", "patio"]),
+]
+
+# Words that make a sentence a complaint. With a negator as well ("never
+# disappoints", "no complaints") the sentence reads as praise again.
+NEGATIVE_WORDS = frozenset(
+    "awful bad bland careless chaotic clumsy complain complaint disappoint disappointed disappointing "
+    "disappointment dismissive disorganised disorganized forgettable horrible ignored inattentive "
+    "indifferent lacking lukewarm mediocre messy neglected overcooked overrated poor rude sloppy soggy "
+    "stale subpar tasteless terrible undercooked underwhelming unfriendly unpleasant unprofessional worst".split()
+)
+
+# Preferences that a complaint is evidence for, kept in negative sentences
+COMPLAINT_LABELS = frozenset({
+    "Dislikes crowded or noisy rooms", "Prefers unhurried pacing", "Prefers mild flavors", "Mindful of value"
+})
+
+# Share of an exemplar's features a sentence must contain to support it
+MATCH_THRESHOLD = 0.6
+MAX_PREFERENCES = 5
+BATCH_SENTENCES = 4096
+
+WORD = re.compile(r"[a-zà-ÿ0-9]+(?:[-'][a-zà-ÿ0-9]+)*")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have i in is it its my of on or our so the their them they "
+    "this to too very was we were with".split()
+)
+
+def normalize(word: str) -> str:
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def features(text: str) -> List[str]:
+    words = [normalize(word) for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+def is_negative(sentence: str) -> bool:
+    words = WORD.findall(sentence.lower().replace("’", "'"))
+    negated = any(is_negator(word) for word in words)
+    complaint = any(normalize(word) in NEGATIVE_WORDS for word in words)
+    return negated != complaint
+
+def review_sentences(diner: Diner) -> List[str]:
+    sentences = []
+    for review in diner.reviews:
+        sentences.extend(sentence for sentence in SENTENCE_END.split(review.content) if sentence.strip())
+    return sentences
+
+class VectorIndex:
+    # Unit vectors by key in one growable matrix; search is a single mat-vec product
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def upsert(self, key: str, vector: np.ndarray):
+        norm = float(np.linalg.norm(vector))
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            if row == len(self._matrix):
+                self._matrix = np.vstack([self._matrix, np.zeros_like(self._matrix)])
+            self._keys.append(key)
+            self._rows[key] = row
+        self._matrix[row] = vector / norm if norm else 0
+
+    def upsert_many(self, keys: List[str], vectors: np.ndarray):
+        for key, vector in zip(keys, vectors):
+            self.upsert(key, vector)
+
+    def vector(self, key: str) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        return self._matrix[row] if row is not None else None
+
+    def search(self, vector: np.ndarray, limit: int, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        # (key, cosine) of the nearest vectors with a positive similarity
+        count = len(self._keys)
+        if count == 0 or limit <= 0:
+            return []
+        scores = self._matrix[:count] @ vector
+        for key in exclude:
+            row = self._rows.get(key)
+            if row is not None:
+                scores[row] = -1
+        top = min(limit, count)
+        candidates = np.argpartition(-scores, top - 1)[:top]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self._keys[row], float(scores[row])) for row in ranked if scores[row] > 0]
+
+class PreferenceEngine:
+    def __init__(self, taxonomy: List[Tuple[str, List[str]]] = TAXONOMY):
+        self.labels = [label for label, _ in taxonomy]
+        # Only features that occur in some exemplar can support a match, so the
+        # vocabulary is the exemplars' features and everything else is dropped
+        exemplar_features = [
+            (label_index, set(features(phrase)))
+            for label_index, (_, phrases) in enumerate(taxonomy)
+            for phrase in phrases
+        ]
+        vocabulary = sorted({feature for _, feats in exemplar_features for feature in feats})
+        self.vocabulary = {feature: index for index, feature in enumerate(vocabulary)}
+        self._exemplars = np.zeros((len(vocabulary), len(exemplar_features)), dtype=np.float32)
+        for column, (_, feats) in enumerate(exemplar_features):
+            for feature in feats:
+                self._exemplars[self.vocabulary[feature], column] = 1 / len(feats)
+        # Exemplars are grouped by label; reduceat takes the best one per label
+        exemplar_labels = np.array([label_index for label_index, _ in exemplar_features])
+        self._label_starts = np.searchsorted(exemplar_labels, np.arange(len(self.labels)))
+        self._complaint_labels = np.array([label in COMPLAINT_LABELS for label in self.labels])
+        self.index = VectorIndex(len(self.labels))
+        self._preferences: Dict[str, List[str]] = {}
+
+    def embed(self, sentences: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(sentences), len(self.vocabulary)), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for feature in features(sentence):
+                column = self.vocabulary.get(feature)
+                if column is not None:
+                    matrix[row, column] = 1
+        return matrix
+
+    def score(self, sentences: List[str]) -> np.ndarray:
+        # (sentences x labels) best exemplar coverage, zeroed below the threshold
+        # and, in negative sentences, for everything but the complaint labels
+        coverage = self.embed(sentences) @ self._exemplars
+        best = np.maximum.reduceat(coverage, self._label_starts, axis=1)
+        negative = np.array([is_negative(sentence) for sentence in sentences], dtype=bool)
+        keep = (best >= MATCH_THRESHOLD) & (~negative[:, None] | self._complaint_labels)
+        return np.where(keep, best, 0)
+
+    def _rank(self, profile: np.ndarray) -> List[str]:
+        order = np.argsort(-profile, kind="stable")[:MAX_PREFERENCES]
+        return [self.labels[index] for index in order if profile[index] > 0]
+
+    def build(self, diners: List[Diner]):
+        # One batch over every review sentence of every diner
+        names = [diner.name for diner in diners]
+        sentences: List[str] = []
+        owners: List[int] = []
+        for owner, diner in enumerate(diners):
+            diner_sentences = review_sentences(diner)
+            sentences.extend(diner_sentences)
+            owners.extend([owner] * len(diner_sentences))
+        profiles = np.zeros((len(diners), len(self.labels)), dtype=np.float32)
+        owner_array = np.array(owners, dtype=np.int64)
+        for start in range(0, len(sentences), BATCH_SENTENCES):
+            scores = self.score(sentences[start:start + BATCH_SENTENCES])
+            np.add.at(profiles, owner_array[start:start + BATCH_SENTENCES], scores)
+        self.index.upsert_many(names, profiles)
+        for name, profile in zip(names, profiles):
+            self._preferences[name] = self._rank(profile)
+
+    def upsert(self, diner: Diner):
+        sentences = review_sentences(diner)
+        profile = self.score(sentences).sum(axis=0) if sentences else np.zeros(len(self.labels), dtype=np.float32)
+        self.index.upsert(diner.name, profile)
+        self._preferences[diner.name] = self._rank(profile)
+
+    def preferences(self, diner_name: str) -> Optional[List[str]]:
+        return self._preferences.get(diner_name)
+
+    def evidence(self, diner: Diner) -> Dict[str, str]:
+        # Preference -> the review sentence that supports it best
+        sentences = review_sentences(diner)
+        if not sentences:
+            return {}
+        scores = self.score(sentences)
+        return {
+            self.labels[label]: sentences[int(np.argmax(scores[:, label]))]
+            for label in range(len(self.labels)) if scores[:, label].max() > 0
+        }
+
+    def similar(self, diner_name: str, limit: int = 5) -> List[dict]:
+        vector = self.index.vector(diner_name)
+        if vector is None or not vector.any():
+            return []
+        own = set(self._preferences.get(diner_name, []))
+        return [{
+            "diner_name": name,
+            "score": round(score, 3),
+            "shared_preferences": [label for label in self._preferences.get(name, []) if label in own]
+        } for name, score in self.index.search(vector, limit, exclude=[diner_name])]
+
+    def stats(self) -> dict:
+        return {
+            "diners": len(self.index),
+            "with_preferences": sum(1 for preferences in self._preferences.values() if preferences),
+            "taxonomy_size": len(self.labels),
+            "vocabulary_size": len(self.vocabulary)
+        }
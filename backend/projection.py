@@ -0,0 +1,221 @@
+import gzip
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from records import Diner, Reservation
+
+# Projections of the dataset for GET /dining-data. A named view or a ?fields=
+# selection is serialized once per store version into a byte buffer, together
+# with its gzip (and, when the brotli package is installed, brotli) encoding and
+# an ETag, so a request only picks the buffer matching its Accept-Encoding.
+# orjson is used for encoding when installed.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# summary: names with reservation and guest counts; host: what the host stand
+# needs to seat a party; full: the dataset in its original shape
+VIEWS = ("summary", "host", "full")
+
+# Diner fields and the sub-fields ?fields= may select with a dot, e.g.
+# ?fields=name,reservations.start_time,reservations.number_of_people
+FIELDS: Dict[str, FrozenSet[str]] = {
+    "name": frozenset(),
+    "reservations": frozenset({"start_time", "number_of_people", "orders", "location", "date"}),
+    "reviews": frozenset({"content", "rating", "date", "restaurant_name"}),
+    "emails": frozenset({"subject", "combined_thread", "date"}),
+}
+
+# Selection: field -> selected sub-fields (empty for the whole field)
+Selection = Tuple[Tuple[str, FrozenSet[str]], ...]
+
+# Field selections kept besides the named views
+MAX_SELECTIONS = 16
+
+def parse_fields(fields: str) -> Selection:
+    # Raises ValueError naming the first unknown field
+    # field -> selected sub-fields; None selects all of the field
+    selected: Dict[str, Optional[set]] = {}
+    for part in (part.strip() for part in fields.split(",")):
+        if not part:
+            continue
+        field, _, sub_field = part.partition(".")
+        if field not in FIELDS or (sub_field and sub_field not in FIELDS[field]):
+            raise ValueError(part)
+        if not sub_field:
+            selected[field] = None
+        elif field not in selected:
+            selected[field] = {sub_field}
+        elif selected[field] is not None:
+            selected[field].add(sub_field)
+    if not selected:
+        raise ValueError(fields)
+    return tuple(sorted((field, frozenset(subs or ())) for field, subs in selected.items()))
+
+def selection_label(selection: Selection) -> str:
+    return ",".join(
+        ",".join(f"{field}.{sub}" for sub in sorted(subs)) if subs else field
+        for field, subs in selection
+    )
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _pick(data: dict, subs: FrozenSet[str]) -> dict:
+    return {key: value for key, value in data.items() if key in subs} if subs else data
+
+# A row is (diner name, the Diner record, their reservations); the record is
+# None for views that only read reservations, so snapshot diners stay encoded
+Row = Tuple[str, Optional[Diner], List[Reservation]]
+
+def needs_details(view) -> bool:
+    # Whether the view reads reviews or emails
+    if isinstance(view, str):
+        return view == "full"
+    return any(field in ("reviews", "emails") for field, _ in view)
+
+def summary_view(name: str, diner: Optional[Diner], reservations: List[Reservation]) -> dict:
+    return {
+        "name": name,
+        "reservations": len(reservations),
+        "guests": sum(reservation.number_of_people for reservation in reservations),
+        "dietary_tags": sorted({tag for reservation in reservations for tag in reservation.dietary_tags})
+    }
+
+def host_view(name: str, diner: Optional[Diner], reservations: List[Reservation]) -> dict:
+    return {
+        "name": name,
+        "reservations": [{
+            key: value for key, value in (
+                ("start_time", reservation.start_time),
+                ("number_of_people", reservation.number_of_people),
+                ("dietary_tags", sorted(set(reservation.dietary_tags))),
+                ("location", reservation.location),
+                ("date", reservation.date)
+            ) if value is not None
+        } for reservation in reservations]
+    }
+
+def full_view(name: str, diner: Diner, reservations: List[Reservation]) -> dict:
+    data = diner.as_dict()
+    data["reservations"] = [reservation.as_dict() for reservation in reservations]
+    return data
+
+def selected_view(selection: Selection, name: str, diner: Optional[Diner], reservations: List[Reservation]) -> dict:
+    data = {}
+    for field, subs in selection:
+        if field == "name":
+            data["name"] = name
+        elif field == "reservations":
+            data["reservations"] = [_pick(reservation.as_dict(), subs) for reservation in reservations]
+        else:
+            data[field] = [_pick(item.as_dict(), subs) for item in getattr(diner, field)]
+    return data
+
+VIEW_BUILDERS = {"summary": summary_view, "host": host_view, "full": full_view}
+
+@dataclass
+class Encoded:
+    version: int
+    identity: bytes
+    gzip: bytes
+    brotli: Optional[bytes]
+    etag: str
+
+    def body(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        # (body, Content-Encoding) for the client's Accept-Encoding header: the
+        # available coding with the highest q value, brotli first on a tie
+        qvalues = _qvalues(accept_encoding)
+        best, best_q = (self.identity, None), 0.0
+        for coding, body in (("br", self.brotli), ("gzip", self.gzip)):
+            q = qvalues.get(coding, qvalues.get("*", 0.0))
+            if body is not None and q > best_q:
+                best, best_q = (body, coding), q
+        return best
+
+def _qvalues(accept_encoding: str) -> Dict[str, float]:
+    # Coding -> q value; a coding without a q value has q=1 and one with an
+    # unreadable q value is ignored. "gzip;q=0" refuses gzip and "*" stands
+    # for any coding not listed by name.
+    qvalues = {}
+    for token in accept_encoding.split(","):
+        coding, *params = token.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = None
+        if q is not None and 0.0 <= q <= 1.0:
+            qvalues[coding] = q
+    return qvalues
+
+def encode(version: int, rows: List[Row], view) -> Encoded:
+    # view is a named view or a field selection. Runs in a worker thread.
+    builder = VIEW_BUILDERS[view] if isinstance(view, str) else partial(selected_view, view)
+    body = dumps({"diners": [builder(*row) for row in rows]})
+    return Encoded(
+        version=version,
+        identity=body,
+        gzip=gzip.compress(body, compresslevel=6),
+        brotli=brotli.compress(body, quality=5) if brotli is not None else None,
+        etag=f'"{hashlib.sha1(body).hexdigest()}"'
+    )
+
+class ProjectionCache:
+    # Encoded projections by view: the named views plus the most recently
+    # used field selections
+    def __init__(self):
+        self._encoded: "OrderedDict[object, Encoded]" = OrderedDict()
+
+    def get(self, view, version: int) -> Optional[Encoded]:
+        encoded = self._encoded.get(view)
+        if encoded is None or encoded.version != version:
+            return None
+        self._encoded.move_to_end(view)
+        return encoded
+
+    def put(self, view, encoded: Encoded):
+        current = self._encoded.get(view)
+        if current is not None and current.version > encoded.version:
+            return
+        self._encoded[view] = encoded
+        self._encoded.move_to_end(view)
+        selections = [key for key in self._encoded if not isinstance(key, str)]
+        for key in selections[:max(0, len(selections) - MAX_SELECTIONS)]:
+            del self._encoded[key]
+
+    def views(self) -> List[object]:
+        # Everything served so far, rebuilt when the dataset changes
+        return list(self._encoded)
+
+    def stats(self) -> dict:
+        return {
+            "encoder": "orjson" if orjson is not None else "json",
+            "encodings": ["br", "gzip"] if brotli is not None else ["gzip"],
+            "views": [{
+                "view": key if isinstance(key, str) else selection_label(key),
+                "version": encoded.version,
+                "bytes": len(encoded.identity),
+                "gzip_bytes": len(encoded.gzip),
+                "brotli_bytes": len(encoded.brotli) if encoded.brotli is not None else None
+            } for key, encoded in self._encoded.items()]
+        }
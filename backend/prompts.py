@@ -0,0 +1,81 @@
+import json
+import re
+from collections import defaultdict
+from typing import List, Sequence
+
+from metrics import LOG_SAMPLE_RATE, log_event
+
+# Helpers for building compact prompts: encode rows as a pipe-separated table
+# instead of indented JSON, estimate the token count locally and split rows
+# into chunks that fit a token budget.
+
+# Rough BPE approximation: words, numbers and individual punctuation marks
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+def estimate_tokens(text: str) -> int:
+    return len(TOKEN_PATTERN.findall(text))
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return "; ".join(_cell(item) for item in value if item)
+    return str(value).replace("|", "/").replace("\n", " ").strip()
+
+def _line(row: dict, columns: Sequence[str]) -> str:
+    return "|".join(_cell(row.get(column)) for column in columns)
+
+def tabular(rows: Sequence[dict], columns: Sequence[str]) -> str:
+    lines = ["|".join(columns)]
+    lines.extend(_line(row, columns) for row in rows)
+    return "\n".join(lines)
+
+def chunk_rows(rows: Sequence[dict], columns: Sequence[str], budget: int) -> List[List[dict]]:
+    # Greedily pack rows into chunks whose tabular() form stays within budget
+    # tokens. Lines are estimated once each and add up (no token spans a
+    # newline), so the header is counted once per chunk. A single row larger
+    # than the budget still gets a chunk of its own.
+    header_tokens = estimate_tokens("|".join(columns))
+    chunks: List[List[dict]] = []
+    current: List[dict] = []
+    total = header_tokens
+    for row in rows:
+        tokens = estimate_tokens(_line(row, columns))
+        if current and total + tokens > budget:
+            chunks.append(current)
+            current = []
+            total = header_tokens
+        current.append(row)
+        total += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+def naive_encoding(rows: Sequence[dict]) -> str:
+    # What the prompts used to embed, kept for the savings report
+    return json.dumps(list(rows), indent=2)
+
+class PromptReport:
+    # Per-task token accounting: what the old indented-JSON prompt would have
+    # cost against what was actually sent
+    def __init__(self):
+        self.calls = defaultdict(int)
+        self.naive_tokens = defaultdict(int)
+        self.sent_tokens = defaultdict(int)
+
+    def record(self, task: str, naive: int, sent: int):
+        self.calls[task] += 1
+        self.naive_tokens[task] += naive
+        self.sent_tokens[task] += sent
+        log_event("prompt built", sample_rate=LOG_SAMPLE_RATE, task=task, tokens=sent,
+                  naive_tokens=naive, saved_tokens=naive - sent)
+
+    def stats(self) -> dict:
+        return {
+            task: {
+                "calls": self.calls[task],
+                "naive_tokens": self.naive_tokens[task],
+                "sent_tokens": self.sent_tokens[task],
+                "saved_tokens": self.naive_tokens[task] - self.sent_tokens[task]
+            } for task in sorted(self.calls)
+        }
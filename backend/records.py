@@ -0,0 +1,174 @@
+import os
+import sys
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from scheduler import format_minutes, to_minutes
+
+# Immutable records the store keeps instead of the parsed JSON. They use
+# __slots__, start times are parsed to minutes once on the way in, and item
+# names, dietary tags and locations are interned. Identical orders (same item,
+# tags and price) read with the same OrderTable are one shared object; each
+# DiningStore keeps its own table, so the orders of a replaced store are freed
+# with it. as_dict() gives back the dataset shape and Reservation.table() the
+# shape of an assigned table, so responses are built without validating
+# through the Pydantic models.
+
+# Location of reservations that do not name one
+DEFAULT_LOCATION = os.getenv("DEFAULT_LOCATION", "French Laudure")
+
+# (location, service date); the date is None for undated reservations
+ServiceKey = Tuple[str, Optional[str]]
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else None
+
+@dataclass(frozen=True, slots=True)
+class Order:
+    item: str
+    dietary_tags: Tuple[str, ...]
+    price: float
+
+    @classmethod
+    def of(cls, item: str, dietary_tags, price: float, shared: Optional["OrderTable"] = None) -> "Order":
+        key = (item, tuple(dietary_tags), float(price))
+        order = shared.get(key) if shared is not None else None
+        if order is None:
+            order = cls(sys.intern(item), tuple(sys.intern(tag) for tag in dietary_tags), float(price))
+            if shared is not None:
+                shared[key] = order
+        return order
+
+    @classmethod
+    def from_dict(cls, data: dict, shared: Optional["OrderTable"] = None) -> "Order":
+        return cls.of(data.get("item", ""), data.get("dietary_tags", []), data.get("price", 0.0), shared)
+
+    def as_dict(self) -> dict:
+        return {"item": self.item, "dietary_tags": list(self.dietary_tags), "price": self.price}
+
+# (item, tags, price) -> the shared Order, one per DiningStore
+OrderTable = Dict[Tuple[str, Tuple[str, ...], float], Order]
+
+@dataclass(frozen=True, slots=True)
+class Reservation:
+    diner_name: str
+    # Minutes after midnight; None when the start time is missing or invalid
+    start_minute: Optional[int]
+    number_of_people: int
+    orders: Tuple[Order, ...]
+    location: Optional[str] = None
+    date: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, diner_name: str, data: dict, orders: Optional[OrderTable] = None) -> "Reservation":
+        try:
+            start_minute = to_minutes(data["start_time"])
+        except (KeyError, ValueError, AttributeError):
+            start_minute = None
+        return cls(
+            sys.intern(diner_name),
+            start_minute,
+            data.get("number_of_people", 0),
+            tuple([Order.from_dict(order, orders) for order in data.get("orders", ())]),
+            _intern(data.get("location")),
+            data.get("date") or None
+        )
+
+    @property
+    def start_time(self) -> Optional[str]:
+        # Display form used in assignments, e.g. "6:30 PM"
+        return format_minutes(self.start_minute) if self.start_minute is not None else None
+
+    @property
+    def service(self) -> ServiceKey:
+        return self.location or DEFAULT_LOCATION, self.date
+
+    @property
+    def dietary_tags(self) -> Tuple[str, ...]:
+        return tuple(tag for order in self.orders for tag in order.dietary_tags)
+
+    def table(self) -> dict:
+        # A table as stored in assignments (the Table response model plus allergies)
+        return {
+            "diner_name": self.diner_name,
+            "start_time": self.start_time,
+            "number_of_people": self.number_of_people,
+            "orders": [order.as_dict() for order in self.orders],
+            "allergies": "Loading..."  # Will be populated later
+        }
+
+    def as_dict(self) -> dict:
+        data = {
+            "number_of_people": self.number_of_people,
+            "orders": [order.as_dict() for order in self.orders]
+        }
+        if self.start_minute is not None:
+            data["start_time"] = f"{self.start_minute // 60:02d}:{self.start_minute % 60:02d}"
+        if self.location:
+            data["location"] = self.location
+        if self.date:
+            data["date"] = self.date
+        return data
+
+@dataclass(frozen=True, slots=True)
+class Email:
+    subject: str
+    combined_thread: str
+    date: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Email":
+        return cls(data.get("subject", ""), data.get("combined_thread", ""), data.get("date"))
+
+    def as_dict(self) -> dict:
+        data = {"subject": self.subject, "combined_thread": self.combined_thread}
+        if self.date:
+            data["date"] = self.date
+        return data
+
+@dataclass(frozen=True, slots=True)
+class Review:
+    content: str
+    rating: Optional[int] = None
+    date: Optional[str] = None
+    restaurant_name: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Review":
+        # The dataset stores review bodies under "content"; older records used "text"
+        return cls(
+            data.get("content") or data.get("text") or "",
+            data.get("rating"),
+            data.get("date"),
+            _intern(data.get("restaurant_name"))
+        )
+
+    def as_dict(self) -> dict:
+        data = {"content": self.content}
+        for field in ("rating", "date", "restaurant_name"):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+@dataclass(frozen=True, slots=True)
+class Diner:
+    # A guest and their own text; reservations are indexed by the store
+    name: str
+    emails: Tuple[Email, ...] = ()
+    reviews: Tuple[Review, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Diner":
+        return cls(
+            sys.intern(data["name"]),
+            tuple([Email.from_dict(email) for email in data.get("emails", ())]),
+            tuple([Review.from_dict(review) for review in data.get("reviews", ())])
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "reviews": [review.as_dict() for review in self.reviews],
+            "emails": [email.as_dict() for email in self.emails]
+        }
@@ -0,0 +1,313 @@
+import heapq
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Seating duration model: a table occupies its waiter from start_time until
+# start_time + base + per_guest * number_of_people, capped at max.
+SEATING_BASE_MINUTES = int(os.getenv("SEATING_BASE_MINUTES", "60"))
+SEATING_MINUTES_PER_GUEST = int(os.getenv("SEATING_MINUTES_PER_GUEST", "15"))
+SEATING_MAX_MINUTES = int(os.getenv("SEATING_MAX_MINUTES", "180"))
+
+def seating_duration(number_of_people: int) -> int:
+    duration = SEATING_BASE_MINUTES + SEATING_MINUTES_PER_GUEST * max(number_of_people, 0)
+    return min(duration, SEATING_MAX_MINUTES)
+
+@lru_cache(maxsize=4096)
+def to_minutes(time_str: str) -> int:
+    # Accepts both "18:30" and "6:30 PM" without going through strptime. A
+    # service has a few dozen distinct start times, so the scheduler's repeated
+    # lookups on assigned tables are answered from the cache.
+    time_str = time_str.strip()
+    suffix = None
+    if time_str[-2:].upper() in ("AM", "PM"):
+        suffix = time_str[-2:].upper()
+        time_str = time_str[:-2].strip()
+    hours, minutes = time_str.split(":")
+    hour = int(hours)
+    minute = int(minutes)
+    if suffix is not None:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Invalid 12-hour time: {time_str} {suffix}")
+        hour = hour % 12 + (12 if suffix == "PM" else 0)
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Invalid time: {time_str}")
+    return hour * 60 + minute
+
+def format_minutes(minutes: int) -> str:
+    # 12-hour display format used in assignments, e.g. "6:30 PM"
+    hour, minute = divmod(minutes, 60)
+    suffix = "PM" if hour >= 12 else "AM"
+    return f"{hour % 12 or 12}:{minute:02d} {suffix}"
+
+@dataclass(frozen=True, slots=True)
+class WaiterLimits:
+    # What one waiter can take on: tables seated and finished within their
+    # shift, parties no larger than their biggest section seats, and at most
+    # max_covers covers seated at once. None means no limit. Shift minutes may
+    # pass 24 * 60 for shifts that end after midnight.
+    shift_start: int = 0
+    shift_end: int = 48 * 60
+    max_party: Optional[int] = None
+    max_covers: Optional[int] = None
+
+    def can_serve(self, start: int, end: int, covers: int) -> bool:
+        return (self.shift_start <= start and end <= self.shift_end
+                and (self.max_party is None or covers <= self.max_party)
+                and (self.max_covers is None or covers <= self.max_covers))
+
+    def has_room(self, seated_covers: int, covers: int) -> bool:
+        return self.max_covers is None or seated_covers + covers <= self.max_covers
+
+UNLIMITED = WaiterLimits()
+
+class InfeasibleAssignment(ValueError):
+    # Raised before (or instead of) an assignment the roster cannot staff;
+    # problems are (table, reason) pairs
+    def __init__(self, problems: List[Tuple[dict, str]]):
+        super().__init__(f"{len(problems)} tables cannot be staffed")
+        self.problems = problems
+
+def table_interval(table: dict) -> Tuple[int, int]:
+    start = to_minutes(table["start_time"])
+    return start, start + seating_duration(table["number_of_people"])
+
+def check_feasibility(waiter_ids: List[int], reservations: List[dict],
+                      limits: Dict[int, WaiterLimits]) -> List[Tuple[dict, str]]:
+    # Interval checks run before assigning: every table needs a present waiter
+    # whose shift spans its seating and whose sections seat the party, and at
+    # every start time the covers in house may not exceed the combined
+    # max_covers of the waiters on shift. Waiters with identical limits are
+    # checked once, so large rosters cost one pass per distinct shift/section
+    # combination rather than per waiter.
+    classes: Dict[WaiterLimits, int] = {}
+    for waiter_id in waiter_ids:
+        waiter_limits = limits.get(waiter_id, UNLIMITED)
+        classes[waiter_limits] = classes.get(waiter_limits, 0) + 1
+    problems = []
+    if not classes:
+        return problems
+
+    in_house = []  # (end_minute, covers)
+    covers_in_house = 0
+    timeline = sorted(reservations, key=lambda r: (to_minutes(r["start_time"]), r["diner_name"]))
+    for reservation in timeline:
+        start, end = table_interval(reservation)
+        covers = reservation["number_of_people"]
+        while in_house and in_house[0][0] <= start:
+            covers_in_house -= heapq.heappop(in_house)[1]
+        heapq.heappush(in_house, (end, covers))
+        covers_in_house += covers
+
+        on_shift = [waiter_limits for waiter_limits in classes if waiter_limits.shift_start <= start < waiter_limits.shift_end]
+        if not any(waiter_limits.can_serve(start, end, covers) for waiter_limits in classes):
+            if not any(waiter_limits.shift_start <= start and end <= waiter_limits.shift_end for waiter_limits in classes):
+                reason = f"no waiter on shift from {format_minutes(start)} to {format_minutes(end % (24 * 60))}"
+            else:
+                reason = f"no waiter on shift can seat a party of {covers}"
+            problems.append((reservation, reason))
+        elif all(waiter_limits.max_covers is not None for waiter_limits in on_shift):
+            capacity = sum(waiter_limits.max_covers * classes[waiter_limits] for waiter_limits in on_shift)
+            if covers_in_house > capacity:
+                problems.append((reservation, f"{covers_in_house} covers in house at {format_minutes(start)}, "
+                                              f"waiters on shift can take {capacity}"))
+    return problems
+
+def load_curve(reservations: Iterable[Tuple[int, int]], bucket_minutes: int = 15) -> List[Tuple[int, int]]:
+    # Covers in house per bucket from (start_minute, covers) pairs. Each table adds
+    # its covers at the bucket it is seated in and removes them after the last
+    # bucket its seating overlaps; a single prefix sum then yields the curve.
+    deltas: List[int] = []
+    for start, covers in reservations:
+        first = start // bucket_minutes
+        last = -(-(start + seating_duration(covers)) // bucket_minutes)
+        if last >= len(deltas):
+            deltas.extend([0] * (last + 1 - len(deltas)))
+        deltas[first] += covers
+        deltas[last] -= covers
+
+    curve = []
+    in_house = 0
+    for bucket, delta in enumerate(deltas[:-1]):
+        in_house += delta
+        curve.append((bucket * bucket_minutes, in_house))
+    return curve
+
+def partition_intervals(waiter_ids: List[int], reservations: List[dict],
+                        limits: Optional[Dict[int, WaiterLimits]] = None) -> Dict[int, List[dict]]:
+    # Greedy interval partitioning: reservations are swept in start-time order and
+    # each one goes to the waiter with the fewest covers currently seated, breaking
+    # ties by covers served so far and then by waiter id. Seated tables are kept in
+    # a min-heap keyed on their end minute so releasing them is O(log n).
+    # With limits, only waiters whose shift, sections and free covers fit the
+    # table are considered; tables nobody can take raise InfeasibleAssignment.
+    assignments = {waiter_id: [] for waiter_id in waiter_ids}
+    if not waiter_ids:
+        return assignments
+
+    active_covers = {waiter_id: 0 for waiter_id in waiter_ids}
+    total_covers = {waiter_id: 0 for waiter_id in waiter_ids}
+    seated = []  # (end_minute, waiter_id, covers)
+    unplaced = []
+
+    timeline = sorted(
+        reservations,
+        key=lambda r: (to_minutes(r["start_time"]), -r["number_of_people"], r["diner_name"])
+    )
+    for reservation in timeline:
+        start = to_minutes(reservation["start_time"])
+        covers = reservation["number_of_people"]
+        end = start + seating_duration(covers)
+
+        while seated and seated[0][0] <= start:
+            _, waiter_id, released = heapq.heappop(seated)
+            active_covers[waiter_id] -= released
+
+        candidates = waiter_ids if limits is None else [
+            w for w in waiter_ids
+            if limits.get(w, UNLIMITED).can_serve(start, end, covers)
+            and limits.get(w, UNLIMITED).has_room(active_covers[w], covers)
+        ]
+        if not candidates:
+            unplaced.append((reservation, f"every waiter who can serve it is full at {format_minutes(start)}"))
+            continue
+        waiter_id = min(candidates, key=lambda w: (active_covers[w], total_covers[w], w))
+        assignments[waiter_id].append(reservation)
+        active_covers[waiter_id] += covers
+        total_covers[waiter_id] += covers
+        heapq.heappush(seated, (end, waiter_id, covers))
+
+    if unplaced:
+        raise InfeasibleAssignment(unplaced)
+    return assignments
+
+def _overlapping_covers(tables: List[dict], start: int, end: int) -> int:
+    covers = 0
+    for table in tables:
+        table_start = to_minutes(table["start_time"])
+        table_end = table_start + seating_duration(table["number_of_people"])
+        if table_start < end and start < table_end:
+            covers += table["number_of_people"]
+    return covers
+
+def _total_covers(tables: List[dict]) -> int:
+    return sum(table["number_of_people"] for table in tables)
+
+def _peak_covers(tables: List[dict], start: int, end: int) -> int:
+    # Most covers seated at once during [start, end)
+    events = []
+    for table in tables:
+        table_start, table_end = table_interval(table)
+        if table_start < end and start < table_end:
+            events.append((max(table_start, start), table["number_of_people"]))
+            events.append((min(table_end, end), -table["number_of_people"]))
+    peak = covers = 0
+    # Departures sort before arrivals at the same minute
+    for _, delta in sorted(events):
+        covers += delta
+        peak = max(peak, covers)
+    return peak
+
+def fits(tables: List[dict], waiter_limits: WaiterLimits, table: dict) -> bool:
+    # Whether a waiter already serving `tables` can also take `table`
+    start, end = table_interval(table)
+    covers = table["number_of_people"]
+    if not waiter_limits.can_serve(start, end, covers):
+        return False
+    return waiter_limits.max_covers is None or waiter_limits.has_room(_peak_covers(tables, start, end), covers)
+
+def least_loaded(assignments: Dict[int, List[dict]], waiter_ids: List[int], table: dict,
+                 limits: Optional[Dict[int, WaiterLimits]] = None) -> Optional[int]:
+    # The waiter with the fewest covers seated over the table's interval, then
+    # the fewest covers overall, among those the table fits; None when it fits nobody
+    start, end = table_interval(table)
+    candidates = waiter_ids if limits is None else [
+        w for w in waiter_ids if fits(assignments.get(w, []), limits.get(w, UNLIMITED), table)
+    ]
+    if not candidates:
+        return None
+    return min(
+        candidates,
+        key=lambda w: (_overlapping_covers(assignments.get(w, []), start, end), _total_covers(assignments.get(w, [])), w)
+    )
+
+def rebalance(assignments: Dict[int, List[dict]], waiter_ids: List[int],
+              limits: Optional[Dict[int, WaiterLimits]] = None) -> Tuple[Dict[int, List[dict]], Set[int]]:
+    # Adjust an existing assignment to a new roster with as few moves as possible.
+    # Tables of departing waiters (and, with limits, tables outside their
+    # waiter's shift or sections) go to whoever has the fewest covers seated
+    # over the table's interval; newly arrived waiters take tables from the
+    # busiest waiters that have one they can serve until the load is even.
+    # Returns the new assignment and the ids of waiters whose table lists
+    # changed; raises InfeasibleAssignment when a displaced table fits nobody.
+    result = {waiter_id: list(assignments.get(waiter_id, [])) for waiter_id in waiter_ids}
+    changed = set()
+    if not waiter_ids:
+        return result, changed
+
+    orphans = []
+    for waiter_id, tables in assignments.items():
+        if waiter_id not in result:
+            orphans.extend(tables)
+        elif limits is not None:
+            waiter_limits = limits.get(waiter_id, UNLIMITED)
+            kept = []
+            for table in tables:
+                if waiter_limits.can_serve(*table_interval(table), table["number_of_people"]):
+                    kept.append(table)
+                else:
+                    orphans.append(table)
+            if len(kept) != len(tables):
+                result[waiter_id] = kept
+                changed.add(waiter_id)
+    orphans.sort(key=lambda t: to_minutes(t["start_time"]))
+
+    unplaced = []
+    for table in orphans:
+        waiter_id = least_loaded(result, waiter_ids, table, limits)
+        if waiter_id is None:
+            unplaced.append((table, "no waiter on the new roster can take it"))
+            continue
+        result[waiter_id].append(table)
+        changed.add(waiter_id)
+    if unplaced:
+        raise InfeasibleAssignment(unplaced)
+
+    newcomers = [waiter_id for waiter_id in waiter_ids if waiter_id not in assignments]
+    if newcomers:
+        target = _total_covers([t for tables in result.values() for t in tables]) / len(waiter_ids)
+        for newcomer in newcomers:
+            newcomer_limits = UNLIMITED if limits is None else limits.get(newcomer, UNLIMITED)
+            while _total_covers(result[newcomer]) < target:
+                load = _total_covers(result[newcomer])
+                donor = table = None
+                # The busiest waiter gives first; when none of their tables fits
+                # the newcomer (shift, sections, cover cap), the next busiest does
+                for candidate in sorted(waiter_ids, key=lambda w: (-_total_covers(result[w]), w)):
+                    gap = _total_covers(result[candidate]) - load
+                    if gap <= 1:
+                        break
+                    if candidate == newcomer:
+                        continue
+                    movable = [
+                        t for t in result[candidate]
+                        if 0 < t["number_of_people"] < gap and (limits is None or fits(result[newcomer], newcomer_limits, t))
+                    ]
+                    if movable:
+                        donor = candidate
+                        # Prefer tables that overlap least with what the newcomer already serves
+                        table = min(movable, key=lambda t: (
+                            _overlapping_covers(result[newcomer], *table_interval(t)),
+                            to_minutes(t["start_time"])
+                        ))
+                        break
+                if table is None:
+                    break
+                result[donor] = [t for t in result[donor] if t is not table]
+                result[newcomer].append(table)
+                changed.update((donor, newcomer))
+
+    for waiter_id in changed:
+        result[waiter_id].sort(key=lambda t: to_minutes(t["start_time"]))
+    return result, changed
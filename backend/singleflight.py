@@ -0,0 +1,43 @@
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class SingleFlight:
+    # Coalesces concurrent calls that share a key: the first caller starts the
+    # work, everyone arriving while it is in flight awaits the same task. Keys are
+    # tuples whose first element names the operation, which is what the counters
+    # are grouped by.
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = Counter()
+        self.deduplicated = Counter()
+
+    async def do(self, key: Tuple, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        operation = key[0]
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls[operation] += 1
+            task = asyncio.ensure_future(fn(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.deduplicated[operation] += 1
+        # Shield so one caller disconnecting does not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        operations = set(self.calls) | set(self.deduplicated)
+        return {
+            "in_flight": len(self._inflight),
+            "operations": {
+                operation: {
+                    "calls": self.calls[operation],
+                    "deduplicated": self.deduplicated[operation]
+                } for operation in sorted(operations)
+            }
+        }
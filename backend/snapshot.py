@@ -0,0 +1,313 @@
+import argparse
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from records import Order, OrderTable, Reservation
+from scheduler import to_minutes
+
+# Compiled, memory-mappable form of the dining dataset. Reservations and orders
+# are stored column-wise as typed arrays (start minute, party size, diner index,
+# ...), every name, menu item and dietary tag is interned once in a string
+# table, and the bulky per-diner text (reviews, email threads) sits in a JSON
+# blob that is only decoded when that diner is looked up.
+#
+# Layout: MAGIC | uint32 header length | JSON header | 8-byte aligned sections.
+# The header records each section's offset, typecode and length.
+#
+#   python backend/snapshot.py build fine-dining-dataset-augmented.json fine-dining.snap
+#   python backend/snapshot.py randomize-start-times fine-dining.snap
+#   python backend/snapshot.py strip-dates fine-dining.snap
+
+MAGIC = b"LAUDSNP1"
+NO_VALUE = -1
+EPOCH = date(1970, 1, 1)
+
+# section name -> array typecode
+SECTIONS = {
+    "string_offsets": "I",        # n_strings + 1 offsets into string_data
+    "string_data": "B",
+    "diner_name": "i",            # string id per diner
+    "diner_detail_offsets": "Q",  # n_diners + 1 offsets into detail_data
+    "detail_data": "B",
+    "res_diner": "i",             # diner index per reservation
+    "res_start_minute": "h",      # minutes after midnight, -1 when missing
+    "res_party_size": "h",
+    "res_date": "i",              # days since 1970-01-01, -1 when missing
+    "res_location": "i",          # string id, -1 when missing
+    "res_order_offsets": "I",     # n_reservations + 1 offsets into the order columns
+    "order_item": "i",            # string id
+    "order_price": "d",
+    "order_tag_offsets": "I",     # n_orders + 1 offsets into order_tags
+    "order_tags": "i",            # string ids
+}
+
+def _minutes(time_str: Optional[str]) -> int:
+    # Same parsing as the JSON load ("18:30" or "6:30 PM"); raises ValueError
+    # on anything else so a bad time fails the build instead of being misread
+    if not time_str:
+        return NO_VALUE
+    try:
+        return to_minutes(time_str)
+    except (AttributeError, ValueError) as e:
+        raise ValueError(f"Invalid start_time {time_str!r}: {e}")
+
+def _days(date_str: Optional[str]) -> int:
+    if not date_str:
+        return NO_VALUE
+    return (date.fromisoformat(date_str) - EPOCH).days
+
+def build(dining_data: dict, path: str):
+    strings: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    columns = {name: array(typecode) for name, typecode in SECTIONS.items()}
+    details = bytearray()
+    columns["diner_detail_offsets"].append(0)
+    columns["res_order_offsets"].append(0)
+    columns["order_tag_offsets"].append(0)
+
+    for diner_index, diner in enumerate(dining_data.get("diners", [])):
+        columns["diner_name"].append(intern(diner["name"]))
+        extra = {key: value for key, value in diner.items() if key not in ("name", "reservations")}
+        details.extend(json.dumps(extra, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        columns["diner_detail_offsets"].append(len(details))
+
+        for reservation in diner.get("reservations", []):
+            columns["res_diner"].append(diner_index)
+            try:
+                start_minute = _minutes(reservation.get("start_time"))
+            except ValueError as e:
+                raise ValueError(f"Diner {diner['name']}: {e}")
+            columns["res_start_minute"].append(start_minute)
+            columns["res_party_size"].append(reservation.get("number_of_people", 0))
+            columns["res_date"].append(_days(reservation.get("date")))
+            columns["res_location"].append(intern(reservation["location"]) if reservation.get("location") else NO_VALUE)
+            for order in reservation.get("orders", []):
+                columns["order_item"].append(intern(order.get("item", "")))
+                columns["order_price"].append(float(order.get("price", 0.0)))
+                for tag in order.get("dietary_tags", []):
+                    columns["order_tags"].append(intern(tag))
+                columns["order_tag_offsets"].append(len(columns["order_tags"]))
+            columns["res_order_offsets"].append(len(columns["order_item"]))
+
+    columns["string_offsets"].append(0)
+    for value in strings:
+        columns["string_data"].frombytes(value.encode("utf-8"))
+        columns["string_offsets"].append(len(columns["string_data"]))
+    columns["detail_data"] = array("B", bytes(details))
+
+    # Offsets are relative to the start of the aligned data region
+    sections = {}
+    position = 0
+    for name, column in columns.items():
+        position = (position + 7) & ~7
+        sections[name] = {"offset": position, "typecode": column.typecode, "length": len(column)}
+        position += len(column) * column.itemsize
+    header = json.dumps({
+        "version": 1,
+        "diners": len(columns["diner_name"]),
+        "reservations": len(columns["res_diner"]),
+        "orders": len(columns["order_item"]),
+        "strings": len(strings),
+        "sections": sections
+    }).encode("utf-8")
+
+    data_start = (len(MAGIC) + 4 + len(header) + 7) & ~7
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for name, column in columns.items():
+            f.write(b"\0" * (data_start + sections[name]["offset"] - f.tell()))
+            column.tofile(f)
+    os.replace(tmp_path, path)
+
+class DiningSnapshot:
+    # Read side: the file is memory-mapped and every section is exposed as a
+    # typed memoryview, so opening costs a header parse regardless of size.
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self._file = open(path, "r+b" if writable else "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a dining snapshot")
+        header_length = struct.unpack_from("<I", self._mmap, len(MAGIC))[0]
+        header_start = len(MAGIC) + 4
+        self.header = json.loads(self._mmap[header_start:header_start + header_length])
+        data_start = (header_start + header_length + 7) & ~7
+
+        view = memoryview(self._mmap)
+        self.columns = {}
+        for name, section in self.header["sections"].items():
+            itemsize = array(section["typecode"]).itemsize
+            start = data_start + section["offset"]
+            raw = view[start:start + section["length"] * itemsize]
+            self.columns[name] = raw.cast(section["typecode"]) if section["typecode"] != "B" else raw
+        self._strings: Dict[int, str] = {}
+
+    @property
+    def diner_count(self) -> int:
+        return self.header["diners"]
+
+    @property
+    def reservation_count(self) -> int:
+        return self.header["reservations"]
+
+    def string(self, string_id: int) -> str:
+        value = self._strings.get(string_id)
+        if value is None:
+            offsets = self.columns["string_offsets"]
+            value = bytes(self.columns["string_data"][offsets[string_id]:offsets[string_id + 1]]).decode("utf-8")
+            self._strings[string_id] = value
+        return value
+
+    def diner_name(self, diner_index: int) -> str:
+        return self.string(self.columns["diner_name"][diner_index])
+
+    def diner_details(self, diner_index: int) -> dict:
+        offsets = self.columns["diner_detail_offsets"]
+        return json.loads(bytes(self.columns["detail_data"][offsets[diner_index]:offsets[diner_index + 1]]))
+
+    def orders(self, reservation_index: int) -> List[dict]:
+        columns = self.columns
+        orders = []
+        for order in range(columns["res_order_offsets"][reservation_index], columns["res_order_offsets"][reservation_index + 1]):
+            tags = columns["order_tags"][columns["order_tag_offsets"][order]:columns["order_tag_offsets"][order + 1]]
+            orders.append({
+                "item": self.string(columns["order_item"][order]),
+                "dietary_tags": [self.string(tag) for tag in tags],
+                "price": columns["order_price"][order]
+            })
+        return orders
+
+    def reservation(self, reservation_index: int) -> dict:
+        columns = self.columns
+        reservation = {
+            "number_of_people": columns["res_party_size"][reservation_index],
+            "orders": self.orders(reservation_index)
+        }
+        start = columns["res_start_minute"][reservation_index]
+        if start != NO_VALUE:
+            reservation["start_time"] = f"{start // 60:02d}:{start % 60:02d}"
+        days = columns["res_date"][reservation_index]
+        if days != NO_VALUE:
+            reservation["date"] = (EPOCH + timedelta(days=days)).isoformat()
+        # Snapshots built before locations were recorded have no such column
+        locations = columns.get("res_location")
+        if locations is not None and locations[reservation_index] != NO_VALUE:
+            reservation["location"] = self.string(locations[reservation_index])
+        return reservation
+
+    def reservation_record(self, reservation_index: int, diner_name: str,
+                           shared_orders: Optional[OrderTable] = None) -> Reservation:
+        # Straight from the columns, without formatting and re-parsing the start time
+        columns = self.columns
+        orders = []
+        for order in range(columns["res_order_offsets"][reservation_index], columns["res_order_offsets"][reservation_index + 1]):
+            tags = columns["order_tags"][columns["order_tag_offsets"][order]:columns["order_tag_offsets"][order + 1]]
+            orders.append(Order.of(
+                self.string(columns["order_item"][order]), [self.string(tag) for tag in tags], columns["order_price"][order],
+                shared_orders
+            ))
+        start = columns["res_start_minute"][reservation_index]
+        days = columns["res_date"][reservation_index]
+        locations = columns.get("res_location")
+        location = locations[reservation_index] if locations is not None else NO_VALUE
+        return Reservation(
+            diner_name=diner_name,
+            start_minute=start if start != NO_VALUE else None,
+            number_of_people=columns["res_party_size"][reservation_index],
+            orders=tuple(orders),
+            location=self.string(location) if location != NO_VALUE else None,
+            date=(EPOCH + timedelta(days=days)).isoformat() if days != NO_VALUE else None
+        )
+
+    def diner(self, diner_index: int, reservation_indexes: List[int]) -> dict:
+        diner = {"name": self.diner_name(diner_index)}
+        diner.update(self.diner_details(diner_index))
+        diner["reservations"] = [self.reservation(index) for index in reservation_indexes]
+        return diner
+
+    def to_dining_data(self) -> dict:
+        by_diner: Dict[int, List[int]] = {}
+        for index, diner_index in enumerate(self.columns["res_diner"]):
+            by_diner.setdefault(diner_index, []).append(index)
+        return {"diners": [self.diner(i, by_diner.get(i, [])) for i in range(self.diner_count)]}
+
+    def flush(self):
+        self._mmap.flush()
+
+    def close(self):
+        for column in self.columns.values():
+            column.release()
+        self._mmap.close()
+        self._file.close()
+
+# In-place batch transforms: these write straight into the mapped columns
+# instead of re-serializing the whole dataset.
+
+def randomize_start_times(snapshot: DiningSnapshot, seed: Optional[int] = None):
+    # Random start times, 12:00-20:00 in 15-minute steps
+    rng = random.Random(seed)
+    column = snapshot.columns["res_start_minute"]
+    for index in range(len(column)):
+        column[index] = rng.randint(12, 20) * 60 + rng.choice([0, 15, 30, 45])
+
+def strip_dates(snapshot: DiningSnapshot):
+    # Drops every reservation date
+    column = snapshot.columns["res_date"]
+    for index in range(len(column)):
+        column[index] = NO_VALUE
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and transform dining dataset snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="compile a JSON dataset into a snapshot")
+    build_parser.add_argument("source")
+    build_parser.add_argument("target")
+    randomize_parser = commands.add_parser("randomize-start-times", help="assign random start times in place")
+    randomize_parser.add_argument("snapshot")
+    randomize_parser.add_argument("--seed", type=int)
+    strip_parser = commands.add_parser("strip-dates", help="remove reservation dates in place")
+    strip_parser.add_argument("snapshot")
+    export_parser = commands.add_parser("export", help="write a snapshot back out as JSON")
+    export_parser.add_argument("snapshot")
+    export_parser.add_argument("target")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with open(args.source, "r") as f:
+            build(json.load(f), args.target)
+        snapshot = DiningSnapshot(args.target)
+        print(f"Built {args.target}: {snapshot.diner_count} diners, {snapshot.reservation_count} reservations, "
+              f"{os.path.getsize(args.target)} bytes")
+        snapshot.close()
+    elif args.command == "export":
+        snapshot = DiningSnapshot(args.snapshot)
+        with open(args.target, "w") as f:
+            json.dump(snapshot.to_dining_data(), f, indent=4, ensure_ascii=False)
+        snapshot.close()
+    else:
+        snapshot = DiningSnapshot(args.snapshot, writable=True)
+        if args.command == "randomize-start-times":
+            randomize_start_times(snapshot, args.seed)
+        else:
+            strip_dates(snapshot)
+        snapshot.flush()
+        snapshot.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+import random
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from scheduler import UNLIMITED, WaiterLimits, partition_intervals, seating_duration, to_minutes
+
+# Load-balancing solver: minimizes the highest number of covers any single
+# waiter has seated at the same moment over the shift. Time is compressed to
+# the segments between consecutive start/end minutes, so a waiter's load is one
+# integer per segment. Starting from the greedy sweep, an iterated local search
+# moves (or swaps) tables off the waiter at the peak whenever that lowers
+# (peak, waiters at peak, sum of squared peaks), and kicks a random peak table
+# elsewhere when it gets stuck. It stops at the lower bound, which proves the
+# result optimal, when the time budget runs out, or after MAX_STALLED_KICKS
+# kicks in a row found nothing better.
+# With waiter limits the search starts from the constrained sweep and only
+# considers moves and swaps that keep every table within its waiter's shift
+# and sections and every waiter within max_covers.
+
+MAX_STALLED_KICKS = 200
+
+@dataclass
+class SolverResult:
+    assignments: Dict[int, List[dict]]
+    objective: int
+    lower_bound: int
+    optimal: bool
+    iterations: int
+    elapsed_ms: float
+    # waiter id -> [(minute, covers)] at every minute where that waiter's load changes
+    load_curves: Dict[int, List[Tuple[int, int]]] = field(default_factory=dict)
+
+class _Search:
+    def __init__(self, waiter_ids: List[int], reservations: List[dict],
+                 limits: Optional[Dict[int, WaiterLimits]] = None):
+        self.waiter_ids = waiter_ids
+        self.reservations = reservations
+        starts = [to_minutes(r["start_time"]) for r in reservations]
+        ends = [start + seating_duration(r["number_of_people"]) for start, r in zip(starts, reservations)]
+        self.points = sorted(set(starts) | set(ends))
+        self.covers = [r["number_of_people"] for r in reservations]
+        # Each reservation occupies segments [first, last)
+        self.spans = [
+            (bisect_left(self.points, start), bisect_left(self.points, end)) for start, end in zip(starts, ends)
+        ]
+        segments = max(len(self.points) - 1, 0)
+        self.loads = [[0] * segments for _ in waiter_ids]
+        self.tables: List[List[int]] = [[] for _ in waiter_ids]
+        self.owner = [0] * len(reservations)
+        self.peaks = [0] * len(waiter_ids)
+        # Per reservation, the waiters (by index) it may go to, or None for
+        # anyone; per waiter, the most covers they may have seated at once
+        self.allowed: List[Optional[set]] = [None] * len(reservations)
+        self.capacity = [None] * len(waiter_ids)
+        if limits is not None:
+            waiter_limits = [limits.get(waiter_id, UNLIMITED) for waiter_id in waiter_ids]
+            self.capacity = [each.max_covers for each in waiter_limits]
+            self.allowed = [
+                {waiter for waiter, each in enumerate(waiter_limits) if each.can_serve(start, end, covers)}
+                for start, end, covers in zip(starts, ends, self.covers)
+            ]
+
+        totals = [0] * segments
+        for index, (first, last) in enumerate(self.spans):
+            for segment in range(first, last):
+                totals[segment] += self.covers[index]
+        self.lower_bound = max(
+            max((-(-total // len(waiter_ids)) for total in totals), default=0),
+            max(self.covers, default=0)
+        )
+
+    def place(self, index: int, waiter: int):
+        first, last = self.spans[index]
+        load = self.loads[waiter]
+        for segment in range(first, last):
+            load[segment] += self.covers[index]
+        self.owner[index] = waiter
+        self.tables[waiter].append(index)
+
+    def remove(self, index: int):
+        waiter = self.owner[index]
+        first, last = self.spans[index]
+        load = self.loads[waiter]
+        for segment in range(first, last):
+            load[segment] -= self.covers[index]
+        self.tables[waiter].remove(index)
+
+    def may_take(self, waiter: int, index: int, peak: int) -> bool:
+        # Whether `waiter` may serve table `index` with `peak` covers at most seated
+        allowed = self.allowed[index]
+        capacity = self.capacity[waiter]
+        return (allowed is None or waiter in allowed) and (capacity is None or peak <= capacity)
+
+    def refresh_peak(self, waiter: int):
+        self.peaks[waiter] = max(self.loads[waiter], default=0)
+
+    def score(self, peaks: List[int]) -> Tuple[int, int, int]:
+        top = max(peaks, default=0)
+        return top, peaks.count(top), sum(peak * peak for peak in peaks)
+
+    def peak_without(self, waiter: int, index: int) -> int:
+        load = self.loads[waiter]
+        first, last = self.spans[index]
+        inside = max(load[first:last], default=0) - self.covers[index]
+        return max(max(load[:first], default=0), max(load[last:], default=0), inside)
+
+    def peak_with(self, waiter: int, index: int) -> int:
+        first, last = self.spans[index]
+        return max(self.peaks[waiter], max(self.loads[waiter][first:last], default=0) + self.covers[index])
+
+    def peak_swapped(self, waiter: int, leaving: int, arriving: int) -> int:
+        load = list(self.loads[waiter])
+        first, last = self.spans[leaving]
+        for segment in range(first, last):
+            load[segment] -= self.covers[leaving]
+        first, last = self.spans[arriving]
+        for segment in range(first, last):
+            load[segment] += self.covers[arriving]
+        return max(load, default=0)
+
+    def peak_tables(self, waiter: int, top: int) -> List[int]:
+        # Tables of `waiter` seated during one of its segments at `top` covers
+        load = self.loads[waiter]
+        return [
+            index for index in self.tables[waiter]
+            if top in load[self.spans[index][0]:self.spans[index][1]]
+        ]
+
+    def improving_move(self, deadline: float) -> Optional[Tuple[str, int, int, int]]:
+        # First relocation, else first swap, that takes a table off a peak
+        # waiter and lowers the score; None when there is none or time is up
+        current = self.score(self.peaks)
+        top = current[0]
+        bottlenecks = [waiter for waiter, peak in enumerate(self.peaks) if peak == top]
+        candidates = [(waiter, index) for waiter in bottlenecks for index in self.peak_tables(waiter, top)]
+        # Larger parties first: moving them frees the most covers
+        candidates.sort(key=lambda item: -self.covers[item[1]])
+        others = sorted(range(len(self.waiter_ids)), key=lambda waiter: self.peaks[waiter])
+        for waiter, index in candidates:
+            without = self.peak_without(waiter, index)
+            for other in others:
+                if other == waiter:
+                    continue
+                with_table = self.peak_with(other, index)
+                if with_table >= top or not self.may_take(other, index, with_table):
+                    continue
+                peaks = list(self.peaks)
+                peaks[waiter] = without
+                peaks[other] = with_table
+                if self.score(peaks) < current:
+                    return "move", index, other, -1
+        for waiter, index in candidates:
+            if time.perf_counter() >= deadline:
+                return None
+            first, last = self.spans[index]
+            for other in others:
+                if other == waiter:
+                    continue
+                for partner in self.tables[other]:
+                    partner_first, partner_last = self.spans[partner]
+                    if self.covers[partner] >= self.covers[index] or partner_last <= first or last <= partner_first:
+                        continue
+                    peaks = list(self.peaks)
+                    peaks[other] = self.peak_swapped(other, partner, index)
+                    if peaks[other] >= top or not self.may_take(other, index, peaks[other]):
+                        continue
+                    peaks[waiter] = self.peak_swapped(waiter, index, partner)
+                    if not self.may_take(waiter, partner, peaks[waiter]):
+                        continue
+                    if self.score(peaks) < current:
+                        return "swap", index, other, partner
+        return None
+
+    def apply(self, kind: str, index: int, other: int, partner: int):
+        waiter = self.owner[index]
+        self.remove(index)
+        self.place(index, other)
+        if kind == "swap":
+            self.remove(partner)
+            self.place(partner, waiter)
+        self.refresh_peak(waiter)
+        self.refresh_peak(other)
+
+    def snapshot(self) -> List[int]:
+        return list(self.owner)
+
+    def restore(self, owner: List[int]):
+        for waiter in range(len(self.waiter_ids)):
+            self.loads[waiter] = [0] * len(self.loads[waiter])
+            self.tables[waiter] = []
+        for index, waiter in enumerate(owner):
+            self.place(index, waiter)
+        for waiter in range(len(self.waiter_ids)):
+            self.refresh_peak(waiter)
+
+    def load_curve(self, waiter: int) -> List[Tuple[int, int]]:
+        curve = []
+        previous = None
+        for segment, value in enumerate(self.loads[waiter]):
+            if value != previous:
+                curve.append((self.points[segment], value))
+                previous = value
+        if curve and curve[-1][1] != 0:
+            curve.append((self.points[-1], 0))
+        return curve
+
+def solve(waiter_ids: List[int], reservations: List[dict], time_budget_seconds: float = 0.2,
+          seed: int = 0, limits: Optional[Dict[int, WaiterLimits]] = None) -> SolverResult:
+    started = time.perf_counter()
+    deadline = started + time_budget_seconds
+    if not waiter_ids:
+        return SolverResult({}, 0, 0, True, 0, 0.0)
+
+    search = _Search(waiter_ids, reservations, limits)
+    position = {id(reservation): index for index, reservation in enumerate(reservations)}
+    waiter_index = {waiter_id: index for index, waiter_id in enumerate(waiter_ids)}
+    for waiter_id, tables in partition_intervals(waiter_ids, reservations, limits).items():
+        for table in tables:
+            search.place(position[id(table)], waiter_index[waiter_id])
+    for waiter in range(len(waiter_ids)):
+        search.refresh_peak(waiter)
+
+    rng = random.Random(seed)
+    best_owner = search.snapshot()
+    best_score = search.score(search.peaks)
+    iterations = 0
+    stalled = 0
+    while best_score[0] > search.lower_bound and stalled < MAX_STALLED_KICKS and time.perf_counter() < deadline:
+        iterations += 1
+        move = search.improving_move(deadline)
+        if move is not None:
+            search.apply(*move)
+            score = search.score(search.peaks)
+            if score < best_score:
+                best_score = score
+                best_owner = search.snapshot()
+                stalled = 0
+            continue
+        # Local optimum: kick a random peak table to the waiter it fits best
+        # with and keep searching from there
+        if time.perf_counter() >= deadline:
+            break
+        stalled += 1
+        top = max(search.peaks)
+        waiter = rng.choice([waiter for waiter, peak in enumerate(search.peaks) if peak == top])
+        index = rng.choice(search.peak_tables(waiter, top))
+        targets = [
+            other for other in range(len(waiter_ids))
+            if other != waiter and search.may_take(other, index, search.peak_with(other, index))
+        ]
+        if not targets:
+            continue
+        target = min(targets, key=lambda other: (search.peak_with(other, index), rng.random()))
+        search.apply("move", index, target, -1)
+
+    search.restore(best_owner)
+    assignments = {waiter_id: [] for waiter_id in waiter_ids}
+    for index in sorted(range(len(reservations)), key=lambda i: (search.points[search.spans[i][0]] if search.points else 0)):
+        assignments[waiter_ids[search.owner[index]]].append(reservations[index])
+    return SolverResult(
+        assignments=assignments,
+        objective=best_score[0],
+        lower_bound=search.lower_bound,
+        optimal=best_score[0] <= search.lower_bound,
+        iterations=iterations,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        load_curves={waiter_id: search.load_curve(index) for index, waiter_id in enumerate(waiter_ids)}
+    )
@@ -0,0 +1,294 @@
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+# Shared application state: roster and assignment snapshots, per-diner
+# enrichment results, waiter briefings and counters. Handlers only talk to this
+# interface so several uvicorn workers can serve the same assignments when a
+# shared backend (SQLite in WAL mode, or a Redis-compatible server) is used.
+#
+# Values are JSON-serializable. Entries live in namespaces (e.g. "allergies")
+# keyed by string. Snapshots are whole documents (e.g. the current assignment)
+# with a version that increases on every write; put_snapshot can be made
+# conditional on the version the caller read, so concurrent writers from
+# different workers cannot silently overwrite each other.
+
+# Default for pop() that no stored value can be
+_MISSING = object()
+
+class MemoryState:
+    # Default: plain dicts in this process. Only correct with a single worker.
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._counters: Dict[str, int] = {}
+        self._snapshots: Dict[str, Tuple[int, Any]] = {}
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        return self._entries.get(namespace, {}).get(key)
+
+    def set(self, namespace: str, key: str, value: Any):
+        self._entries.setdefault(namespace, {})[key] = value
+
+    def add(self, namespace: str, key: str, value: Any) -> bool:
+        # Insert only if absent; True when this call inserted the value
+        entries = self._entries.setdefault(namespace, {})
+        if key in entries:
+            return False
+        entries[key] = value
+        return True
+
+    def delete(self, namespace: str, key: str) -> bool:
+        # True when this call removed the value
+        return self._entries.get(namespace, {}).pop(key, _MISSING) is not _MISSING
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        return dict(self._entries.get(namespace, {}))
+
+    def clear(self, namespace: str):
+        self._entries.pop(namespace, None)
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        self._counters[name] = self._counters.get(name, 0) + amount
+        return self._counters[name]
+
+    def counter(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def snapshot_version(self, name: str) -> int:
+        return self._snapshots.get(name, (0, None))[0]
+
+    def get_snapshot(self, name: str) -> Tuple[int, Any]:
+        # (0, None) until the first write
+        return self._snapshots.get(name, (0, None))
+
+    def put_snapshot(self, name: str, value: Any, expected_version: Optional[int] = None) -> Optional[int]:
+        # Returns the new version, or None when expected_version is stale
+        version = self.snapshot_version(name)
+        if expected_version is not None and expected_version != version:
+            return None
+        self._snapshots[name] = (version + 1, value)
+        return version + 1
+
+    def close(self):
+        pass
+
+class SqliteState:
+    # Shared between the workers on one host through a SQLite file in WAL mode.
+    # Decoded snapshots are kept per process and only re-read when the version
+    # in the database moves.
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._snapshot_cache: Dict[str, Tuple[int, Any]] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " name TEXT PRIMARY KEY,"
+            " version INTEGER NOT NULL,"
+            " value TEXT NOT NULL)"
+        )
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value) VALUES (?, ?, ?)",
+                (namespace, key, json.dumps(value))
+            )
+
+    def add(self, namespace: str, key: str, value: Any) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO entries (namespace, key, value) VALUES (?, ?, ?)",
+                (namespace, key, json.dumps(value))
+            )
+        return cursor.rowcount == 1
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+        return cursor.rowcount == 1
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM entries WHERE namespace = ?", (namespace,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def clear(self, namespace: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?)"
+                    " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, amount)
+                )
+                value = self._conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()[0]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return value
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def snapshot_version(self, name: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM snapshots WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def get_snapshot(self, name: str) -> Tuple[int, Any]:
+        version = self.snapshot_version(name)
+        cached = self._snapshot_cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached
+        with self._lock:
+            row = self._conn.execute("SELECT version, value FROM snapshots WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return 0, None
+        snapshot = (row[0], json.loads(row[1]))
+        self._snapshot_cache[name] = snapshot
+        return snapshot
+
+    def put_snapshot(self, name: str, value: Any, expected_version: Optional[int] = None) -> Optional[int]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT version FROM snapshots WHERE name = ?", (name,)).fetchone()
+                version = row[0] if row else 0
+                if expected_version is not None and expected_version != version:
+                    self._conn.execute("ROLLBACK")
+                    return None
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO snapshots (name, version, value) VALUES (?, ?, ?)",
+                    (name, version + 1, json.dumps(value))
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._snapshot_cache[name] = (version + 1, value)
+        return version + 1
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class RedisState:
+    # Shared through a Redis-compatible server (Redis, Valkey, KeyDB, ...).
+    # Namespaces are hashes, snapshots are hashes holding version and value, and
+    # conditional snapshot writes use WATCH/MULTI.
+
+    def __init__(self, url: str, prefix: str = "laudure"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("STATE_BACKEND=redis requires the redis package (pip install redis)") from e
+        self._redis = redis
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._snapshot_cache: Dict[str, Tuple[int, Any]] = {}
+
+    def _key(self, kind: str, name: str) -> str:
+        return f"{self.prefix}:{kind}:{name}"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        value = self._client.hget(self._key("ns", namespace), key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, namespace: str, key: str, value: Any):
+        self._client.hset(self._key("ns", namespace), key, json.dumps(value))
+
+    def add(self, namespace: str, key: str, value: Any) -> bool:
+        return bool(self._client.hsetnx(self._key("ns", namespace), key, json.dumps(value)))
+
+    def delete(self, namespace: str, key: str) -> bool:
+        return self._client.hdel(self._key("ns", namespace), key) == 1
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        return {
+            key.decode("utf-8"): json.loads(value)
+            for key, value in self._client.hgetall(self._key("ns", namespace)).items()
+        }
+
+    def clear(self, namespace: str):
+        self._client.delete(self._key("ns", namespace))
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        return self._client.incrby(self._key("counter", name), amount)
+
+    def counter(self, name: str) -> int:
+        value = self._client.get(self._key("counter", name))
+        return int(value) if value is not None else 0
+
+    def snapshot_version(self, name: str) -> int:
+        value = self._client.hget(self._key("snapshot", name), "version")
+        return int(value) if value is not None else 0
+
+    def get_snapshot(self, name: str) -> Tuple[int, Any]:
+        version = self.snapshot_version(name)
+        cached = self._snapshot_cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached
+        version, value = self._client.hmget(self._key("snapshot", name), "version", "value")
+        if version is None:
+            return 0, None
+        snapshot = (int(version), json.loads(value))
+        self._snapshot_cache[name] = snapshot
+        return snapshot
+
+    def put_snapshot(self, name: str, value: Any, expected_version: Optional[int] = None) -> Optional[int]:
+        key = self._key("snapshot", name)
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                current = pipe.hget(key, "version")
+                version = int(current) if current is not None else 0
+                if expected_version is not None and expected_version != version:
+                    pipe.unwatch()
+                    return None
+                pipe.multi()
+                pipe.hset(key, mapping={"version": version + 1, "value": json.dumps(value)})
+                pipe.execute()
+            except self._redis.WatchError:
+                return None
+        self._snapshot_cache[name] = (version + 1, value)
+        return version + 1
+
+    def close(self):
+        self._client.close()
+
+def open_state(backend: str, sqlite_path: str, redis_url: str):
+    if backend == "memory":
+        return MemoryState()
+    if backend == "sqlite":
+        return SqliteState(sqlite_path)
+    if backend == "redis":
+        return RedisState(redis_url)
+    raise ValueError(f"Unknown STATE_BACKEND: {backend}")
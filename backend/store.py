@@ -0,0 +1,252 @@
+import bisect
+import itertools
+import logging
+from collections import defaultdict
+from dataclasses import replace
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from metrics import log_event
+from records import Diner, Email, OrderTable, Reservation, Review, ServiceKey
+from scheduler import load_curve
+
+class Partition:
+    # The reservations of one service (or of all services, for the store-wide
+    # view). Totals are kept as reservations arrive; the start-time index is
+    # only sorted when it is first read, so loading many services costs one
+    # append per reservation and a query pays for its own service alone.
+
+    def __init__(self):
+        # (start_minute, sequence, reservation)
+        self._time_index: List[Tuple[int, int, Reservation]] = []
+        self._sorted = True
+        self.total_reservations = 0
+        self.total_guests = 0
+        self.diners: Set[str] = set()
+        # bucket_minutes -> curve, dropped whenever a reservation is added
+        self.load_curves: Dict[int, List[Tuple[int, int]]] = {}
+
+    def add(self, reservation: Reservation, entry: Optional[Tuple[int, int, Reservation]]):
+        self.total_reservations += 1
+        self.total_guests += reservation.number_of_people
+        self.diners.add(reservation.diner_name)
+        if entry is None:
+            return
+        if self._time_index and entry < self._time_index[-1]:
+            # Re-sorted on the next read; nearly sorted input sorts in linear time
+            self._sorted = False
+        self._time_index.append(entry)
+        self.load_curves.clear()
+
+    @property
+    def time_index(self) -> List[Tuple[int, int, Reservation]]:
+        if not self._sorted:
+            self._time_index.sort()
+            self._sorted = True
+        return self._time_index
+
+    def stats(self) -> dict:
+        return {
+            "total_reservations": self.total_reservations,
+            "total_guests": self.total_guests
+        }
+
+# Store versions; unique across stores so a rebuilt store never reuses one
+_versions = itertools.count(1)
+
+class DiningStore:
+    # In-memory view over the dining dataset, built once at startup. The parsed
+    # JSON is not kept: diners and reservations are held as the immutable
+    # records of records.py. Diners are hashed by name, reservations are kept
+    # sorted by start minute, dietary tags map to the diners who ordered them,
+    # and the daily totals are updated as diners and reservations are added
+    # instead of being recomputed per request.
+    # Reservations are also partitioned by service (location, date) so stats and
+    # queries for one service only touch that service's reservations.
+    # When built from a snapshot, diner records (reviews, emails) stay in the
+    # memory-mapped file until a diner is first looked up.
+    # `version` changes whenever a diner or reservation is added or a diner's
+    # reviews or emails change, so anything serialized from the store can be
+    # keyed on it.
+
+    def __init__(self, dining_data: dict):
+        self._snapshot = None
+        # Snapshot diners not yet materialized: name -> diner index
+        self._pending: Dict[str, int] = {}
+        # Every diner name in dataset order, materialized or not
+        self.diner_names: List[str] = []
+        self.diners_by_name: Dict[str, Diner] = {}
+        self.reservations_by_diner: Dict[str, List[Reservation]] = defaultdict(list)
+        self.tag_index: Dict[str, Set[str]] = defaultdict(set)
+        # Every reservation, and the reservations of each service
+        self.everything = Partition()
+        self.partitions: Dict[ServiceKey, Partition] = {}
+        self._sequence = 0
+        # Identical orders across this store's reservations share one record
+        self._orders: OrderTable = {}
+        self.version = next(_versions)
+
+        for diner in dining_data.get("diners", []):
+            self.add_diner(diner)
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "DiningStore":
+        store = cls({"diners": []})
+        store._snapshot = snapshot
+        names = [snapshot.diner_name(index) for index in range(snapshot.diner_count)]
+        store._pending = {name: index for index, name in enumerate(names)}
+        store.diner_names.extend(names)
+        store.version = next(_versions)
+        for index, diner_index in enumerate(snapshot.columns["res_diner"]):
+            store._index_reservation(snapshot.reservation_record(index, names[diner_index], store._orders))
+        return store
+
+    def _materialize(self, diner_name: str) -> Optional[Diner]:
+        diner_index = self._pending.pop(diner_name, None)
+        if diner_index is None:
+            return None
+        diner = Diner.from_dict({"name": diner_name, **self._snapshot.diner_details(diner_index)})
+        self.diners_by_name[diner_name] = diner
+        return diner
+
+    @property
+    def dining_data(self) -> dict:
+        # Full dataset in its original shape, rebuilt from the records; snapshot
+        # diners are decoded on first access
+        return {"diners": [self.diner_dict(name) for name in self.diner_names]}
+
+    def diner_dict(self, diner_name: str) -> Optional[dict]:
+        diner = self.get_diner(diner_name)
+        if diner is None:
+            return None
+        data = diner.as_dict()
+        data["reservations"] = [reservation.as_dict() for reservation in self.reservations_by_diner.get(diner_name, [])]
+        return data
+
+    def diners(self) -> List[Diner]:
+        return [self.get_diner(name) for name in self.diner_names]
+
+    def _index_reservation(self, reservation: Reservation):
+        diner_name = reservation.diner_name
+        self.reservations_by_diner[diner_name].append(reservation)
+
+        for tag in reservation.dietary_tags:
+            self.tag_index[tag.lower()].add(diner_name)
+
+        if reservation.start_minute is None:
+            log_event("reservation not time-indexed", logging.WARNING, diner=diner_name)
+            entry = None
+        else:
+            entry = (reservation.start_minute, self._sequence, reservation)
+            self._sequence += 1
+        service = reservation.service
+        partition = self.partitions.get(service)
+        if partition is None:
+            partition = self.partitions[service] = Partition()
+        partition.add(reservation, entry)
+        self.everything.add(reservation, entry)
+        self.version = next(_versions)
+
+    def add_diner(self, diner: dict):
+        if self.get_diner(diner["name"]) is not None:
+            for reservation in diner.get("reservations", []):
+                self.add_reservation(diner["name"], reservation)
+            return
+        record = Diner.from_dict(diner)
+        self.diners_by_name[record.name] = record
+        self.diner_names.append(record.name)
+        self.version = next(_versions)
+        for reservation in diner.get("reservations", []):
+            self._index_reservation(Reservation.from_dict(record.name, reservation, self._orders))
+
+    def add_reservation(self, diner_name: str, reservation: dict) -> Reservation:
+        record = Reservation.from_dict(diner_name, reservation, self._orders)
+        self._index_reservation(record)
+        return record
+
+    def merge_diner(self, diner: dict) -> Tuple[List[Reservation], bool]:
+        # Applies one diner record from a reloaded dataset or an ingest. Returns
+        # the reservations that were not known yet and whether the diner's
+        # reviews or emails changed. Reservations missing from the record are
+        # kept: removals only take effect on restart.
+        name = diner["name"]
+        existing = self.get_diner(name)
+        if existing is None:
+            self.add_diner(diner)
+            return list(self.reservations_by_diner.get(name, [])), False
+        # Records compare by value, so known reservations are found by hashing
+        known = set(self.reservations_by_diner.get(name, []))
+        added = []
+        for data in diner.get("reservations", []):
+            reservation = Reservation.from_dict(name, data, self._orders)
+            if reservation not in known:
+                known.add(reservation)
+                self._index_reservation(reservation)
+                added.append(reservation)
+        updated = replace(
+            existing,
+            emails=tuple(Email.from_dict(email) for email in diner["emails"]) if "emails" in diner else existing.emails,
+            reviews=tuple(Review.from_dict(review) for review in diner["reviews"]) if "reviews" in diner else existing.reviews
+        )
+        details_changed = updated != existing
+        if details_changed:
+            self.diners_by_name[name] = updated
+            self.version = next(_versions)
+        return added, details_changed
+
+    def get_diner(self, diner_name: str) -> Optional[Diner]:
+        diner = self.diners_by_name.get(diner_name)
+        if diner is None and self._pending:
+            diner = self._materialize(diner_name)
+        return diner
+
+    def lookup(self, diner_name: str) -> Optional[dict]:
+        # Diner plus their earliest reservation (None without one), the shape the enrichment helpers expect
+        diner = self.get_diner(diner_name)
+        if diner is None:
+            return None
+        reservations = self.reservations_by_diner.get(diner_name)
+        return {"diner": diner, "reservation": reservations[0] if reservations else None}
+
+    def partition(self, service: Optional[ServiceKey] = None) -> Optional[Partition]:
+        # One service's partition, the store-wide one for None, or None when
+        # the service has no reservations
+        return self.everything if service is None else self.partitions.get(service)
+
+    def services_of(self, diner_name: str) -> Set[ServiceKey]:
+        return {reservation.service for reservation in self.reservations_by_diner.get(diner_name, [])}
+
+    def iter_reservations(self, service: Optional[ServiceKey] = None) -> Iterator[Reservation]:
+        partition = self.partition(service)
+        for _, _, reservation in partition.time_index if partition else []:
+            yield reservation
+
+    def reservations_between(self, start_minute: int, end_minute: int,
+                             service: Optional[ServiceKey] = None) -> List[Reservation]:
+        # Reservations starting in [start_minute, end_minute)
+        partition = self.partition(service)
+        if partition is None:
+            return []
+        time_index = partition.time_index
+        lo = bisect.bisect_left(time_index, (start_minute,))
+        hi = bisect.bisect_left(time_index, (end_minute,))
+        return [reservation for _, _, reservation in time_index[lo:hi]]
+
+    def load_curve(self, bucket_minutes: int = 15, service: Optional[ServiceKey] = None) -> List[Tuple[int, int]]:
+        partition = self.partition(service)
+        if partition is None:
+            return []
+        curve = partition.load_curves.get(bucket_minutes)
+        if curve is None:
+            curve = load_curve(
+                ((start, reservation.number_of_people) for start, _, reservation in partition.time_index),
+                bucket_minutes
+            )
+            partition.load_curves[bucket_minutes] = curve
+        return curve
+
+    def diners_with_tag(self, tag: str) -> Set[str]:
+        return self.tag_index.get(tag.lower(), set())
+
+    def stats(self, service: Optional[ServiceKey] = None) -> dict:
+        partition = self.partition(service)
+        return partition.stats() if partition else Partition().stats()
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Backend modules import each other flat, as when uvicorn runs from backend/
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from scheduler import WaiterLimits, seating_duration, table_interval, to_minutes
+
+# main reads its settings at import: keep the tests off the network and away
+# from the real response cache
+_scratch = tempfile.mkdtemp(prefix="laudure-tests-")
+os.environ.update({
+    "OPENAI_API_KEY": "test",
+    "OPENAI_BASE_URL": "http://127.0.0.1:9/v1",
+    "LLM_CACHE_PATH": os.path.join(_scratch, "llm_cache.sqlite3"),
+    "PRECOMPUTE_ON_LOAD": "0",
+    "DATASET_WATCH_SECONDS": "0",
+})
+
+def diner(name, start_time="19:00", people=2, emails=(), reviews=(), **reservation):
+    # One diner with one reservation, in the dataset's JSON shape
+    return {
+        "name": name,
+        "reservations": [{"start_time": start_time, "number_of_people": people, "orders": [], **reservation}],
+        "emails": [{"subject": "Reservation", "combined_thread": text} for text in emails],
+        "reviews": [{"content": text, "rating": 5} for text in reviews],
+    }
+
+def table(name, start_time, people):
+    # A table as the scheduler sees it
+    return {"diner_name": name, "start_time": start_time, "number_of_people": people}
+
+def covers(tables):
+    return sum(t["number_of_people"] for t in tables)
+
+def peak(tables):
+    # Most covers seated at once, checked at every start time
+    intervals = [(to_minutes(t["start_time"]), t["number_of_people"]) for t in tables]
+    return max((
+        sum(people for start, people in intervals if start <= minute < start + seating_duration(people))
+        for minute, _ in intervals
+    ), default=0)
+
+def random_tables(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        table(f"Diner {index}", f"{rng.randint(11, 21)}:{rng.choice(['00', '15', '30', '45'])}", rng.randint(1, 8))
+        for index in range(count)
+    ]
+
+def respects(assignments, limits):
+    # Every table within its waiter's shift and sections, every waiter within max_covers
+    for waiter_id, waiter_tables in assignments.items():
+        waiter_limits = limits.get(waiter_id, WaiterLimits())
+        for t in waiter_tables:
+            if not waiter_limits.can_serve(*table_interval(t), t["number_of_people"]):
+                return False
+        if waiter_limits.max_covers is not None and peak(waiter_tables) > waiter_limits.max_covers:
+            return False
+    return True
+
+def random_limits(waiter_ids, rng):
+    shifts = [(11 * 60, 17 * 60), (16 * 60, 24 * 60), (0, 24 * 60)]
+    return {
+        waiter_id: WaiterLimits(*rng.choice(shifts), rng.choice([6, 12, None]), rng.choice([10, 16, None]))
+        for waiter_id in waiter_ids
+    }
+
+class FakeOpenAI:
+    # Stands in for the gateway's OpenAI client: `reply(system_prompt, user_prompt)`
+    # answers every completion after `delay` seconds, and every call is recorded
+    def __init__(self):
+        self.reply = lambda system_prompt, user_prompt: "No Allergies"
+        self.delay = 0
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        system_prompt, user_prompt = messages[0]["content"], messages[-1]["content"]
+        self.calls.append((system_prompt, user_prompt))
+        await asyncio.sleep(self.delay)
+        content = self.reply(system_prompt, user_prompt)
+        if stream:
+            # A streamed completion: the reply word by word
+            return FakeStream([
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))], usage=None)
+                for word in content.split(" ")
+            ])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    async def close(self):
+        pass
+
+class FakeStream:
+    # Stands in for the client's AsyncStream: yields `chunks`, waiting `delay`
+    # seconds before each, and records whether it was closed
+    def __init__(self, chunks, delay=0.0):
+        self.chunks = chunks
+        self.delay = delay
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+def run(coro):
+    # asyncio.run would leave no current event loop behind, which the
+    # TestClient of this FastAPI version still asks for
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+def wait_for(client, predicate, timeout=5.0):
+    # Background work only advances while the test client serves a request
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        client.get("/daily-stats")
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+@pytest.fixture
+def serve(tmp_path, monkeypatch):
+    # serve(dataset) -> TestClient over the app with `dataset` loaded in place
+    # of the bundled one, a fake model, fresh state and an empty response cache;
+    # the dataset and roster files are at serve.dataset_path and
+    # serve.waiters_path (a copy of waiters.json) for reload tests
+    from fastapi.testclient import TestClient
+
+    import main
+    from projection import ProjectionCache
+    from state import MemoryState
+    from waiters import WaitersFile
+
+    model = FakeOpenAI()
+    monkeypatch.setattr(main.llm_gateway, "client", model)
+    monkeypatch.setattr(main, "state", MemoryState())
+    monkeypatch.setattr(main, "projections", ProjectionCache())
+    monkeypatch.setattr(main, "attendance_bodies", {})
+    main.llm_cache.clear()
+    dataset_path = tmp_path / "dataset.json"
+    monkeypatch.setenv("DINING_DATASET_PATH", str(dataset_path))
+    waiters_path = tmp_path / "waiters.json"
+    with open(os.path.join(BACKEND_DIR, "..", "waiters.json")) as f:
+        waiters_path.write_text(f.read())
+    monkeypatch.setattr(main, "waiters_file", WaitersFile(str(waiters_path)))
+
+    def start(dataset):
+        dataset_path.write_text(json.dumps(dataset))
+        return TestClient(main.app)
+
+    start.model = model
+    start.dataset_path = dataset_path
+    start.waiters_path = waiters_path
+    start.main = main
+    return start
@@ -0,0 +1,60 @@
+import pytest
+
+import allergy_rules
+from conftest import diner, run
+from records import Diner, Reservation
+
+def extract(text):
+    return allergy_rules.extract([text])
+
+@pytest.mark.parametrize("text", [
+    "No rush, we would love the cheese course.",
+    "We loved the fish and the wine, no complaints.",
+])
+def test_distant_no_is_not_a_restriction(text):
+    result = extract(text)
+    assert result.findings == []
+    assert result.ambiguous
+
+@pytest.mark.parametrize("text, findings", [
+    ("No fish please.", ["Avoids fish"]),
+    ("Please, no shellfish or nuts for my husband.", ["Avoids shellfish", "Avoids nut"]),
+    ("The menu without dairy, eggs and soy.", ["Avoids dairy", "Avoids egg", "Avoids soy"]),
+    ("I am allergic to peanuts.", ["Peanut allergy"]),
+    ("She is lactose intolerant.", ["Lactose intolerance"]),
+    ("We are vegetarian.", ["Vegetarian"]),
+    ("Please avoid fish sauce in every course.", ["Avoids fish sauce"]),
+])
+def test_cued_allergens(text, findings):
+    result = extract(text)
+    assert result.findings == findings
+    assert not result.ambiguous
+
+def test_whole_words_only():
+    # "nut" inside "peanut" or "nutrition" is not a match
+    assert extract("He has a peanut allergy.").findings == ["Peanut allergy"]
+    assert extract("We follow the nutrition guidelines.").findings == []
+
+def test_negated_cue_is_no_allergy():
+    result = extract("We are not allergic to anything.")
+    assert result.as_text() == allergy_rules.NO_ALLERGIES
+    assert not result.ambiguous
+
+def test_allergen_without_cue_is_escalated():
+    assert extract("Does the soup have cream in it?").ambiguous
+
+def test_dietary_tags_are_findings():
+    assert allergy_rules.extract([], ["gluten-free"]).findings == ["Gluten-free"]
+
+def records(data):
+    return Diner.from_dict(data), Reservation.from_dict(data["name"], data["reservations"][0])
+
+def test_only_ambiguous_diners_reach_the_model(serve):
+    main = serve.main
+    serve.model.reply = lambda system_prompt, user_prompt: "Dairy intolerance"
+    clear = records(diner("Ada Lovelace", emails=["I am allergic to peanuts."]))
+    assert run(main.extract_allergies(*clear)) == "Peanut allergy"
+    assert serve.model.calls == []
+    unclear = records(diner("Grace Hopper", emails=["Does the soup have cream in it?"]))
+    assert run(main.extract_allergies(*unclear)) == "Dairy intolerance"
+    assert len(serve.model.calls) == 1
@@ -0,0 +1,37 @@
+from conftest import diner
+
+DATASET = {"diners": [diner(f"Diner {index}", start_time=f"{18 + index}:00") for index in range(4)]}
+
+def test_unchanged_attendance_revalidates_with_304(serve):
+    with serve(DATASET) as client:
+        assert client.post("/attendance", json={"waiter_ids": [1, 2]}).status_code == 200
+        first = client.get("/attendance")
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "no-cache"
+        assert first.json()["waiter_ids"] == [1, 2]
+
+        revalidated = client.get("/attendance", headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == etag
+
+        assert client.post("/attendance", json={"waiter_ids": [1, 2, 3]}).status_code == 200
+        changed = client.get("/attendance", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert changed.json()["waiter_ids"] == [1, 2, 3]
+
+def test_fallback_briefings_are_never_cached(serve):
+    def reply(system_prompt, user_prompt):
+        if "briefings" in system_prompt:
+            raise RuntimeError("upstream down")
+        return "No Allergies"
+
+    serve.model.reply = reply
+    with serve(DATASET) as client:
+        assert client.post("/attendance", json={"waiter_ids": [1]}).status_code == 200
+        response = client.get("/attendance")
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+        assert response.headers["cache-control"] == "no-store"
+        assert response.headers["x-degraded"] == "waiter_summary"
+        assert response.json()["assignments"][0]["summary"].startswith("You have 8 guests")
@@ -0,0 +1,55 @@
+import json
+import re
+
+from batching import pack, parse, render, run_batches
+from conftest import run
+from prompts import estimate_tokens
+
+ITEM = re.compile(r"^### (\d+)\n(.*)$", re.MULTILINE)
+
+def test_pack_respects_budget_and_item_limit():
+    items = [(f"key {index}", "word " * (index % 7 + 1)) for index in range(50)]
+    batches = pack(items, budget=20, max_items=4)
+    assert [item for batch in batches for item in batch] == items
+    for batch in batches:
+        assert len(batch) <= 4
+        assert len(batch) == 1 or sum(estimate_tokens(text) for _, text in batch) <= 20
+
+def test_parse_tolerates_prose_and_rejects_garbage():
+    assert parse('Sure! ```json\n{"1": "No Allergies"}\n```') == {"1": "No Allergies"}
+    assert parse("no json here") == {}
+    assert parse("{not json}") == {}
+
+def test_only_missing_items_are_retried_in_smaller_batches():
+    items = {f"Diner {index}": f"email {index}" for index in range(6)}
+    calls = []
+
+    async def call(prompt, count):
+        numbered = ITEM.findall(prompt)
+        calls.append([text for _, text in numbered])
+        # The first attempt drops "email 3" and answers "email 4" with something invalid
+        answers = {}
+        for number, text in numbered:
+            if len(calls) == 1 and text == "email 3":
+                continue
+            answers[number] = 7 if len(calls) == 1 and text == "email 4" else text.upper()
+        return json.dumps(answers)
+
+    def validate(value):
+        return value if isinstance(value, str) else None
+
+    results, failed, sent = run(run_batches(items, "Shout each email.", call, validate, 1000, 6))
+    assert results == {key: text.upper() for key, text in items.items()}
+    assert failed == []
+    assert calls[0] == list(items.values())
+    # The retry carries only the two missing items, in a batch half the size limit
+    assert sorted(text for batch in calls[1:] for text in batch) == ["email 3", "email 4"]
+    assert all(len(batch) <= 3 for batch in calls[1:])
+    assert sent == sum(estimate_tokens(render("Shout each email.", [(None, text) for text in batch])) for batch in calls)
+
+def test_items_still_missing_are_reported():
+    async def call(prompt, count):
+        raise RuntimeError("upstream down")
+
+    results, failed, _ = run(run_batches({"a": "x", "b": "y"}, "Do it.", call, lambda v: v, 1000, 10))
+    assert results == {} and sorted(failed) == ["a", "b"]
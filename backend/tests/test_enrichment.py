@@ -0,0 +1,51 @@
+import json
+import re
+
+import pytest
+
+from conftest import diner, wait_for
+
+DATASET = {"diners": [
+    diner("Ada Lovelace", start_time="18:00", emails=["I am allergic to shellfish."]),
+    diner("Grace Hopper", start_time="19:00", emails=["It is our anniversary!"]),
+    diner("Alan Turing", start_time="20:00"),
+]}
+
+def answer(system_prompt, text):
+    if "special events" in system_prompt:
+        return {"is_special_event": "anniversary" in text, "event_type": "anniversary" if "anniversary" in text else None}
+    return "Shellfish allergy" if "shellfish" in text else "No Allergies"
+
+def fake_reply(system_prompt, user_prompt):
+    if "special events" not in system_prompt and "allergies" not in system_prompt:
+        return '["Quiet tables"]'
+    items = re.findall(r"^### (\d+)\n(.*)$", user_prompt, re.MULTILINE)
+    if items:
+        # A multi-diner prompt: one answer per numbered item
+        return json.dumps({number: answer(system_prompt, text) for number, text in items})
+    reply = answer(system_prompt, user_prompt)
+    return reply if isinstance(reply, str) else json.dumps(reply)
+
+def enrichment(client):
+    return client.get("/enrichment").json()
+
+@pytest.mark.parametrize("batching", [False, True])
+def test_assigned_diners_are_enriched_in_the_background(serve, monkeypatch, batching):
+    monkeypatch.setattr(serve.main, "LLM_BATCHING", batching)
+    serve.model.reply = fake_reply
+    with serve(DATASET) as client:
+        assert client.post("/attendance", json={"waiter_ids": [1, 2]}).status_code == 200
+        assert wait_for(client, lambda: enrichment(client)["state"] == "complete")
+        body = enrichment(client)
+        assert body["completed"] == body["total"]
+        diners = body["diners"]
+        assert set(diners) == {"Ada Lovelace", "Grace Hopper", "Alan Turing"}
+        assert diners["Ada Lovelace"]["allergies"] == "Shellfish allergy"
+        assert diners["Alan Turing"]["allergies"] == "No Allergies"
+        assert diners["Grace Hopper"]["special_event"] == "anniversary"
+        assert diners["Alan Turing"]["special_event"] is None
+
+        # The per-diner endpoint is now served from what the background pass computed
+        calls = len(serve.model.calls)
+        assert client.get("/allergies/Ada Lovelace").json()["allergies"] == "Shellfish allergy"
+        assert len(serve.model.calls) == calls
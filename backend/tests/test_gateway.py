@@ -0,0 +1,131 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from conftest import FakeStream, run
+from gateway import CircuitBreaker, CircuitOpenError, LLMGateway, UpstreamTimeout
+
+class FakeClient:
+    # client.chat.completions.create, answering from a script of results and errors
+    def __init__(self, *script, delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        outcome = self.script.pop(0) if self.script else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+def connection_error():
+    return openai.APIConnectionError(request=None)
+
+def gateway(client, breaker=None, max_attempts=3, timeout_seconds=1.0):
+    return LLMGateway(client, max_concurrency=2, timeout_seconds=timeout_seconds, max_attempts=max_attempts,
+                      backoff_base_seconds=0.001, backoff_max_seconds=0.005,
+                      breaker=breaker or CircuitBreaker(window=20, error_rate=0.5, cooldown_seconds=60))
+
+def test_breaker_opens_at_the_error_rate_and_closes_after_a_good_probe():
+    breaker = CircuitBreaker(window=10, error_rate=0.5, cooldown_seconds=0.05, min_calls=4)
+    for ok in (False, False, True):
+        breaker.record(ok)
+    # Below min_calls nothing trips
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open" and breaker.trips == 1
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    # One probe after the cooldown; everyone else is still refused
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed" and breaker.allow()
+
+def test_failed_probe_reopens_and_abandoned_probe_frees_the_slot():
+    breaker = CircuitBreaker(window=4, error_rate=0.5, cooldown_seconds=0.05, min_calls=2)
+    breaker.record(False)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.abandon()
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open" and breaker.trips == 2 and not breaker.allow()
+
+def test_retryable_errors_are_retried():
+    client = FakeClient(connection_error(), connection_error(), "answer")
+    llm = gateway(client)
+    assert run(llm.complete(model="gpt-4", messages=[])) == "answer"
+    assert client.calls == 3 and llm.retries == 2 and llm.in_flight == 0
+
+def test_attempts_are_bounded():
+    client = FakeClient(*[connection_error() for _ in range(5)])
+    llm = gateway(client, max_attempts=2)
+    with pytest.raises(openai.APIConnectionError):
+        run(llm.complete(model="gpt-4", messages=[]))
+    assert client.calls == 2 and llm.in_flight == 0
+
+def test_client_errors_are_not_retried_or_held_against_the_upstream():
+    breaker = CircuitBreaker(window=4, error_rate=0.5, cooldown_seconds=60, min_calls=1)
+    client = FakeClient(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        run(gateway(client, breaker).complete(model="gpt-4", messages=[]))
+    assert client.calls == 1 and breaker.state == "closed"
+
+def test_deadline_covers_the_call():
+    llm = gateway(FakeClient(delay=0.2), timeout_seconds=0.05)
+    with pytest.raises(UpstreamTimeout):
+        run(llm.complete(model="gpt-4", messages=[]))
+    assert llm.timeouts >= 1 and llm.in_flight == 0
+
+def test_open_circuit_fails_fast():
+    breaker = CircuitBreaker(window=4, error_rate=0.5, cooldown_seconds=60, min_calls=2)
+    client = FakeClient(connection_error(), connection_error())
+    llm = gateway(client, breaker, max_attempts=1)
+    for _ in range(2):
+        with pytest.raises(openai.APIConnectionError):
+            run(llm.complete(model="gpt-4", messages=[]))
+    with pytest.raises(CircuitOpenError):
+        run(llm.complete(model="gpt-4", messages=[]))
+    assert client.calls == 2 and llm.rejected == 1
+
+def test_cancelled_stream_closes_the_upstream_and_frees_the_slot():
+    upstream = FakeStream(["a", "b", "c"], delay=0.05)
+    llm = gateway(FakeClient(upstream))
+
+    async def cancel_after_first_chunk():
+        received = []
+
+        async def read():
+            async for chunk in llm.stream(model="gpt-4", messages=[]):
+                received.append(chunk)
+
+        task = asyncio.create_task(read())
+        while not received:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return received
+
+    assert run(cancel_after_first_chunk()) == ["a"]
+    assert upstream.closed and llm.in_flight == 0
+
+def test_stream_past_its_deadline_closes_the_upstream():
+    upstream = FakeStream(["a", "b"], delay=0.2)
+    llm = gateway(FakeClient(upstream), timeout_seconds=0.05)
+
+    async def consume():
+        return [chunk async for chunk in llm.stream(model="gpt-4", messages=[])]
+
+    with pytest.raises(UpstreamTimeout):
+        run(consume())
+    assert upstream.closed and llm.in_flight == 0
@@ -0,0 +1,58 @@
+import json
+
+from conftest import diner, wait_for
+
+def test_edited_email_detects_special_event_again(serve, monkeypatch):
+    monkeypatch.setattr(serve.main, "LLM_BATCHING", False)
+    serve.model.reply = lambda system_prompt, user_prompt: '{"is_special_event": true, "event_type": "anniversary"}'
+    dataset = {"diners": [diner("Ada Lovelace", emails=["It is our anniversary"], date="2024-05-01")]}
+    with serve(dataset) as client:
+        assert client.post("/attendance", json={"waiter_ids": [1]}).status_code == 200
+        assert wait_for(client, lambda: client.get("/daily-stats").json()["special_events"] == 1)
+        service_stats = lambda: client.get("/daily-stats?date=2024-05-01").json()["special_events"]
+        assert service_stats() == 1
+
+        dataset["diners"][0]["emails"][0]["combined_thread"] = "Just dinner, thanks"
+        serve.dataset_path.write_text(json.dumps(dataset))
+        serve.model.reply = lambda system_prompt, user_prompt: '{"is_special_event": false, "event_type": null}'
+        assert client.post("/dataset/reload").json()["changes"]["diners_changed"] == 1
+
+        state = serve.main.state
+        assert wait_for(client, lambda: (state.get("special_events", "Ada Lovelace") or {}).get("event_type", 1) is None)
+        assert client.get("/daily-stats").json()["special_events"] == 0
+        assert service_stats() == 0
+        # The new email was sent to the model
+        assert any("Just dinner" in prompt for _, prompt in serve.model.calls)
+
+def test_walk_in_joins_the_least_loaded_waiter(serve):
+    dataset = {"diners": [diner("Ada Lovelace", start_time="19:00", people=4), diner("Grace Hopper", start_time="19:00")]}
+    with serve(dataset) as client:
+        assert client.post("/attendance", json={"waiter_ids": [1, 2]}).status_code == 200
+        assignments = client.get("/attendance").json()["assignments"]
+        lighter = min(assignments, key=lambda a: sum(t["number_of_people"] for t in a["tables"]))["waiter_id"]
+
+        walk_in = {"diner_name": "Alan Turing", "start_time": "19:15", "number_of_people": 2}
+        response = client.post("/reservations", json=walk_in)
+        assert response.status_code == 201
+        assert [entry["waiter_id"] for entry in response.json()["assigned_to"]] == [lighter]
+        assert client.get("/daily-stats").json()["total_guests"] == 8
+        assert client.post("/reservations", json=walk_in).status_code == 409
+        assert client.post("/reservations", json={**walk_in, "start_time": "late"}).status_code == 400
+        # A service is named by its location and date together, as in the queries
+        assert client.post("/reservations", json={**walk_in, "location": "Uptown"}).status_code == 400
+        assert client.post("/reservations", json={**walk_in, "date": "June 1st"}).status_code == 400
+        assert client.get("/daily-stats").json()["total_guests"] == 8
+
+        assignments = client.get("/attendance").json()["assignments"]
+        tables = {a["waiter_id"]: [t["diner_name"] for t in a["tables"]] for a in assignments}
+        assert "Alan Turing" in tables[lighter]
+
+def test_reload_only_applies_new_and_edited_diners(serve):
+    dataset = {"diners": [diner("Ada Lovelace"), diner("Grace Hopper")]}
+    with serve(dataset) as client:
+        assert client.post("/dataset/reload").json()["changes"]["diners_changed"] == 0
+        dataset["diners"].append(diner("Alan Turing", start_time="20:00", people=3))
+        serve.dataset_path.write_text(json.dumps(dataset))
+        changes = client.post("/dataset/reload").json()["changes"]
+        assert (changes["diners_changed"], changes["reservations_added"]) == (1, 1)
+        assert client.get("/daily-stats").json()["total_guests"] == 7
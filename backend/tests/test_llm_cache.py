@@ -0,0 +1,93 @@
+import sqlite3
+import time
+
+import llm_cache
+from conftest import run
+from llm_cache import LLMCache
+
+def open_cache(tmp_path, ttl_seconds=3600, max_entries=100):
+    return LLMCache(str(tmp_path / "cache.sqlite3"), ttl_seconds, max_entries)
+
+def rows(tmp_path):
+    with sqlite3.connect(str(tmp_path / "cache.sqlite3")) as conn:
+        return dict(conn.execute("SELECT key, accessed_at FROM responses").fetchall())
+
+def test_hit_and_miss(tmp_path):
+    cache = open_cache(tmp_path)
+    assert cache.get("a") is None
+    cache.set("a", "answer")
+    assert cache.get("a") == "answer"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    cache.close()
+
+def test_entry_count_tracks_replacements_and_expiry(tmp_path):
+    cache = open_cache(tmp_path, ttl_seconds=0.05)
+    cache.set("a", "one")
+    cache.set("a", "two")
+    cache.set("b", "three")
+    assert cache.stats()["entries"] == 2
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 1 == len(rows(tmp_path))
+    cache.close()
+
+def test_hits_do_not_write_until_flushed(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.set("a", "answer")
+    written = rows(tmp_path)["a"]
+    time.sleep(0.01)
+    assert cache.get("a") == "answer"
+    assert rows(tmp_path)["a"] == written
+    cache.close()
+    assert rows(tmp_path)["a"] > written
+
+def test_hits_are_flushed_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "ACCESS_FLUSH_SIZE", 2)
+    cache = open_cache(tmp_path)
+    cache.set("a", "one")
+    cache.set("b", "two")
+    written = rows(tmp_path)
+    time.sleep(0.01)
+    cache.get("a")
+    cache.get("b")
+    touched = rows(tmp_path)
+    assert touched["a"] > written["a"] and touched["b"] > written["b"]
+    cache.close()
+
+def test_eviction_uses_buffered_access_times(tmp_path):
+    cache = open_cache(tmp_path, max_entries=2)
+    cache.set("a", "one")
+    time.sleep(0.01)
+    cache.set("b", "two")
+    time.sleep(0.01)
+    # Only buffered in memory, but it makes "b" the least recently used
+    assert cache.get("a") == "one"
+    cache.set("c", "three")
+    assert cache.get("b") is None
+    assert cache.get("a") == "one" and cache.get("c") == "three"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 2
+    cache.close()
+
+def test_entries_survive_restart(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.set("a", "one")
+    cache.close()
+    cache = open_cache(tmp_path)
+    assert cache.get("a") == "one"
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+def test_identical_prompts_reach_the_model_once(serve):
+    main = serve.main
+    serve.model.reply = lambda system_prompt, user_prompt: f"Answer to {user_prompt}"
+    first = run(main.chat_completion("system", "question", 10))
+    assert run(main.chat_completion("system", "question", 10)) == first == "Answer to question"
+    assert run(main.chat_completion("system", "another question", 10)) == "Answer to another question"
+    assert len(serve.model.calls) == 2
+    # Blank replies are never cached
+    serve.model.reply = lambda system_prompt, user_prompt: " "
+    run(main.chat_completion("system", "blank", 10))
+    run(main.chat_completion("system", "blank", 10))
+    assert len(serve.model.calls) == 4
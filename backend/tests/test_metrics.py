@@ -0,0 +1,41 @@
+import metrics
+from conftest import diner
+from metrics import Registry
+
+def test_exposition_format():
+    registry = Registry()
+    calls = registry.counter("calls_total", "Calls")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    calls.inc(task="a")
+    calls.inc(2, task="a")
+    latency.observe(0.05, task="a")
+    latency.observe(0.5, task="a")
+    latency.observe(5.0, task="a")
+    registry.gauge_source(lambda: [("in_flight", "In flight", [({}, 3)])])
+    lines = registry.render().splitlines()
+    assert 'calls_total{task="a"} 3' in lines
+    # Buckets are cumulative and +Inf counts every observation
+    assert 'latency_seconds_bucket{task="a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{task="a",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{task="a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{task="a"} 3' in lines
+    assert "# TYPE in_flight gauge" in lines and "in_flight 3" in lines
+
+def test_routes_are_labelled_by_template(serve):
+    with serve({"diners": [diner("Ada Lovelace", emails=["I am allergic to shellfish."])]}) as client:
+        assert client.get("/allergies/Ada Lovelace").status_code == 200
+        body = client.get("/metrics").text
+    assert 'route="/allergies/{diner_name}"' in body
+    assert "Ada Lovelace" not in body
+    assert 'laudure_allergy_extractions_total{path="rules"}' in body
+
+def test_model_calls_are_counted_by_task(serve):
+    # The registry is process-wide, so count what this test adds
+    calls = lambda: metrics.llm_calls.value(model="gpt-4", task="detect_special_event", outcome="ok")
+    before = calls()
+    with serve({"diners": [diner("Ada Lovelace", emails=["It is our anniversary"])]}) as client:
+        serve.model.reply = lambda system_prompt, user_prompt: '{"is_special_event": true, "event_type": "anniversary"}'
+        assert client.get("/allergies/Ada Lovelace").json()["special_event"] == "anniversary"
+        body = client.get("/metrics").text
+    assert calls() == before + 1
+    assert 'laudure_llm_call_duration_seconds_count{model="gpt-4",task="detect_special_event"}' in body
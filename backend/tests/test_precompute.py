@@ -0,0 +1,105 @@
+import asyncio
+
+from conftest import diner, run, wait_for
+from precompute import PrecomputeScheduler
+
+def recorder(log, label, gate=None):
+    async def job():
+        if gate is not None:
+            await gate.wait()
+        log.append(label)
+    return job
+
+async def drain(scheduler, group):
+    while scheduler.progress(group)["state"] == "running":
+        await asyncio.sleep(0.001)
+
+def test_jobs_run_in_priority_order():
+    async def scenario():
+        scheduler = PrecomputeScheduler(workers=1)
+        log = []
+        # Queued before the worker starts, so the heap alone decides the order
+        scheduler.schedule("service", [
+            ((0, 20 * 60), "summary", "late", recorder(log, "late")),
+            ((0, 18 * 60), "summary", "early", recorder(log, "early")),
+            ((0, 19 * 60), "summary", "middle", recorder(log, "middle")),
+            ((1, 0), "enrichment", "next day", recorder(log, "next day")),
+        ])
+        assert [entry["label"] for entry in scheduler.progress("service")["next"]] == [
+            "early", "middle", "late", "next day"
+        ]
+        scheduler.start()
+        await drain(scheduler, "service")
+        await scheduler.stop()
+        return log, scheduler.progress("service")
+
+    log, progress = run(scenario())
+    assert log == ["early", "middle", "late", "next day"]
+    assert progress["state"] == "complete"
+    assert (progress["done"], progress["queued"], progress["running"]) == (4, 0, 0)
+    assert progress["kinds"]["summary"]["done"] == 3
+
+def test_rescheduling_a_kind_cancels_its_queued_and_running_jobs():
+    async def scenario():
+        scheduler = PrecomputeScheduler(workers=1)
+        scheduler.start()
+        log = []
+        gate = asyncio.Event()
+        scheduler.schedule("service", [
+            ((0,), "summary", "stale running", recorder(log, "stale running", gate)),
+            ((1,), "summary", "stale queued", recorder(log, "stale queued")),
+            ((2,), "enrichment", "kept", recorder(log, "kept")),
+        ])
+        while not scheduler.progress("service")["running"]:
+            await asyncio.sleep(0.001)
+        scheduler.schedule("service", [((0,), "summary", "fresh", recorder(log, "fresh"))], replace=["summary"])
+        await drain(scheduler, "service")
+        # Other groups are untouched by the cancel
+        scheduler.schedule("other", [((0,), "summary", "elsewhere", recorder(log, "elsewhere"))], replace=["summary"])
+        await drain(scheduler, "other")
+        await scheduler.stop()
+        return log, scheduler.progress("service")
+
+    log, progress = run(scenario())
+    assert log == ["fresh", "kept", "elsewhere"]
+    assert progress["kinds"]["summary"] == {"queued": 0, "running": 0, "done": 1, "failed": 0, "cancelled": 2}
+    assert progress["kinds"]["enrichment"]["done"] == 1
+
+def test_a_failing_job_is_counted_and_does_not_stop_the_worker():
+    async def scenario():
+        scheduler = PrecomputeScheduler(workers=1)
+        scheduler.start()
+        log = []
+
+        async def fail():
+            raise RuntimeError("upstream down")
+
+        scheduler.schedule("service", [
+            ((0,), "summary", "broken", fail),
+            ((1,), "summary", "after", recorder(log, "after")),
+        ])
+        await drain(scheduler, "service")
+        await scheduler.stop()
+        return log, scheduler.progress("service")
+
+    log, progress = run(scenario())
+    assert log == ["after"]
+    assert (progress["failed"], progress["done"]) == (1, 1)
+
+def test_unknown_group_is_idle():
+    assert PrecomputeScheduler().progress("nothing")["state"] == "idle"
+
+def test_posting_attendance_warms_the_service(serve):
+    service = {"location": "Warm-up", "date": "2025-06-01"}
+    dataset = {"diners": [diner(f"Diner {index}", start_time=f"{18 + index}:00", **service) for index in range(4)]}
+    with serve(dataset) as client:
+        assert client.post("/attendance", json={"waiter_ids": [1, 2], **service}).status_code == 200
+        assert wait_for(client, lambda: client.get("/precompute", params=service).json()["state"] == "complete")
+        progress = client.get("/precompute", params=service).json()
+        assert progress["failed"] == 0 and progress["done"] > 0
+        briefings = lambda: len([system for system, _ in serve.model.calls if "briefings" in system])
+        warmed = briefings()
+        assert warmed > 0
+        # The page load is served from the warmed cache
+        client.get("/attendance", params=service)
+        assert briefings() == warmed
@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import diner
+from preferences import PreferenceEngine
+from records import Diner
+
+@pytest.fixture(scope="module")
+def engine():
+    return PreferenceEngine()
+
+def preferences(engine, *reviews):
+    engine.upsert(Diner.from_dict(diner("Ada Lovelace", reviews=reviews)))
+    return engine.preferences("Ada Lovelace")
+
+def test_complaint_does_not_become_a_preference(engine):
+    assert preferences(engine, "The service felt disorganized.") == []
+    assert preferences(engine, "The wine list was not impressive.") == []
+
+def test_praise_is_a_preference(engine):
+    assert preferences(engine, "The service was attentive and warm.") == ["Values attentive, personal service"]
+    assert preferences(engine, "The wine pairing never disappoints.") == ["Appreciates wine pairings"]
+
+def test_complaint_supports_complaint_preferences(engine):
+    assert preferences(engine, "The room was noisy and far too crowded.") == ["Dislikes crowded or noisy rooms"]
+
+def test_reviews_without_matches_give_no_preferences(engine):
+    assert preferences(engine) == []
+
+def test_similar_diners_share_preferences(engine):
+    reviews = ["The cheese cart was superb."]
+    engine.build([Diner.from_dict(diner(name, reviews=reviews)) for name in ("Ada", "Grace")])
+    similar = engine.similar("Ada")
+    assert similar[0]["diner_name"] == "Grace"
+    assert similar[0]["shared_preferences"] == ["Enjoys the cheese course"]
+
+def test_similar_endpoint(serve):
+    dataset = {"diners": [diner(name, reviews=["The cheese cart was superb."]) for name in ("Ada", "Grace")]}
+    with serve(dataset) as client:
+        assert client.get("/preferences/Ada").json()["preferences"] == ["Enjoys the cheese course"]
+        assert client.get("/preferences/Ada/similar").json()["similar"][0]["diner_name"] == "Grace"
+        assert client.get("/preferences/Nobody/similar").status_code == 404
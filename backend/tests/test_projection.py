@@ -0,0 +1,107 @@
+import gzip
+import itertools
+import json
+from dataclasses import replace
+
+import pytest
+
+from conftest import diner
+from projection import FIELDS, MAX_SELECTIONS, ProjectionCache, encode, parse_fields
+from store import DiningStore
+
+DATASET = {"diners": [
+    diner("Ada Lovelace", start_time="18:00", people=3, reviews=["Lovely."],
+          orders=[{"item": "Soup", "price": 12.0, "dietary_tags": ["Vegan"]}]),
+    diner("Grace Hopper", start_time="19:30", people=2),
+]}
+
+def rows(store):
+    return [(name, store.get_diner(name), store.reservations_by_diner[name]) for name in store.diner_names]
+
+def test_parse_fields_groups_sub_fields_and_rejects_unknown_ones():
+    assert parse_fields("reservations.start_time, name,reservations.number_of_people") == (
+        ("name", frozenset()),
+        ("reservations", frozenset({"start_time", "number_of_people"})),
+    )
+    # The whole field wins over any of its sub-fields
+    assert parse_fields("reviews.rating,reviews") == (("reviews", frozenset()),)
+    for fields in ("name,phone", "reservations.table", " , "):
+        with pytest.raises(ValueError):
+            parse_fields(fields)
+
+def test_views_encode_the_dataset():
+    store = DiningStore(DATASET)
+    full = json.loads(encode(store.version, rows(store), "full").identity)
+    assert full == DiningStore(full).dining_data
+    assert full["diners"][0]["reviews"] == [{"content": "Lovely.", "rating": 5}]
+
+    summary = json.loads(encode(store.version, rows(store), "summary").identity)["diners"]
+    assert summary[0] == {"name": "Ada Lovelace", "reservations": 1, "guests": 3, "dietary_tags": ["Vegan"]}
+
+    selected = encode(store.version, rows(store), parse_fields("name,reservations.start_time"))
+    assert json.loads(selected.identity)["diners"][1] == {"name": "Grace Hopper", "reservations": [{"start_time": "19:30"}]}
+    assert gzip.decompress(selected.gzip) == selected.identity
+
+def test_body_follows_accept_encoding():
+    store = DiningStore(DATASET)
+    encoded = encode(store.version, rows(store), "host")
+    assert encoded.body("gzip, deflate") == (encoded.gzip, "gzip")
+    assert encoded.body("GZIP;q=0.5") == (encoded.gzip, "gzip")
+    assert encoded.body("gzip;q=0") == (encoded.identity, None)
+    assert encoded.body("gzip; q=0.0, identity") == (encoded.identity, None)
+    assert encoded.body("") == (encoded.identity, None)
+    assert encoded.body("gzip;q=high") == (encoded.identity, None)
+
+def test_body_weighs_brotli_gzip_and_wildcard():
+    store = DiningStore(DATASET)
+    # Whether or not the brotli package is installed here
+    encoded = replace(encode(store.version, rows(store), "host"), brotli=b"br-body")
+    assert encoded.body("gzip, br") == (b"br-body", "br")
+    assert encoded.body("br;q=0, gzip") == (encoded.gzip, "gzip")
+    assert encoded.body("br;q=0.4, gzip;q=0.8") == (encoded.gzip, "gzip")
+    assert encoded.body("*") == (b"br-body", "br")
+    assert encoded.body("br;q=0, *") == (encoded.gzip, "gzip")
+    assert encoded.body("*;q=0") == (encoded.identity, None)
+    assert encoded.body("gzip, *;q=0") == (encoded.gzip, "gzip")
+    assert replace(encoded, brotli=None).body("*") == (encoded.gzip, "gzip")
+
+def test_cache_is_keyed_on_the_store_version_and_bounds_selections():
+    cache = ProjectionCache()
+    store = DiningStore(DATASET)
+    encoded = encode(store.version, rows(store), "summary")
+    cache.put("summary", encoded)
+    assert cache.get("summary", store.version) is encoded
+    assert cache.get("summary", store.version + 1) is None
+    # An older build finishing late never replaces a newer one
+    cache.put("summary", encode(store.version - 1, rows(store), "summary"))
+    assert cache.get("summary", store.version) is encoded
+
+    sub_fields = sorted(FIELDS["reservations"])
+    selections = [parse_fields(",".join(f"reservations.{sub}" for sub in subs))
+                  for size in (1, 2, 3) for subs in itertools.combinations(sub_fields, size)]
+    assert len(set(selections)) > MAX_SELECTIONS
+    for selection in selections:
+        cache.put(selection, encode(store.version, rows(store), selection))
+    kept = [view for view in cache.views() if not isinstance(view, str)]
+    assert kept == selections[-MAX_SELECTIONS:]
+    # Named views are never evicted
+    assert cache.get("summary", store.version) is encoded
+
+def test_dining_data_revalidates_per_encoding(serve):
+    with serve(DATASET) as client:
+        plain = client.get("/dining-data", params={"view": "summary"}, headers={"Accept-Encoding": "identity"})
+        assert plain.status_code == 200
+        assert "content-encoding" not in plain.headers
+        assert plain.json()["diners"][1]["guests"] == 2
+
+        zipped = client.get("/dining-data", params={"view": "summary"}, headers={"Accept-Encoding": "gzip"})
+        assert zipped.headers["content-encoding"] == "gzip"
+        assert zipped.json() == plain.json()
+        assert zipped.headers["etag"] != plain.headers["etag"]
+
+        revalidated = client.get("/dining-data", params={"view": "summary"},
+                                 headers={"Accept-Encoding": "identity", "If-None-Match": plain.headers["etag"]})
+        assert revalidated.status_code == 304
+
+        assert client.get("/dining-data", params={"fields": "name,phone"}).status_code == 400
+        assert client.get("/dining-data", params={"view": "everything"}).status_code == 400
@@ -0,0 +1,44 @@
+import random
+
+import prompts
+from prompts import chunk_rows, estimate_tokens, naive_encoding, tabular
+
+COLUMNS = ["diner", "guests", "notes"]
+
+def make_rows(count, seed=0):
+    rng = random.Random(seed)
+    words = ["shellfish", "allergy", "anniversary", "window", "table", "12", "wine", "gluten-free"]
+    return [{
+        "diner": f"Diner {index}",
+        "guests": rng.randint(1, 8),
+        "notes": [" ".join(rng.choices(words, k=rng.randint(0, 12))) for _ in range(rng.randint(0, 3))]
+    } for index in range(count)]
+
+def test_chunks_fit_budget_and_keep_order():
+    rows = make_rows(300)
+    chunks = chunk_rows(rows, COLUMNS, 120)
+    assert [row for chunk in chunks for row in chunk] == rows
+    for chunk in chunks:
+        assert len(chunk) == 1 or estimate_tokens(tabular(chunk, COLUMNS)) <= 120
+    # Greedy: the next row would not have fit
+    for chunk, following in zip(chunks, chunks[1:]):
+        assert estimate_tokens(tabular(chunk + following[:1], COLUMNS)) > 120
+
+def test_oversized_row_gets_its_own_chunk():
+    rows = [{"diner": "Ada", "notes": "word " * 50}, {"diner": "Grace"}]
+    assert chunk_rows(rows, COLUMNS, 10) == [[rows[0]], [rows[1]]]
+
+def test_table_encoding_is_smaller_than_indented_json():
+    rows = make_rows(50)
+    assert estimate_tokens(tabular(rows, COLUMNS)) < estimate_tokens(naive_encoding(rows)) / 2
+    assert tabular([{"diner": "Ada | Lovelace", "notes": ["nuts", None, "two\nlines"]}], ["diner", "notes"]) == (
+        "diner|notes\nAda / Lovelace|nuts; two lines"
+    )
+
+def test_each_row_is_estimated_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(prompts, "estimate_tokens", lambda text: calls.append(text) or estimate_tokens(text))
+    rows = make_rows(500)
+    chunk_rows(rows, COLUMNS, 120)
+    # One per row plus the header
+    assert len(calls) == len(rows) + 1
@@ -0,0 +1,57 @@
+from conftest import diner
+from records import DEFAULT_LOCATION, Diner, Order, Reservation
+from store import DiningStore
+
+ORDERS = [
+    {"item": "Duck Confit", "dietary_tags": ["gluten-free"], "price": 42.0},
+    {"item": "Crème Brûlée", "dietary_tags": [], "price": 14.5},
+]
+
+def test_identical_orders_are_one_shared_record():
+    shared = {}
+    first = Order.from_dict(dict(ORDERS[0]), shared)
+    second = Order.of("".join(["Duck ", "Confit"]), ["gluten-free"], 42, shared)
+    assert first is second
+    assert Order.from_dict(ORDERS[1], shared) is not first
+    # Item names and tags are interned, whatever string they were read from
+    assert second.item is first.item
+    assert second.dietary_tags[0] is first.dietary_tags[0]
+    # Without a table nothing is kept around
+    assert Order.from_dict(ORDERS[0]) == first and Order.from_dict(ORDERS[0]) is not first
+
+def test_each_store_keeps_its_own_orders():
+    data = {"diners": [diner(name, orders=ORDERS) for name in ("Ada Lovelace", "Grace Hopper")]}
+    first, second = DiningStore(data), DiningStore(data)
+    ada, grace = (first.lookup(name)["reservation"].orders for name in ("Ada Lovelace", "Grace Hopper"))
+    assert all(a is g for a, g in zip(ada, grace))
+    # Nothing is shared with (or kept alive by) another store
+    assert second.lookup("Ada Lovelace")["reservation"].orders[0] is not ada[0]
+
+def test_reservation_round_trips_through_as_dict():
+    data = {"start_time": "18:30", "number_of_people": 4, "orders": ORDERS, "location": "Uptown", "date": "2025-06-01"}
+    reservation = Reservation.from_dict("Ada Lovelace", data)
+    assert reservation.start_minute == 18 * 60 + 30
+    assert reservation.as_dict() == data
+    assert Reservation.from_dict("Ada Lovelace", reservation.as_dict()) == reservation
+    assert reservation.service == ("Uptown", "2025-06-01")
+
+def test_start_time_is_parsed_once_and_displayed_in_twelve_hour_form():
+    reservation = Reservation.from_dict("Ada Lovelace", {"start_time": "6:30 PM", "number_of_people": 2})
+    assert reservation.start_minute == 18 * 60 + 30
+    assert reservation.start_time == "6:30 PM"
+    assert reservation.as_dict()["start_time"] == "18:30"
+    assert reservation.table()["start_time"] == "6:30 PM"
+
+def test_missing_or_invalid_start_time_keeps_the_reservation():
+    for data in ({"number_of_people": 3}, {"start_time": "teatime", "number_of_people": 3}):
+        reservation = Reservation.from_dict("Ada Lovelace", data)
+        assert reservation.start_minute is None and reservation.start_time is None
+        assert "start_time" not in reservation.as_dict()
+        assert reservation.service == (DEFAULT_LOCATION, None)
+
+def test_diner_round_trips_through_as_dict():
+    data = diner("Grace Hopper", emails=["Table for two, please."], reviews=["Lovely evening."])
+    del data["reservations"]
+    record = Diner.from_dict(data)
+    assert record.as_dict() == data
+    assert Diner.from_dict(record.as_dict()) == record
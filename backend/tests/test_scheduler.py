@@ -0,0 +1,157 @@
+import random
+
+import pytest
+
+from conftest import covers, peak, random_limits, random_tables, respects, table
+from scheduler import (InfeasibleAssignment, WaiterLimits, check_feasibility, load_curve, partition_intervals,
+                       rebalance, seating_duration, to_minutes)
+
+def test_partition_assigns_every_table_once():
+    tables = random_tables(200)
+    assignments = partition_intervals([1, 2, 3, 4], tables)
+    assigned = [t["diner_name"] for tables in assignments.values() for t in tables]
+    assert sorted(assigned) == sorted(t["diner_name"] for t in tables)
+    for waiter_tables in assignments.values():
+        starts = [to_minutes(t["start_time"]) for t in waiter_tables]
+        assert starts == sorted(starts)
+
+def test_partition_spreads_overlapping_tables():
+    tables = [table("A", "19:00", 4), table("B", "19:00", 4), table("C", "19:15", 2)]
+    assignments = partition_intervals([1, 2], tables)
+    # Ties go to the lower id; the third table joins the waiter with fewer covers seated
+    assert [t["diner_name"] for t in assignments[1]] == ["A", "C"]
+    assert [t["diner_name"] for t in assignments[2]] == ["B"]
+
+def test_partition_frees_waiters_when_tables_leave():
+    # Each seating ends before the next table arrives, so covers seated never
+    # stack and the tables alternate by total covers
+    tables = [table(f"T{hour}", f"{hour}:00", 2) for hour in range(12, 22, 2)]
+    assignments = partition_intervals([1, 2], tables)
+    assert max(peak(waiter_tables) for waiter_tables in assignments.values()) == 2
+    assert abs(covers(assignments[1]) - covers(assignments[2])) <= 2
+
+def test_partition_without_waiters():
+    assert partition_intervals([], random_tables(5)) == {}
+
+def test_to_minutes_accepts_both_formats():
+    assert to_minutes("18:30") == to_minutes("6:30 PM") == 18 * 60 + 30
+    assert to_minutes("12:15 AM") == 15
+
+def test_load_curve_matches_brute_force():
+    rng = random.Random(7)
+    reservations = [(rng.randrange(11 * 60, 22 * 60), rng.randint(1, 8)) for _ in range(200)]
+    curve = load_curve(reservations, 15)
+    for minute, in_house in curve:
+        # A table counts in every bucket its seating overlaps
+        expected = sum(
+            people for start, people in reservations
+            if start < minute + 15 and minute < start + seating_duration(people)
+        )
+        assert in_house == expected
+
+def names(assignments):
+    return sorted(t["diner_name"] for waiter_tables in assignments.values() for t in waiter_tables)
+
+def test_rebalance_only_moves_departing_waiters_tables():
+    tables = random_tables(60)
+    before = partition_intervals([1, 2, 3], tables)
+    after, changed = rebalance(before, [1, 2])
+    assert names(after) == names(before)
+    assert 3 not in after
+    for waiter_id in (1, 2):
+        # Kept tables stay put; only waiter 3's tables are added
+        assert all(t in after[waiter_id] for t in before[waiter_id])
+
+def test_rebalance_with_unchanged_roster_moves_nothing():
+    before = partition_intervals([1, 2, 3], random_tables(40))
+    after, changed = rebalance(before, [1, 2, 3])
+    assert after == before and changed == set()
+
+def test_newcomer_is_brought_up_towards_the_average():
+    before = partition_intervals([1, 2], random_tables(40))
+    after, changed = rebalance(before, [1, 2, 3])
+    total = covers([t for waiter_tables in before.values() for t in waiter_tables])
+    assert 3 in changed
+    assert names(after) == names(before)
+    assert covers(after[3]) >= total / 3 - 8
+
+def test_newcomer_takes_from_next_donor_when_busiest_has_nothing_it_can_serve():
+    lunch = [table(f"Lunch {i}", "12:00", 4) for i in range(4)]
+    dinner = [table(f"Dinner {i}", f"{19 + i}:00", 3) for i in range(3)]
+    limits = {1: WaiterLimits(), 2: WaiterLimits(), 3: WaiterLimits(shift_start=17 * 60, shift_end=24 * 60)}
+    result, changed = rebalance({1: lunch, 2: dinner}, [1, 2, 3], limits)
+    # Waiter 1 is busiest but only has lunch tables, outside the newcomer's shift
+    assert result[1] == lunch
+    assert result[3] and all(t in dinner for t in result[3])
+    assert covers(result[2]) + covers(result[3]) == covers(dinner)
+    assert changed == {2, 3}
+
+@pytest.mark.parametrize("seed", range(30))
+def test_rebalance_never_breaks_waiter_limits(seed):
+    rng = random.Random(seed)
+    limits = random_limits(range(1, 8), rng)
+    # Waiter 1 can take anything, so every assignment here is feasible
+    limits[1] = WaiterLimits()
+    before = partition_intervals([1, 2, 3, 4, 5], random_tables(40, seed), limits)
+    assert respects(before, limits)
+    roster = [1, 2, 3, 5, 6, 7]
+    after, _ = rebalance(before, roster, limits)
+    assert names(after) == names(before)
+    assert set(after) == set(roster)
+    assert respects(after, limits)
+    assert check_feasibility(roster, [t for waiter_tables in after.values() for t in waiter_tables], limits) == []
+
+def test_rebalance_reports_tables_nobody_left_can_take():
+    before = {1: [table("Lunch", "12:00", 2)], 2: [table("Dinner", "19:00", 2)]}
+    limits = {1: WaiterLimits(11 * 60, 15 * 60), 2: WaiterLimits(17 * 60, 24 * 60)}
+    with pytest.raises(InfeasibleAssignment) as error:
+        rebalance(before, [2], limits)
+    assert [t["diner_name"] for t, _ in error.value.problems] == ["Lunch"]
+
+def test_feasibility_names_each_unstaffable_table():
+    limits = {1: WaiterLimits(11 * 60, 17 * 60, 6, 8), 2: WaiterLimits(11 * 60, 17 * 60, 6, 8)}
+    reservations = [
+        table("Early", "9:00", 2),
+        table("Lunch A", "11:00", 6),
+        table("Lunch B", "11:00", 6),
+        table("Lunch C", "11:15", 6),
+        table("Crowd", "14:00", 10),
+        table("Dinner", "19:00", 2),
+    ]
+    problems = {t["diner_name"]: reason for t, reason in check_feasibility([1, 2], reservations, limits)}
+    assert problems["Early"].startswith("no waiter on shift from 9:00 AM")
+    assert problems["Dinner"].startswith("no waiter on shift from 7:00 PM")
+    assert problems["Crowd"] == "no waiter on shift can seat a party of 10"
+    # 18 covers seated against two waiters taking 8 each
+    assert problems["Lunch C"].startswith("18 covers in house at 11:15 AM")
+    assert set(problems) == {"Early", "Crowd", "Dinner", "Lunch C"}
+
+def test_feasibility_ignores_absent_waiters_and_unlimited_ones():
+    limits = {1: WaiterLimits(11 * 60, 17 * 60, 4, 4), 2: WaiterLimits()}
+    reservations = [table("Large", "19:00", 10)]
+    assert check_feasibility([1, 2], reservations, limits) == []
+    assert [t["diner_name"] for t, _ in check_feasibility([1], reservations, limits)] == ["Large"]
+    assert check_feasibility([], reservations, limits) == []
+
+def test_partition_keeps_limits_or_raises():
+    limits = {1: WaiterLimits(11 * 60, 16 * 60, 4), 2: WaiterLimits(16 * 60, 24 * 60, 12)}
+    tables = [table("Lunch", "12:00", 2), table("Large lunch", "12:30", 8), table("Dinner", "19:00", 8)]
+    with pytest.raises(InfeasibleAssignment) as error:
+        partition_intervals([1, 2], tables, limits)
+    assert [t["diner_name"] for t, _ in error.value.problems] == ["Large lunch"]
+    assignments = partition_intervals([1, 2], [tables[0], tables[2]], limits)
+    assert {waiter_id: [t["diner_name"] for t in ts] for waiter_id, ts in assignments.items()} == {
+        1: ["Lunch"], 2: ["Dinner"]
+    }
+    assert respects(assignments, limits)
+
+@pytest.mark.parametrize("seed", range(10))
+def test_partition_with_feasible_limits_respects_them(seed):
+    rng = random.Random(seed)
+    roster = [1, 2, 3, 4]
+    limits = random_limits(roster, rng)
+    # One unlimited waiter keeps every instance staffable
+    limits[1] = WaiterLimits()
+    assignments = partition_intervals(roster, random_tables(120, seed), limits)
+    assert sum(len(ts) for ts in assignments.values()) == 120
+    assert respects(assignments, limits)
@@ -0,0 +1,60 @@
+from conftest import diner
+from records import DEFAULT_LOCATION
+from store import DiningStore
+
+DATASET = {"diners": [
+    diner("Ada Lovelace", start_time="18:00", people=2, location="Uptown", date="2025-06-01"),
+    diner("Grace Hopper", start_time="19:00", people=4, location="Uptown", date="2025-06-01"),
+    diner("Alan Turing", start_time="19:30", people=3, location="Uptown", date="2025-06-02"),
+    diner("Edsger Dijkstra", start_time="20:00", people=5),
+]}
+
+UPTOWN_FIRST = ("Uptown", "2025-06-01")
+
+def test_store_partitions_reservations_by_service():
+    store = DiningStore(DATASET)
+    assert set(store.partitions) == {UPTOWN_FIRST, ("Uptown", "2025-06-02"), (DEFAULT_LOCATION, None)}
+    assert store.stats(UPTOWN_FIRST) == {"total_reservations": 2, "total_guests": 6}
+    assert store.stats(("Uptown", "2025-06-02")) == {"total_reservations": 1, "total_guests": 3}
+    assert store.stats(("Downtown", "2025-06-01")) == {"total_reservations": 0, "total_guests": 0}
+    assert store.stats() == {"total_reservations": 4, "total_guests": 14}
+    assert [r.diner_name for r in store.iter_reservations(UPTOWN_FIRST)] == ["Ada Lovelace", "Grace Hopper"]
+    assert store.services_of("Edsger Dijkstra") == {(DEFAULT_LOCATION, None)}
+
+def test_partition_totals_and_order_follow_added_reservations():
+    store = DiningStore(DATASET)
+    store.add_reservation("Alan Turing", {
+        "start_time": "17:00", "number_of_people": 6, "orders": [], "location": "Uptown", "date": "2025-06-01"
+    })
+    assert store.stats(UPTOWN_FIRST) == {"total_reservations": 3, "total_guests": 12}
+    assert [r.diner_name for r in store.iter_reservations(UPTOWN_FIRST)] == [
+        "Alan Turing", "Ada Lovelace", "Grace Hopper"
+    ]
+    assert [r.start_minute for r in store.reservations_between(17 * 60, 19 * 60, UPTOWN_FIRST)] == [17 * 60, 18 * 60]
+
+def test_daily_stats_are_scoped_by_service(serve):
+    with serve(DATASET) as client:
+        scoped = client.get("/daily-stats", params={"location": "Uptown", "date": "2025-06-01"}).json()
+        assert scoped["location"] == "Uptown" and scoped["date"] == "2025-06-01"
+        assert (scoped["total_reservations"], scoped["total_guests"]) == (2, 6)
+
+        undated = client.get("/daily-stats", params={"date": "undated"}).json()
+        assert (undated["location"], undated["total_guests"]) == (DEFAULT_LOCATION, 5)
+
+        everything = client.get("/daily-stats").json()
+        assert (everything["total_reservations"], everything["total_guests"]) == (4, 14)
+        assert "location" not in everything
+
+def test_service_parameters_are_validated(serve):
+    with serve(DATASET) as client:
+        assert client.get("/daily-stats", params={"location": "Uptown"}).status_code == 400
+        assert client.get("/daily-stats", params={"date": "June 1st"}).status_code == 400
+
+def test_attendance_only_assigns_the_requested_service(serve):
+    with serve(DATASET) as client:
+        service = {"location": "Uptown", "date": "2025-06-01"}
+        assert client.post("/attendance", json={"waiter_ids": [1, 2], **service}).status_code == 200
+        assigned = client.get("/attendance", params=service).json()["assignments"]
+        assert sorted(t["diner_name"] for a in assigned for t in a["tables"]) == ["Ada Lovelace", "Grace Hopper"]
+        # Other services keep their own (empty) assignment
+        assert client.get("/attendance", params={"location": "Uptown", "date": "2025-06-02"}).json()["assignments"] == []
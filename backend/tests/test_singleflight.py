@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from conftest import diner, run
+from singleflight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    runs = []
+
+    async def work(value):
+        runs.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        results = await asyncio.gather(*(flight.do(("double", 1), work, 1) for _ in range(5)))
+        # Once finished, the next call runs again
+        results.append(await flight.do(("double", 1), work, 1))
+        return results
+
+    assert run(main()) == [2] * 6
+    assert runs == [1, 1]
+    assert flight.stats() == {"in_flight": 0, "operations": {"double": {"calls": 2, "deduplicated": 4}}}
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def work(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    async def main():
+        return await asyncio.gather(flight.do(("op", 1), work, 1), flight.do(("op", 2), work, 2))
+
+    assert run(main()) == [1, 2]
+    assert flight.stats()["operations"]["op"] == {"calls": 2, "deduplicated": 0}
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(flight.do(("fail",), work) for _ in range(3)), return_exceptions=True)
+
+    results = run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_cancelled_caller_does_not_cancel_the_shared_work():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do(("op",), work))
+        second = asyncio.ensure_future(flight.do(("op",), work))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert run(main()) == "done"
+
+def test_concurrent_lookups_of_one_diner_make_one_model_call(serve):
+    serve.model.reply = lambda system_prompt, user_prompt: '{"is_special_event": true, "event_type": "birthday"}'
+    serve.model.delay = 0.01
+    guest = diner("Ada Lovelace", emails=["It is my birthday"])
+    with serve({"diners": [guest]}):
+        main = serve.main
+
+        async def lookups():
+            record = main.app.state.store.get_diner("Ada Lovelace")
+            return await asyncio.gather(*(main.get_diner_special_event("Ada Lovelace", record) for _ in range(3)))
+
+        assert run(lookups()) == ["birthday"] * 3
+        assert len(serve.model.calls) == 1
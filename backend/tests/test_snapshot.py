@@ -0,0 +1,81 @@
+import pytest
+
+from conftest import diner
+from snapshot import DiningSnapshot, build, randomize_start_times, strip_dates
+from store import DiningStore
+
+DATASET = {"diners": [
+    diner("Ada Lovelace", start_time="18:30", date="2024-05-01",
+          orders=[{"item": "Soup", "price": 12.5, "dietary_tags": ["vegan"]}], emails=["A quiet table, please."]),
+    diner("Grace Hopper", start_time="19:45", people=4, date="2024-05-02", reviews=["Lovely."]),
+    diner("Alan Turing", start_time="00:15"),
+]}
+
+def build_snapshot(tmp_path, dataset=DATASET):
+    path = str(tmp_path / "dining.snap")
+    build(dataset, path)
+    return path
+
+def test_snapshot_round_trips_the_dataset(tmp_path):
+    snapshot = DiningSnapshot(build_snapshot(tmp_path))
+    try:
+        assert snapshot.diner_count == 3 and snapshot.reservation_count == 3
+        assert snapshot.to_dining_data() == DATASET
+    finally:
+        snapshot.close()
+
+def test_store_from_snapshot_matches_json_load(tmp_path):
+    snapshot = DiningSnapshot(build_snapshot(tmp_path))
+    try:
+        loaded = DiningStore.from_snapshot(snapshot)
+        expected = DiningStore(DATASET)
+        assert list(loaded.iter_reservations()) == list(expected.iter_reservations())
+        assert loaded.stats() == expected.stats()
+        # Diner details are decoded on first lookup
+        assert loaded.lookup("Ada Lovelace") == expected.lookup("Ada Lovelace")
+    finally:
+        snapshot.close()
+
+def reservations(store):
+    return sorted(store.iter_reservations(), key=lambda reservation: (reservation.diner_name, reservation.start_minute or -1))
+
+def test_twelve_hour_start_times_match_the_json_load(tmp_path):
+    dataset = {"diners": [
+        diner("Ada Lovelace", start_time="18:30", date="2024-05-01", location="main",
+              orders=[{"item": "Soup", "price": 12.5, "dietary_tags": ["vegan"]}]),
+        diner("Grace Hopper", start_time="6:30 PM", people=4, date="2024-05-01"),
+        diner("Alan Turing", start_time="12:15 AM"),
+    ]}
+    path = str(tmp_path / "dining.snap")
+    build(dataset, path)
+    snapshot = DiningSnapshot(path)
+    try:
+        loaded = DiningStore.from_snapshot(snapshot)
+        expected = DiningStore(dataset)
+        assert reservations(loaded) == reservations(expected)
+        assert [reservation.start_minute for reservation in reservations(loaded)] == [18 * 60 + 30, 15, 18 * 60 + 30]
+        assert loaded.dining_data == expected.dining_data
+    finally:
+        snapshot.close()
+
+def test_snapshot_build_rejects_unparseable_time(tmp_path):
+    with pytest.raises(ValueError, match="Grace Hopper"):
+        build({"diners": [diner("Grace Hopper", start_time="half past six")]}, str(tmp_path / "dining.snap"))
+
+def test_transforms_write_in_place(tmp_path):
+    path = build_snapshot(tmp_path)
+    snapshot = DiningSnapshot(path, writable=True)
+    randomize_start_times(snapshot, seed=1)
+    strip_dates(snapshot)
+    snapshot.flush()
+    snapshot.close()
+
+    snapshot = DiningSnapshot(path)
+    try:
+        reservations = [reservation for d in snapshot.to_dining_data()["diners"] for reservation in d["reservations"]]
+        for reservation in reservations:
+            hours, minutes = map(int, reservation["start_time"].split(":"))
+            assert 12 <= hours <= 20 and minutes in (0, 15, 30, 45)
+            assert "date" not in reservation
+    finally:
+        snapshot.close()
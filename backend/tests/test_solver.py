@@ -0,0 +1,58 @@
+import itertools
+import random
+
+import pytest
+
+from conftest import diner, peak, random_limits, random_tables, respects
+from scheduler import WaiterLimits, partition_intervals
+from solver import solve
+
+def worst_peak(assignments):
+    return max((peak(tables) for tables in assignments.values()), default=0)
+
+@pytest.mark.parametrize("seed", range(10))
+def test_objective_is_the_real_peak_and_never_worse_than_greedy(seed):
+    tables = random_tables(80, seed)
+    waiter_ids = [1, 2, 3, 4, 5]
+    result = solve(waiter_ids, tables, time_budget_seconds=0.2, seed=seed)
+    assert sorted(t["diner_name"] for ts in result.assignments.values() for t in ts) == \
+        sorted(t["diner_name"] for t in tables)
+    assert result.objective == worst_peak(result.assignments)
+    assert result.objective <= worst_peak(partition_intervals(waiter_ids, tables))
+    assert result.lower_bound <= result.objective
+    assert result.optimal == (result.objective == result.lower_bound)
+    # Each load curve peaks at that waiter's real peak
+    for waiter_id, curve in result.load_curves.items():
+        assert max((covers for _, covers in curve), default=0) == peak(result.assignments[waiter_id])
+
+def test_small_instance_reaches_the_brute_force_optimum():
+    tables = random_tables(9, seed=3)
+    best = min(
+        max(peak([t for t, owner in zip(tables, owners) if owner == waiter]) for waiter in (0, 1))
+        for owners in itertools.product((0, 1), repeat=len(tables))
+    )
+    assert solve([1, 2], tables, time_budget_seconds=1.0).objective == best
+
+@pytest.mark.parametrize("seed", range(10))
+def test_solution_keeps_waiter_limits(seed):
+    rng = random.Random(seed)
+    limits = random_limits(range(1, 6), rng)
+    limits[1] = WaiterLimits()
+    tables = random_tables(60, seed)
+    result = solve([1, 2, 3, 4, 5], tables, time_budget_seconds=0.1, seed=seed, limits=limits)
+    assert respects(result.assignments, limits)
+    assert result.objective == worst_peak(result.assignments)
+
+def test_no_waiters():
+    assert solve([], random_tables(5)).assignments == {}
+
+def test_optimal_solver_is_reported_by_attendance(serve):
+    dataset = {"diners": [diner(f"Diner {index}", start_time=f"{18 + index % 3}:00", people=index % 5 + 1)
+                          for index in range(12)]}
+    with serve(dataset) as client:
+        body = client.post("/attendance", json={"waiter_ids": [1, 2, 3], "solver": "optimal"}).json()
+        report = body["solver"]
+        assert report["mode"] == "optimal"
+        assert report["lower_bound"] <= report["objective"]
+        assert report["objective"] == max(peak(waiter["tables"]) for waiter in body["assignments"])
+        assert client.post("/attendance", json={"waiter_ids": [1], "solver": "fastest"}).status_code == 400
@@ -0,0 +1,59 @@
+import pytest
+
+from state import MemoryState, SqliteState
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    backend = MemoryState() if request.param == "memory" else SqliteState(str(tmp_path / "state.sqlite3"))
+    yield backend
+    backend.close()
+
+def test_entries(state):
+    assert state.get("allergies", "Ada") is None
+    state.set("allergies", "Ada", "Shellfish allergy")
+    assert state.get("allergies", "Ada") == "Shellfish allergy"
+    # add only inserts when absent
+    assert not state.add("allergies", "Ada", "No Allergies")
+    assert state.add("allergies", "Grace", {"value": [1, 2]})
+    assert state.items("allergies") == {"Ada": "Shellfish allergy", "Grace": {"value": [1, 2]}}
+    # delete reports whether this call removed the entry
+    assert state.delete("allergies", "Ada")
+    assert not state.delete("allergies", "Ada")
+    state.clear("allergies")
+    assert state.items("allergies") == {}
+
+def test_counters(state):
+    assert state.counter("special_events") == 0
+    assert state.incr("special_events") == 1
+    assert state.incr("special_events", 4) == 5
+    assert state.incr("special_events", -2) == 3
+    assert state.counter("special_events") == 3
+
+def test_conditional_snapshot_writes(state):
+    assert state.get_snapshot("assignment") == (0, None)
+    assert state.put_snapshot("assignment", {"waiter_ids": [1]}, expected_version=0) == 1
+    # A writer that read version 0 lost the race
+    assert state.put_snapshot("assignment", {"waiter_ids": [2]}, expected_version=0) is None
+    assert state.get_snapshot("assignment") == (1, {"waiter_ids": [1]})
+    assert state.put_snapshot("assignment", {"waiter_ids": [3]}) == 2
+    assert state.snapshot_version("assignment") == 2
+
+def test_sqlite_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    first, second = SqliteState(path), SqliteState(path)
+    try:
+        first.set("briefings", "1", "Good Luck!")
+        assert second.get("briefings", "1") == "Good Luck!"
+        first.incr("generation")
+        second.incr("generation")
+        assert first.counter("generation") == 2
+        assert first.put_snapshot("assignment", {"epoch": 1}, expected_version=0) == 1
+        assert second.put_snapshot("assignment", {"epoch": 2}, expected_version=0) is None
+        # The other worker's cached snapshot is re-read once the version moves
+        assert second.get_snapshot("assignment") == (1, {"epoch": 1})
+        first.put_snapshot("assignment", {"epoch": 3})
+        assert second.get_snapshot("assignment") == (2, {"epoch": 3})
+        assert first.add("claims", "service", 1) and not second.add("claims", "service", 2)
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,91 @@
+import random
+
+from conftest import diner
+from store import DiningStore
+
+def random_dataset(count, seed=0):
+    rng = random.Random(seed)
+    return {"diners": [
+        diner(f"Diner {index}", start_time=f"{rng.randint(11, 22)}:{rng.choice(['00', '15', '30', '45'])}",
+              people=rng.randint(1, 8))
+        for index in range(count)
+    ]}
+
+def test_reservations_between_matches_a_scan():
+    store = DiningStore(random_dataset(300))
+    everything = list(store.iter_reservations())
+    window = store.reservations_between(18 * 60, 19 * 60 + 30)
+    assert sorted(r.diner_name for r in window) == sorted(
+        r.diner_name for r in everything if 18 * 60 <= r.start_minute < 19 * 60 + 30
+    )
+
+def test_load_curve_is_refreshed_when_a_reservation_is_added():
+    store = DiningStore(random_dataset(50))
+    before = dict(store.load_curve(15))
+    store.add_reservation("Diner 0", {"start_time": "12:00", "number_of_people": 6, "orders": []})
+    after = dict(store.load_curve(15))
+    assert after[12 * 60] == before.get(12 * 60, 0) + 6
+
+def test_lookup_and_indexes():
+    store = DiningStore({"diners": [
+        diner("Ada Lovelace", people=3, orders=[{"item": "Soup", "price": 12.0, "dietary_tags": ["Vegan"]}]),
+        diner("Grace Hopper", people=2),
+    ]})
+    entry = store.lookup("Ada Lovelace")
+    assert entry["diner"].name == "Ada Lovelace"
+    assert entry["reservation"].number_of_people == 3
+    assert store.lookup("Nobody") is None
+    assert store.diners_with_tag("vegan") == {"Ada Lovelace"}
+    assert store.stats() == {"total_reservations": 2, "total_guests": 5}
+
+def test_time_index_stays_sorted_as_reservations_arrive():
+    store = DiningStore(random_dataset(300))
+    store.add_reservation("Diner 0", {"start_time": "12:00", "number_of_people": 6, "orders": []})
+    store.add_diner(diner("Walk In", start_time="6:45 PM", people=2))
+    starts = [r.start_minute for r in store.iter_reservations()]
+    assert starts == sorted(starts)
+    assert len(starts) == 302
+    assert store.stats()["total_reservations"] == 302
+
+def test_reservation_with_a_bad_start_time_is_counted_but_not_time_indexed():
+    store = DiningStore({"diners": [diner("Ada Lovelace", start_time="teatime", people=4)]})
+    assert store.stats()["total_guests"] == 4
+    assert list(store.iter_reservations()) == []
+
+def test_version_moves_on_every_change():
+    store = DiningStore(random_dataset(3))
+    version = store.version
+    store.add_reservation("Diner 1", {"start_time": "18:00", "number_of_people": 2, "orders": []})
+    assert store.version > version
+    assert DiningStore(random_dataset(3)).version != store.version
+
+def test_daily_stats_come_from_the_store(serve):
+    with serve(random_dataset(40)) as client:
+        stats = client.get("/daily-stats").json()
+        store = serve.main.app.state.store
+        assert stats["total_reservations"] == 40
+        assert stats["total_guests"] == store.stats()["total_guests"]
+
+def test_reservations_endpoint_pages_through_a_window(serve):
+    with serve(random_dataset(120, seed=3)) as client:
+        store = serve.main.app.state.store
+        expected = [r.diner_name for r in store.reservations_between(18 * 60, 20 * 60) if r.number_of_people >= 4]
+        seen = []
+        offset = 0
+        while offset is not None:
+            page = client.get("/reservations", params={
+                "start": "6:00 PM", "end": "20:00", "min_party": 4, "offset": offset, "limit": 7
+            }).json()
+            assert page["total"] == len(expected)
+            seen += [r["diner_name"] for r in page["reservations"]]
+            offset = page["next_offset"]
+        assert seen == expected
+        assert client.get("/reservations", params={"start": "dinner"}).status_code == 400
+        assert client.get("/reservations", params={"limit": 0}).status_code == 400
+
+def test_load_curve_endpoint_reports_the_peak(serve):
+    with serve(random_dataset(120, seed=3)) as client:
+        curve = client.get("/load-curve", params={"bucket_minutes": 30}).json()
+        assert curve["peak_covers"] == max(covers for _, covers in serve.main.app.state.store.load_curve(30))
+        assert all(bucket["start_minute"] % 30 == 0 for bucket in curve["buckets"])
+        assert client.get("/load-curve", params={"bucket_minutes": 1}).status_code == 400
@@ -0,0 +1,43 @@
+import json
+
+from conftest import diner
+
+BRIEFING = "Busy night ahead. Good Luck!"
+
+def events(body):
+    # (event, data) pairs of a server-sent event stream
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+def briefings(stream):
+    # waiter id -> briefing, from the skeleton or the summary events
+    summaries = {a["waiter_id"]: a["summary"] for a in stream[0][1]["assignments"] if a["summary"] is not None}
+    deltas = {}
+    for event, data in stream[1:]:
+        if event == "summary_delta":
+            deltas[data["waiter_id"]] = deltas.get(data["waiter_id"], "") + data["text"]
+        elif event == "summary":
+            assert data["summary"] == deltas[data["waiter_id"]].strip()
+            summaries[data["waiter_id"]] = data["summary"]
+    return summaries
+
+def test_briefings_stream_after_the_skeleton(serve):
+    serve.model.reply = lambda system_prompt, user_prompt: BRIEFING if "briefings" in system_prompt else "No Allergies"
+    dataset = {"diners": [diner(f"Diner {index}", start_time=f"{18 + index}:00") for index in range(4)]}
+    with serve(dataset) as client:
+        assert client.post("/attendance", json={"waiter_ids": [1, 2]}).status_code == 200
+        response = client.get("/attendance/stream")
+        assert response.headers["content-type"].startswith("text/event-stream")
+        stream = events(response.text)
+        assert stream[0][0] == "assignments"
+        assert [a["waiter_id"] for a in stream[0][1]["assignments"]] == [1, 2]
+        assert stream[-1] == ("done", {"waiter_ids": [1, 2]})
+        assert briefings(stream) == {1: BRIEFING, 2: BRIEFING}
+
+        # Streamed briefings are stored: the next stream is the skeleton alone
+        stream = events(client.get("/attendance/stream").text)
+        assert [event for event, _ in stream] == ["assignments", "done"]
+        assert briefings(stream) == {1: BRIEFING, 2: BRIEFING}
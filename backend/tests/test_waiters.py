@@ -0,0 +1,104 @@
+import json
+import os
+
+import pytest
+
+from conftest import BACKEND_DIR, diner
+from scheduler import UNLIMITED
+from waiters import WaiterRoster, read_waiters
+
+SHIPPED_ROSTER = os.path.join(BACKEND_DIR, "..", "waiters.json")
+EXAMPLE_ROSTER = os.path.join(BACKEND_DIR, "..", "waiters.example.json")
+
+ROSTER = {
+    "sections": {"main": {"max_party": 6}, "salon": {"max_party": 12}},
+    "waiters": [
+        {"id": 1, "name": "Ada", "shift_start": "11:30", "shift_end": "15:00", "sections": ["main"], "max_covers": 10},
+        {"id": 2, "name": "Grace", "shift_start": "18:00", "shift_end": "01:00", "sections": ["main", "salon"]},
+        {"id": 3, "name": "Alan"},
+    ]
+}
+
+def test_roster_limits():
+    roster = WaiterRoster.from_dict(ROSTER)
+    limits = roster.limits()
+    assert (limits[1].max_party, limits[1].max_covers) == (6, 10)
+    # The overnight shift ends the next day; no sections means any party size
+    assert limits[2].shift_end == 25 * 60 and limits[2].max_party == 12
+    assert limits[3].max_party is None and limits[3].max_covers is None
+    assert roster.name(4) == "Unknown Waiter"
+
+def test_on_shift():
+    roster = WaiterRoster.from_dict(ROSTER)
+    assert [waiter.id for waiter in roster.on_shift(12 * 60)] == [1, 3]
+    assert [waiter.id for waiter in roster.on_shift(19 * 60)] == [2, 3]
+    # Still running from the day before
+    assert [waiter.id for waiter in roster.on_shift(30)] == [2, 3]
+
+@pytest.mark.parametrize("roster, message", [
+    ({"sections": {"main": 6}, "waiters": []}, "Section 'main' must be an object"),
+    ({"sections": {"main": {"max_party": "six"}}, "waiters": []}, "invalid max_party"),
+    ({"waiters": [{"id": 1, "name": "Ada"}, {"id": 1, "name": "Grace"}]}, "Duplicate waiter id 1"),
+    ({"waiters": [{"id": 1, "name": "Ada", "sections": "main"}]}, "sections must be a list"),
+    ({"waiters": [{"id": 1, "name": "Ada", "sections": ["bar"]}]}, "unknown sections: bar"),
+    ({"waiters": [{"id": 1, "name": "Ada", "max_covers": []}]}, "Invalid waiter entry"),
+    ({"waiters": [{"id": 1, "name": "Ada", "shift_start": "noon"}]}, "Invalid waiter entry"),
+    ({"waiters": {"id": 1}}, "waiters must be a list"),
+])
+def test_malformed_roster_is_rejected(roster, message):
+    with pytest.raises(ValueError, match=message):
+        WaiterRoster.from_dict(roster)
+
+def test_bad_roster_edit_keeps_the_current_one(serve):
+    with serve({"diners": [diner("Ada Lovelace")]}) as client:
+        serve.waiters_path.write_text(json.dumps({"waiters": [{"id": 1, "name": "A"}, {"id": 1, "name": "B"}]}))
+        assert client.post("/waiters/reload").json()["message"] == "Waiter roster could not be read"
+        assert len(client.get("/waiters").json()["waiters"]) == 10
+
+def test_renamed_waiter_invalidates_attendance_body(serve):
+    with serve({"diners": [diner("Ada Lovelace")]}) as client:
+        assert client.post("/attendance", json={"waiter_ids": [1]}).status_code == 200
+        first = client.get("/attendance")
+        assert "Sauman Das" in first.text
+
+        roster = json.loads(serve.waiters_path.read_text())
+        roster["waiters"][0]["name"] = "Sauman Dasgupta"
+        serve.waiters_path.write_text(json.dumps(roster))
+        assert client.post("/waiters/reload").json()["message"] == "Waiter roster reloaded"
+
+        second = client.get("/attendance", headers={"If-None-Match": first.headers["etag"]})
+        assert second.status_code == 200
+        assert "Sauman Dasgupta" in second.text
+
+def test_shipped_roster_limits_nobody():
+    # Shifts and sections are opt-in: the bundled roster assigns as if there were none
+    roster = read_waiters(SHIPPED_ROSTER)
+    assert len(roster.waiters) == 10
+    assert set(roster.limits().values()) == {UNLIMITED}
+    example = read_waiters(EXAMPLE_ROSTER)
+    assert [waiter.name for waiter in example.waiters] == [waiter.name for waiter in roster.waiters]
+
+def use_example_roster(serve):
+    with open(EXAMPLE_ROSTER) as f:
+        serve.waiters_path.write_text(f.read())
+
+def test_attendance_that_cannot_staff_the_shift_is_refused(serve):
+    use_example_roster(serve)
+    dataset = {"diners": [diner("Ada Lovelace", start_time="12:00", people=10), diner("Grace Hopper", start_time="19:00")]}
+    with serve(dataset) as client:
+        # Justin Zhou only works the main room, which seats six
+        refused = client.post("/attendance", json={"waiter_ids": [3]})
+        assert refused.status_code == 422
+        assert refused.json()["detail"]["tables"] == [{
+            "diner_name": "Ada Lovelace", "start_time": "12:00 PM", "number_of_people": 10,
+            "reason": "no waiter on shift can seat a party of 10"
+        }]
+        assert client.post("/attendance", json={"waiter_ids": [1, 3]}).status_code == 200
+
+def test_walk_in_no_waiter_can_seat_is_refused(serve):
+    use_example_roster(serve)
+    with serve({"diners": [diner("Ada Lovelace", start_time="19:00")]}) as client:
+        assert client.post("/attendance", json={"waiter_ids": [3]}).status_code == 200
+        walk_in = {"diner_name": "Grace Hopper", "start_time": "19:30", "number_of_people": 10}
+        assert client.post("/reservations", json=walk_in).status_code == 422
+        assert client.get("/daily-stats").json()["total_reservations"] == 1
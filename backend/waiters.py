@@ -0,0 +1,181 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from metrics import log_event
+from scheduler import UNLIMITED, WaiterLimits, to_minutes
+
+# The waiter roster: who can be put on the floor, their shift, the sections
+# they work and the most covers they can have seated at once. It is read from
+# a JSON file (waiters.json at the repository root by default):
+#
+#   {"sections": {"main": {"max_party": 6}, "salon": {"max_party": 12}},
+#    "waiters": [{"id": 1, "name": "Sauman Das", "shift_start": "11:30",
+#                 "shift_end": "00:00", "sections": ["main", "salon"],
+#                 "max_covers": 24}]}
+#
+# Every field but id and name is optional: without a shift a waiter works all
+# day, without sections they seat any party, and without max_covers their
+# load is not capped. A shift ending at or before its start ends after
+# midnight. The roster is indexed once per load (waiters by id, shifts sorted
+# by start, the WaiterLimits the scheduler checks) and swapped whole on reload.
+
+@dataclass(frozen=True, slots=True)
+class Waiter:
+    id: int
+    name: str
+    limits: WaiterLimits
+    sections: Tuple[str, ...] = ()
+
+    @property
+    def shift(self) -> Tuple[str, str]:
+        # (start, end) as "HH:MM", as written in the roster file
+        return tuple(f"{minute // 60 % 24:02d}:{minute % 60:02d}" for minute in (self.limits.shift_start, self.limits.shift_end))
+
+    def as_dict(self) -> dict:
+        shift_start, shift_end = self.shift
+        return {
+            "id": self.id,
+            "name": self.name,
+            "shift_start": shift_start,
+            "shift_end": shift_end,
+            "sections": list(self.sections),
+            "max_party": self.limits.max_party,
+            "max_covers": self.limits.max_covers
+        }
+
+class WaiterRoster:
+    def __init__(self, waiters: List[Waiter], sections: Dict[str, dict]):
+        self.sections = sections
+        self.by_id: Dict[int, Waiter] = {waiter.id: waiter for waiter in waiters}
+        self.waiters = sorted(self.by_id.values(), key=lambda waiter: waiter.id)
+        # (shift start, waiter id), sorted, for on-shift queries
+        self._shifts = sorted((waiter.limits.shift_start, waiter.id) for waiter in self.waiters)
+        self._overnight = [waiter for waiter in self.waiters if waiter.limits.shift_end > 24 * 60]
+        self._limits = {waiter.id: waiter.limits for waiter in self.waiters}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WaiterRoster":
+        # Raises ValueError on a malformed roster so a bad edit never replaces a good one
+        if not isinstance(data, dict):
+            raise ValueError("The roster must be a JSON object")
+        sections = data.get("sections", {})
+        if not isinstance(sections, dict):
+            raise ValueError("sections must map section names to objects")
+        for section, settings in sections.items():
+            if not isinstance(settings, dict):
+                raise ValueError(f"Section {section!r} must be an object, got {settings!r}")
+            max_party = settings.get("max_party")
+            if max_party is not None and (not isinstance(max_party, int) or isinstance(max_party, bool) or max_party < 1):
+                raise ValueError(f"Section {section!r} has an invalid max_party: {max_party!r}")
+        entries = data.get("waiters", [])
+        if not isinstance(entries, list):
+            raise ValueError("waiters must be a list")
+        waiters = []
+        seen = set()
+        for entry in entries:
+            try:
+                waiter_id = int(entry["id"])
+                name = str(entry["name"])
+                if entry.get("shift_start") or entry.get("shift_end"):
+                    shift_start = to_minutes(entry["shift_start"]) if entry.get("shift_start") else 0
+                    shift_end = to_minutes(entry["shift_end"]) if entry.get("shift_end") else 24 * 60
+                else:
+                    # No shift at all: any table that day, however late it ends
+                    shift_start, shift_end = UNLIMITED.shift_start, UNLIMITED.shift_end
+                max_covers = int(entry["max_covers"]) if entry.get("max_covers") is not None else None
+                waiter_sections = entry.get("sections", [])
+                if not isinstance(waiter_sections, list) or not all(isinstance(section, str) for section in waiter_sections):
+                    raise ValueError("sections must be a list of section names")
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                raise ValueError(f"Invalid waiter entry {entry!r}: {e}")
+            if waiter_id in seen:
+                raise ValueError(f"Duplicate waiter id {waiter_id}")
+            seen.add(waiter_id)
+            if shift_end <= shift_start:
+                shift_end += 24 * 60
+            unknown = [section for section in waiter_sections if section not in sections]
+            if unknown:
+                raise ValueError(f"Waiter {waiter_id} works unknown sections: {', '.join(unknown)}")
+            party_sizes = [sections[section].get("max_party") for section in waiter_sections]
+            max_party = None if not party_sizes or None in party_sizes else max(party_sizes)
+            waiters.append(Waiter(
+                waiter_id,
+                name,
+                WaiterLimits(shift_start, shift_end, max_party, max_covers),
+                tuple(waiter_sections)
+            ))
+        return cls(waiters, sections)
+
+    def name(self, waiter_id: int) -> str:
+        waiter = self.by_id.get(waiter_id)
+        return waiter.name if waiter is not None else "Unknown Waiter"
+
+    def unknown(self, waiter_ids: List[int]) -> List[int]:
+        return [waiter_id for waiter_id in waiter_ids if waiter_id not in self.by_id]
+
+    def limits(self) -> Dict[int, WaiterLimits]:
+        # waiter id -> limits, built once per load and shared by every assignment
+        return self._limits
+
+    def on_shift(self, minute: int) -> List[Waiter]:
+        # Waiters working at `minute` (0-1439): shifts that started by then and
+        # have not ended, plus overnight shifts still running from the day before
+        waiters = [
+            self.by_id[waiter_id]
+            for _, waiter_id in self._shifts[:bisect.bisect_right(self._shifts, (minute, float("inf")))]
+            if minute < self.by_id[waiter_id].limits.shift_end
+        ]
+        seen = {waiter.id for waiter in waiters}
+        waiters.extend(
+            waiter for waiter in self._overnight
+            if waiter.id not in seen and waiter.limits.shift_start <= minute + 24 * 60 < waiter.limits.shift_end
+        )
+        return sorted(waiters, key=lambda waiter: waiter.id)
+
+    def stats(self) -> dict:
+        return {"waiters": len(self.waiters), "sections": len(self.sections)}
+
+def read_waiters(path: str) -> WaiterRoster:
+    with open(path, "r") as f:
+        return WaiterRoster.from_dict(json.load(f))
+
+class WaitersFile:
+    # The roster file, reloaded when its mtime or size changes
+    def __init__(self, path: str):
+        self.path = path
+        self.roster = WaiterRoster([], {})
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return info.st_mtime_ns, info.st_size
+
+    async def reload(self, force: bool = False) -> bool:
+        # Whether a new roster was loaded; a missing or malformed file keeps the current one
+        async with self._lock:
+            signature = self._stat()
+            if signature is None or (signature == self._signature and not force):
+                return False
+            try:
+                roster = await asyncio.to_thread(read_waiters, self.path)
+            except (OSError, ValueError) as e:
+                log_event("waiter roster load failed", logging.WARNING, path=self.path, error=str(e))
+                return False
+            self.roster = roster
+            self._signature = signature
+            self.reloads += 1
+            log_event("waiter roster loaded", path=self.path, **roster.stats())
+            return True
+
+    def stats(self) -> dict:
+        return {"path": self.path, "reloads": self.reloads, **self.roster.stats()}
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+import allergy_rules  # noqa: E402
+from store import DiningStore  # noqa: E402
+
+# Compares the local allergy rules against the GPT-4 extractor on a dataset:
+# per-diner latency of both paths, how often the rules escalate, and how often
+# the two agree on the set of allergens/diets mentioned.
+#
+#   python benchmarks/allergy_benchmark.py                # local rules only
+#   python benchmarks/allergy_benchmark.py --llm          # also call the model (needs OPENAI_API_KEY)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def canonical_terms(text: str) -> set:
+    # Reduce a free-text answer to the allergens and diets it names, so the
+    # model's phrasing and the rules' labels can be compared
+    if text.strip().lower().rstrip(".") == allergy_rules.NO_ALLERGIES.lower():
+        return set()
+    terms = set()
+    for match in allergy_rules.AUTOMATON.scan(text.lower()):
+        if match.kind == "allergen":
+            terms.add(allergy_rules.ALLERGENS[match.phrase])
+        elif match.kind == "diet":
+            terms.add(allergy_rules.DIETS[match.phrase].lower())
+    return terms
+
+def run_local(pairs, repeat):
+    timings = []
+    results = []
+    for diner, reservation in pairs:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = allergy_rules.extract_for_diner(diner, reservation)
+        timings.append((time.perf_counter() - start) / repeat * 1e6)
+        results.append(result)
+    return timings, results
+
+async def run_llm(pairs, concurrency):
+    os.chdir(BACKEND_DIR)
+    import main
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(diner, reservation):
+        async with semaphore:
+            start = time.perf_counter()
+            text = await main.extract_allergies_llm(diner, reservation)
+            return text, (time.perf_counter() - start) * 1e6
+
+    outputs = await asyncio.gather(*(one(d, r) for d, r in pairs))
+    await main.openai_client.close()
+    return [text for text, _ in outputs], [elapsed for _, elapsed in outputs]
+
+def report(label, timings):
+    print(f"{label}: mean {statistics.mean(timings):.1f}us  "
+          f"p50 {percentile(timings, 50):.1f}us  p95 {percentile(timings, 95):.1f}us  "
+          f"p99 {percentile(timings, 99):.1f}us")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local allergy extraction against the LLM")
+    parser.add_argument("--dataset", default=os.path.normpath(os.path.join(BACKEND_DIR, "..", "fine-dining-dataset-augmented.json")))
+    parser.add_argument("--repeat", type=int, default=200, help="local extractions per diner for timing")
+    parser.add_argument("--llm", action="store_true", help="also run the GPT-4 extractor and compare")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--show", action="store_true", help="print every disagreement")
+    args = parser.parse_args()
+
+    with open(args.dataset, "r") as f:
+        store = DiningStore(json.load(f))
+    # Each diner with their earliest reservation (None without one), as the server passes them
+    pairs = [
+        (entry["diner"], entry["reservation"])
+        for entry in (store.lookup(name) for name in store.diner_names)
+    ]
+    print(f"{len(pairs)} diners from {args.dataset}")
+
+    local_timings, local_results = run_local(pairs, args.repeat)
+    escalated = sum(1 for result in local_results if result.ambiguous)
+    report("local rules", local_timings)
+    print(f"escalated to model: {escalated}/{len(pairs)} ({escalated / len(pairs):.1%})")
+
+    if not args.llm:
+        return
+
+    llm_texts, llm_timings = asyncio.run(run_llm(pairs, args.concurrency))
+    report("gpt-4      ", llm_timings)
+
+    agree = 0
+    for (diner, _), result, llm_text in zip(pairs, local_results, llm_texts):
+        same = canonical_terms(result.as_text()) == canonical_terms(llm_text)
+        agree += same
+        if args.show and not same:
+            print(f"- {diner.name}\n    rules: {result.as_text()}\n    model: {llm_text}")
+    print(f"agreement on allergen/diet sets: {agree}/{len(pairs)} ({agree / len(pairs):.1%})")
+    print(f"speedup (mean): {statistics.mean(llm_timings) / statistics.mean(local_timings):.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Local stand-in for the OpenAI chat completions API. Responses are canned but
+# shaped like the real ones for each of the backend's prompts, and latency and
+# error rates are configurable so the backend can be load-tested offline.
+#
+#   python benchmarks/fake_openai.py --port 8100 --latency-ms 800 --sigma 0.4 --error-rate 0.02
+
+app = FastAPI(title="Fake OpenAI")
+app.state.config = {"latency_ms": 800.0, "sigma": 0.4, "error_rate": 0.0, "rate_limit_rate": 0.0}
+app.state.stats = {"requests": 0, "streamed": 0, "errors": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0}
+
+BATCH_ITEM = re.compile(r"^### (\d+)$", re.MULTILINE)
+
+def canned_reply(system_prompt: str, user_prompt: str = "") -> str:
+    # Batched prompts (see backend/batching.py) get one canned answer per numbered item
+    items = BATCH_ITEM.findall(user_prompt)
+    if items:
+        if "allergies" in system_prompt:
+            return json.dumps({item: "No Allergies" for item in items})
+        return json.dumps({
+            item: {"is_special_event": random.random() < 0.3, "event_type": "birthday"} for item in items
+        })
+    if "JSON array" in system_prompt:
+        return json.dumps(["Enjoys seasonal tasting menus", "Prefers a quiet table"])
+    if "JSON object" in system_prompt:
+        return json.dumps({"is_special_event": random.random() < 0.3, "event_type": "birthday"})
+    if "allergies" in system_prompt:
+        return "No Allergies"
+    return ("You'll be serving a full section today with a steady flow of tables from lunch "
+            "through the evening. Please note the dietary restrictions and special requests. Good luck!")
+
+async def simulate_latency():
+    config = app.state.config
+    if config["latency_ms"] > 0:
+        delay = random.lognormvariate(0, config["sigma"]) * config["latency_ms"] / 1000
+        await asyncio.sleep(delay)
+
+def completion_body(model: str, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(content.split()), "total_tokens": len(content.split())}
+    }
+
+def chunk_body(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+    return "data: " + json.dumps({
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }) + "\n\n"
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats = app.state.stats
+    config = app.state.config
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await simulate_latency()
+        roll = random.random()
+        if roll < config["rate_limit_rate"]:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"retry-after-ms": "200"}
+            )
+        if roll < config["rate_limit_rate"] + config["error_rate"]:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "Upstream failure", "type": "server_error"}}, status_code=500)
+
+        model = body.get("model", "gpt-4")
+        system_prompt = next((m["content"] for m in body.get("messages", []) if m.get("role") == "system"), "")
+        user_prompt = next((m["content"] for m in body.get("messages", []) if m.get("role") == "user"), "")
+        content = canned_reply(system_prompt, user_prompt)
+        if not body.get("stream"):
+            return completion_body(model, content)
+
+        stats["streamed"] += 1
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        async def events():
+            yield chunk_body(completion_id, model, {"role": "assistant", "content": ""})
+            for word in content.split(" "):
+                await asyncio.sleep(0.005)
+                yield chunk_body(completion_id, model, {"content": word + " "})
+            yield chunk_body(completion_id, model, {}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+    finally:
+        stats["in_flight"] -= 1
+
+@app.get("/stats")
+async def get_stats():
+    return app.state.stats
+
+@app.post("/config")
+async def set_config(request: Request):
+    app.state.config.update(await request.json())
+    return app.state.config
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="median response latency")
+    parser.add_argument("--sigma", type=float, default=0.4, help="log-normal spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 429")
+    args = parser.parse_args()
+    app.state.config.update({
+        "latency_ms": args.latency_ms,
+        "sigma": args.sigma,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate
+    })
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
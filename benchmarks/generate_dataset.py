@@ -0,0 +1,69 @@
+import argparse
+import copy
+import json
+import os
+import random
+
+# Synthetic dataset generator for load tests. Reviews, orders and email threads
+# are sampled from the bundled dataset, names are made unique, and start times
+# follow the same 12:00-20:00 / 15-minute distribution as
+# `snapshot.py randomize-start-times`.
+#
+#   python benchmarks/generate_dataset.py --diners 10000 --out /tmp/dining-10k.json
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+FIRST_NAMES = [
+    "Emily", "Liam", "Sofia", "Noah", "Chloe", "Mateo", "Amélie", "Hugo", "Grace", "Oliver",
+    "Isla", "Arjun", "Mei", "Lucas", "Zara", "Theo", "Nadia", "Felix", "Ines", "Jonah",
+    "Priya", "Elena", "Marcus", "Yuki", "Camille", "Omar", "Hannah", "Leo", "Maya", "Rafael"
+]
+LAST_NAMES = [
+    "Chen", "Martin", "Garcia", "Dubois", "Okafor", "Novak", "Rossi", "Kim", "Patel", "Moreau",
+    "Schmidt", "Silva", "Nguyen", "Laurent", "Cohen", "Tanaka", "Fischer", "Bernard", "Haddad", "Walsh"
+]
+
+def generate_time(rng: random.Random) -> str:
+    # Generate hours between 12 PM and 8 PM (20:00) in 15-minute intervals
+    hour = rng.randint(12, 20)
+    minute = rng.choice([0, 15, 30, 45])
+    return f"{hour:02d}:{minute:02d}"
+
+def generate(source: dict, count: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    templates = source["diners"]
+    reviews = [review for diner in templates for review in diner.get("reviews", [])]
+    emails = [email for diner in templates for email in diner.get("emails", [])]
+    reservations = [reservation for diner in templates for reservation in diner.get("reservations", [])]
+
+    diners = []
+    for index in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}"
+        reservation = copy.deepcopy(rng.choice(reservations))
+        reservation["start_time"] = generate_time(rng)
+        reservation["number_of_people"] = rng.choices([2, 3, 4, 6, 8], weights=[70, 8, 14, 5, 3])[0]
+        diners.append({
+            "name": name,
+            "reviews": copy.deepcopy(rng.sample(reviews, k=min(len(reviews), rng.randint(0, 3)))),
+            "reservations": [reservation],
+            "emails": copy.deepcopy(rng.sample(emails, k=min(len(emails), rng.randint(0, 2))))
+        })
+    return {"diners": diners}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic fine dining dataset")
+    parser.add_argument("--diners", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", default=os.path.normpath(os.path.join(ROOT, "fine-dining-dataset-augmented.json")))
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    with open(args.source, "r") as f:
+        source = json.load(f)
+    data = generate(source, args.diners, args.seed)
+    with open(args.out, "w") as f:
+        json.dump(data, f)
+    print(f"Wrote {args.diners} diners to {args.out}")
+
+if __name__ == "__main__":
+    main()
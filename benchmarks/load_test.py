@@ -0,0 +1,208 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+# Load and latency benchmark for backend/main.py. Starts the fake OpenAI server
+# and the backend as subprocesses, then runs scripted scenarios and reports
+# p50/p95/p99 latency, throughput, errors and upstream model calls per endpoint.
+#
+#   python benchmarks/load_test.py --diners 5000 --latency-ms 800
+#   python benchmarks/load_test.py --dataset fine-dining-dataset-augmented.json --pages 5
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+BENCHMARKS_DIR = os.path.join(ROOT, "benchmarks")
+BACKEND_DIR = os.path.join(ROOT, "backend")
+
+def request(port: int, method: str, path: str, body=None, timeout: float = 300):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        payload = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload else {}
+        start = time.perf_counter()
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        elapsed = time.perf_counter() - start
+        return response.status, data, elapsed
+    finally:
+        connection.close()
+
+def wait_until_up(port: int, path: str, deadline: float = 60):
+    start = time.time()
+    while time.time() - start < deadline:
+        try:
+            status, _, _ = request(port, "GET", path, timeout=2)
+            if status < 500:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not come up")
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class Scenario:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = {}
+        self.errors = {}
+        self.started = None
+        self.finished = None
+        self.upstream_calls = 0
+
+    def record(self, endpoint: str, status: int, elapsed: float):
+        self.latencies.setdefault(endpoint, []).append(elapsed)
+        if status >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self):
+        duration = self.finished - self.started
+        total = sum(len(values) for values in self.latencies.values())
+        print(f"\n== {self.name}: {total} requests in {duration:.2f}s "
+              f"({total / duration:.1f} req/s), {self.upstream_calls} upstream calls")
+        print(f"   {'endpoint':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for endpoint, values in sorted(self.latencies.items()):
+            print(f"   {endpoint:<28}{len(values):>7}"
+                  f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+                  f"{percentile(values, 99) * 1000:>10.1f}{self.errors.get(endpoint, 0):>8}")
+
+def upstream_requests(fake_port: int) -> int:
+    _, data, _ = request(fake_port, "GET", "/stats")
+    return json.loads(data)["requests"]
+
+def run_scenario(name, fake_port, fn):
+    scenario = Scenario(name)
+    before = upstream_requests(fake_port)
+    scenario.started = time.perf_counter()
+    fn(scenario)
+    scenario.finished = time.perf_counter()
+    scenario.upstream_calls = upstream_requests(fake_port) - before
+    scenario.report()
+    return scenario
+
+def post_attendance(port, rosters):
+    def run(scenario):
+        for roster in rosters:
+            status, _, elapsed = request(port, "POST", "/attendance", {"waiter_ids": roster, "full_reassign": True})
+            scenario.record("POST /attendance", status, elapsed)
+    return run
+
+def page_loads(port, pages, tables_per_page, concurrency):
+    # One assignments page: GET /attendance, then the per-table fan-out the
+    # frontend issues when tables are expanded
+    def run(scenario):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(pages):
+                status, data, elapsed = request(port, "GET", "/attendance")
+                scenario.record("GET /attendance", status, elapsed)
+                diners = [
+                    table["diner_name"]
+                    for assignment in json.loads(data).get("assignments", [])
+                    for table in assignment["tables"]
+                ][:tables_per_page]
+                paths = []
+                for diner in diners:
+                    quoted = urllib.parse.quote(diner)
+                    paths.append(("GET /allergies/{name}", f"/allergies/{quoted}"))
+                    paths.append(("GET /preferences/{name}", f"/preferences/{quoted}"))
+                for endpoint, (status, _, elapsed) in zip(
+                    [endpoint for endpoint, _ in paths],
+                    pool.map(lambda item: request(port, "GET", item[1]), paths)
+                ):
+                    scenario.record(endpoint, status, elapsed)
+    return run
+
+def stats_polling(port, polls, concurrency):
+    def run(scenario):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for status, _, elapsed in pool.map(lambda _: request(port, "GET", "/daily-stats"), range(polls)):
+                scenario.record("GET /daily-stats", status, elapsed)
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the French Laudure backend against a fake OpenAI")
+    parser.add_argument("--dataset", help="dataset to serve; generated when omitted")
+    parser.add_argument("--diners", type=int, default=1000, help="size of the generated dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--fake-port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--sigma", type=float, default=0.4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--waiters", type=int, default=10)
+    parser.add_argument("--attendance-posts", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--tables-per-page", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--stats-polls", type=int, default=500)
+    parser.add_argument("--snapshot", action="store_true", help="compile the dataset and serve it from a snapshot")
+    parser.add_argument("--warm-cache", action="store_true", help="reuse the backend's persistent LLM cache")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="laudure-bench-")
+    dataset = args.dataset
+    if dataset is None:
+        dataset = os.path.join(workdir, "dataset.json")
+        subprocess.run([
+            sys.executable, os.path.join(BENCHMARKS_DIR, "generate_dataset.py"),
+            "--diners", str(args.diners), "--seed", str(args.seed), "--out", dataset
+        ], check=True)
+    dataset = os.path.abspath(dataset)
+
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.fake_port}/v1",
+        "DINING_DATASET_PATH": dataset
+    })
+    if args.snapshot:
+        snapshot = os.path.join(workdir, "dataset.snap")
+        subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "snapshot.py"), "build", dataset, snapshot], check=True)
+        env["DINING_SNAPSHOT_PATH"] = snapshot
+    if not args.warm_cache:
+        env["LLM_CACHE_PATH"] = os.path.join(workdir, "llm_cache.sqlite3")
+
+    processes = []
+    try:
+        processes.append(subprocess.Popen([
+            sys.executable, os.path.join(BENCHMARKS_DIR, "fake_openai.py"),
+            "--port", str(args.fake_port), "--latency-ms", str(args.latency_ms), "--sigma", str(args.sigma),
+            "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate)
+        ]))
+        wait_until_up(args.fake_port, "/stats")
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL
+        ))
+        wait_until_up(args.port, "/health")
+
+        rng = random.Random(args.seed)
+        waiter_pool = list(range(1, 11))
+        rosters = [
+            sorted(rng.sample(waiter_pool, k=min(args.waiters, len(waiter_pool))))
+            for _ in range(args.attendance_posts)
+        ]
+        run_scenario("POST /attendance", args.fake_port, post_attendance(args.port, rosters))
+        run_scenario("page load fan-out", args.fake_port,
+                     page_loads(args.port, args.pages, args.tables_per_page, args.concurrency))
+        run_scenario("/daily-stats polling", args.fake_port,
+                     stats_polling(args.port, args.stats_polls, args.concurrency))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCHMARKS_DIR, "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from generate_dataset import generate_time  # noqa: E402
+from scheduler import partition_intervals, seating_duration, to_minutes  # noqa: E402
+from solver import solve  # noqa: E402
+
+# Greedy sweep vs the optimal-mode solver on synthetic shifts: peak concurrent
+# covers of the busiest waiter, the solver's lower bound, how often the result
+# is proven optimal, and wall time per assignment.
+#
+#   python benchmarks/solver_benchmark.py
+#   python benchmarks/solver_benchmark.py --shifts 400x32 800x40 --budget-ms 500
+
+def reservations_for(count: int, seed: int) -> list:
+    # Same start time and party size distribution as generate_dataset.py
+    rng = random.Random(seed)
+    return [{
+        "diner_name": f"Diner {index}",
+        "start_time": generate_time(rng),
+        "number_of_people": rng.choices([2, 3, 4, 6, 8], weights=[70, 8, 14, 5, 3])[0]
+    } for index in range(count)]
+
+def peak_covers(assignments: dict) -> int:
+    peak = 0
+    for tables in assignments.values():
+        events = []
+        for table in tables:
+            start = to_minutes(table["start_time"])
+            events.append((start, table["number_of_people"]))
+            events.append((start + seating_duration(table["number_of_people"]), -table["number_of_people"]))
+        covers = 0
+        # Departures sort before arrivals at the same minute
+        for _, change in sorted(events):
+            covers += change
+            peak = max(peak, covers)
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the greedy and optimal assignment solvers")
+    parser.add_argument("--shifts", nargs="+", default=["200x30", "400x32", "600x36", "800x40"],
+                        help="reservations x waiters")
+    parser.add_argument("--seeds", type=int, default=5, help="random shifts per size")
+    parser.add_argument("--budget-ms", type=float, default=250)
+    args = parser.parse_args()
+
+    print(f"{'shift':>9} {'greedy':>7} {'optimal':>8} {'bound':>6} {'proven':>7} {'greedy ms':>10} {'solver ms':>10} {'max ms':>7}")
+    for shift in args.shifts:
+        count, waiters = (int(part) for part in shift.split("x"))
+        waiter_ids = list(range(1, waiters + 1))
+        greedy_peaks, solver_peaks, bounds, proven, greedy_ms, solver_ms = [], [], [], 0, [], []
+        for seed in range(args.seeds):
+            reservations = reservations_for(count, seed)
+            start = time.perf_counter()
+            greedy = partition_intervals(waiter_ids, reservations)
+            greedy_ms.append((time.perf_counter() - start) * 1000)
+            greedy_peaks.append(peak_covers(greedy))
+
+            start = time.perf_counter()
+            result = solve(waiter_ids, reservations, args.budget_ms / 1000)
+            solver_ms.append((time.perf_counter() - start) * 1000)
+            assert peak_covers(result.assignments) == result.objective
+            assert sum(len(tables) for tables in result.assignments.values()) == count
+            solver_peaks.append(result.objective)
+            bounds.append(result.lower_bound)
+            proven += result.optimal
+        print(f"{shift:>9} {statistics.mean(greedy_peaks):>7.1f} {statistics.mean(solver_peaks):>8.1f} "
+              f"{statistics.mean(bounds):>6.1f} {proven:>4}/{args.seeds:<2} {statistics.mean(greedy_ms):>10.1f} "
+              f"{statistics.mean(solver_ms):>10.1f} {max(solver_ms):>7.1f}")
+
+if __name__ == "__main__":
+    main()
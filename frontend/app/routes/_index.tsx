@@ -33,8 +33,16 @@ interface DailyStats {
   special_events: number;
 }
 
+interface Waiter {
+  id: number;
+  name: string;
+  shift_start: string;
+  shift_end: string;
+}
+
 interface LoaderData {
   data?: any;
+  waiters?: Waiter[];
   stats?: DailyStats;
   error?: string;
   initialAttendance?: number[];
@@ -43,18 +51,21 @@ interface LoaderData {
 
 export const loader = async () => {
   try {
-    const [diningResponse, attendanceResponse, statsResponse] = await Promise.all([
-      fetch('http://localhost:8000/dining-data'),
+    const [diningResponse, attendanceResponse, statsResponse, waitersResponse] = await Promise.all([
+      fetch('http://localhost:8000/dining-data?view=summary'),
       fetch('http://localhost:8000/attendance'),
-      fetch('http://localhost:8000/daily-stats')
+      fetch('http://localhost:8000/daily-stats'),
+      fetch('http://localhost:8000/waiters')
     ]);
-    const [diningData, attendanceData, statsData] = await Promise.all([
+    const [diningData, attendanceData, statsData, waitersData] = await Promise.all([
       diningResponse.json(),
       attendanceResponse.json(),
-      statsResponse.json()
+      statsResponse.json(),
+      waitersResponse.json()
     ]);
     return json<LoaderData>({
       data: diningData,
+      waiters: waitersData.waiters,
       stats: statsData,
       initialAttendance: attendanceData.waiter_ids,
       initialAssignments: attendanceData.assignments
@@ -65,24 +76,11 @@ export const loader = async () => {
 };
 
 export default function Index() {
-  const { data, stats, error, initialAttendance } = useLoaderData<typeof loader>();
+  const { data, waiters = [], stats, error, initialAttendance } = useLoaderData<typeof loader>();
   const navigate = useNavigate();
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [submitError, setSubmitError] = useState<string | null>(null);
 
-  const waiters = [
-    { id: 1, name: "Sauman Das" },
-    { id: 2, name: "Danny Bessonov" },
-    { id: 3, name: "Justin Zhou" },
-    { id: 4, name: "Amélie Rousseau" },
-    { id: 5, name: "Philippe Lefebvre" },
-    { id: 6, name: "Sophie Beaumont" },
-    { id: 7, name: "Lucas Girard" },
-    { id: 8, name: "Isabelle Dupont" },
-    { id: 9, name: "Antoine Mercier" },
-    { id: 10, name: "Claire Fontaine" }
-  ];
-
   const [attendanceList, setAttendanceList] = useState<number[]>(initialAttendance || []);
 
   const handleAttendanceChange = (waiterId: number) => {
@@ -112,6 +110,12 @@ export default function Index() {
         body: JSON.stringify({ waiter_ids: attendanceList }),
       });
       
+      if (response.status === 422) {
+        // The waiters present cannot staff every table (shifts, sections or cover limits)
+        const { detail } = await response.json();
+        setSubmitError(`${detail.message}: ${detail.tables.map((table: { diner_name: string; reason: string }) => `${table.diner_name} (${table.reason})`).join('; ')}`);
+        return;
+      }
       if (!response.ok) {
         throw new Error('Failed to submit attendance');
       }
@@ -183,6 +187,7 @@ export default function Index() {
                   className="text-lg text-[#65544a] cursor-pointer select-none"
                 >
                   {waiter.name}
+                  <span className="block text-sm text-[#8b7355]">{waiter.shift_start} – {waiter.shift_end}</span>
                 </label>
               </div>
             ))}
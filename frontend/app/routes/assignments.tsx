@@ -27,25 +27,56 @@ interface DailyStats {
   special_events: number;
 }
 
+interface DinerEnrichment {
+  allergies?: string;
+  special_event?: string | null;
+  preferences?: string[];
+}
+
+interface Enrichment {
+  state: string;
+  diners: { [dinerName: string]: DinerEnrichment };
+}
+
 interface LoaderData {
   assignments?: Assignment[];
   stats?: DailyStats;
+  enrichment?: Enrichment;
   error?: string;
 }
 
+// Last GET /attendance body and its ETag; the backend answers 304 until the
+// assignment or a briefing changes
+let attendanceCache: { etag: string; data: any } | null = null;
+
+const fetchAttendance = async () => {
+  const response = await fetch('http://localhost:8000/attendance', {
+    headers: attendanceCache ? { 'If-None-Match': attendanceCache.etag } : {}
+  });
+  if (response.status === 304 && attendanceCache) {
+    return attendanceCache.data;
+  }
+  const data = await response.json();
+  const etag = response.headers.get('ETag');
+  attendanceCache = etag ? { etag, data } : null;
+  return data;
+};
+
 export const loader = async () => {
   try {
-    const [attendanceResponse, statsResponse] = await Promise.all([
-      fetch('http://localhost:8000/attendance'),
-      fetch('http://localhost:8000/daily-stats')
+    const [attendanceData, statsResponse, enrichmentResponse] = await Promise.all([
+      fetchAttendance(),
+      fetch('http://localhost:8000/daily-stats'),
+      fetch('http://localhost:8000/enrichment')
     ]);
-    const [attendanceData, statsData] = await Promise.all([
-      attendanceResponse.json(),
-      statsResponse.json()
+    const [statsData, enrichmentData] = await Promise.all([
+      statsResponse.json(),
+      enrichmentResponse.json()
     ]);
     return json<LoaderData>({
       assignments: attendanceData.assignments,
-      stats: statsData
+      stats: statsData,
+      enrichment: enrichmentData
     });
   } catch (error) {
     return json<LoaderData>({ error: 'Failed to fetch assignments' });
@@ -93,7 +124,7 @@ const formatSummary = (summary: string) => {
 };
 
 export default function Assignments() {
-  const { assignments, stats, error } = useLoaderData<typeof loader>();
+  const { assignments, stats, enrichment, error } = useLoaderData<typeof loader>();
   const navigate = useNavigate();
   const [expandedTables, setExpandedTables] = useState<{[key: string]: boolean}>({});
   const [allergies, setAllergies] = useState<{[key: string]: string}>({});
@@ -196,7 +227,18 @@ export default function Assignments() {
                               
                               // If expanding and data hasn't been loaded
                               if (newState[tableKey]) {
-                                if (!allergies[tableKey]) {
+                                // Use whatever the backend already pre-computed for this diner
+                                const enriched = enrichment?.diners?.[table.diner_name];
+                                if (!allergies[tableKey] && enriched?.allergies !== undefined && enriched?.special_event !== undefined) {
+                                  setAllergies(prev => ({
+                                    ...prev,
+                                    [tableKey]: enriched.allergies as string
+                                  }));
+                                  setSpecialEvents(prev => ({
+                                    ...prev,
+                                    [tableKey]: enriched.special_event || 'None'
+                                  }));
+                                } else if (!allergies[tableKey]) {
                                   // Set loading state for allergies and special events
                                   setAllergies(prev => ({
                                     ...prev,
@@ -233,7 +275,12 @@ export default function Assignments() {
                                   });
                                 }
 
-                                if (!preferences[tableKey]) {
+                                if (!preferences[tableKey] && enriched?.preferences !== undefined) {
+                                  setPreferences(prev => ({
+                                    ...prev,
+                                    [tableKey]: enriched.preferences as string[]
+                                  }));
+                                } else if (!preferences[tableKey]) {
                                   // Set loading state for preferences
                                   setLoadingPreferences(prev => ({
                                     ...prev,